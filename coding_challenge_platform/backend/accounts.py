@@ -0,0 +1,300 @@
+"""Team and admin accounts: salted password hashes, bulk import, login cache.
+
+Passwords are stored as werkzeug salted hashes (scrypt by default). Accounts
+created before hashing was introduced still hold the plaintext; they are
+accepted once and rewritten as a hash on the next successful login.
+
+Signup and bulk import rely on the unique (username, role) index from
+indexes.py instead of a find_one before the insert: a duplicate comes back
+as a DuplicateKeyError, or as write error 11000 from insert_many. That index
+is built in the background at startup and can fail (existing duplicate
+accounts block it), so until index_information() shows it, inserts look for
+existing accounts first, as before.
+
+A slow hash is the point of password hashing, but it makes a login storm
+expensive: 500 teams logging in at once is 500 scrypt runs plus 500 find_one
+calls. CredentialCache keeps, per (role, username), the stored hash and a
+keyed HMAC of the last password that verified against it. The HMAC key is
+random per process and never leaves memory, so a repeat login costs one
+HMAC and no database round-trip. Accounts created through this process
+(signup, import) are cached as they are written. Entries expire after a few
+minutes, so a password changed or an account removed in the database stops
+working for logins soon after.
+"""
+import csv
+import hashlib
+import hmac
+import io
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from openpyxl import load_workbook
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from metrics import FILE_OPERATIONS, log_error
+
+# werkzeug method string, e.g. "scrypt" or "pbkdf2:sha256:600000".
+HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+HASH_PREFIXES = ('scrypt:', 'pbkdf2:')
+ROLES = ('student', 'admin')
+DUPLICATE_KEY = 11000
+
+
+class AccountImportError(ValueError):
+    """The uploaded account list can't be read at all (bad type or header)."""
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=HASH_METHOD)
+
+
+def is_hashed(stored):
+    return isinstance(stored, str) and stored.startswith(HASH_PREFIXES)
+
+
+def verify_password(stored, password):
+    if not isinstance(stored, str) or not password:
+        return False
+    if is_hashed(stored):
+        return check_password_hash(stored, password)
+    # Legacy plaintext account.
+    return hmac.compare_digest(stored.encode(), password.encode())
+
+
+def _rows_from_csv(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def _rows_from_xlsx(stream):
+    wb = load_workbook(io.BytesIO(stream.read()), read_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # a numeric password typed into Excel
+    return str(value).strip()
+
+
+def parse_accounts(filename, stream):
+    """Read username/password[/role] rows from a .csv or .xlsx upload.
+
+    Returns (accounts, invalid): accounts is a list of (line, username,
+    password, role) and invalid a list of {"line", "reason"} for rows that
+    were skipped. Blank rows are ignored.
+    """
+    if filename.endswith('.csv'):
+        rows = _rows_from_csv(stream)
+    elif filename.endswith('.xlsx'):
+        rows = _rows_from_xlsx(stream)
+    else:
+        raise AccountImportError("Account lists must be .csv or .xlsx")
+
+    with FILE_OPERATIONS.time(operation='account_import_parse'):
+        header = [_cell(value).lower() for value in next(rows, ())]
+        if 'username' not in header or 'password' not in header:
+            raise AccountImportError("The first row must name the 'username' and 'password' columns")
+        columns = {name: header.index(name) for name in ('username', 'password', 'role') if name in header}
+
+        accounts, invalid = [], []
+        for line, row in enumerate(rows, start=2):
+            values = {name: _cell(row[index]) if index < len(row) else '' for name, index in columns.items()}
+            if not any(values.values()):
+                continue
+            username, password = values['username'], values['password']
+            role = values.get('role') or 'student'
+            if not username or not password:
+                invalid.append({"line": line, "reason": "username and password are required"})
+            elif role not in ROLES:
+                invalid.append({"line": line, "reason": f"unknown role {role!r}"})
+            else:
+                accounts.append((line, username, password, role))
+        return accounts, invalid
+
+
+class CredentialCache:
+    def __init__(self, max_entries=4096, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._key = secrets.token_bytes(32)
+        self._entries = OrderedDict()  # (role, username) -> (expires, stored, verified digest or None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _digest(self, password):
+        return hmac.new(self._key, password.encode(), hashlib.sha256).digest()
+
+    def get(self, role, username):
+        """(stored, verified digest) or None when absent or expired."""
+        key = (role, username)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def matches(self, verified, password):
+        return verified is not None and hmac.compare_digest(verified, self._digest(password))
+
+    def put(self, role, username, stored, password=None):
+        """Cache the stored hash, and password as verified against it if given."""
+        verified = self._digest(password) if password is not None else None
+        with self._lock:
+            self._entries[(role, username)] = (time.monotonic() + self.ttl, stored, verified)
+            self._entries.move_to_end((role, username))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else None}
+
+
+class AccountStore:
+    def __init__(self, collection, cache, hash_workers=None):
+        self.collection = collection
+        self.cache = cache
+        self.hash_workers = hash_workers or os.cpu_count() or 1
+        self._unique_index = False
+
+    def _unique_index_ready(self):
+        """True once the unique (username, role) index exists (checked until it does)."""
+        if not self._unique_index:
+            try:
+                indexes = self.collection.index_information()
+            except PyMongoError:
+                return False
+            self._unique_index = any(
+                spec.get('unique') and [field for field, _ in spec['key']] == ['username', 'role']
+                for spec in indexes.values())
+        return self._unique_index
+
+    def authenticate(self, role, username, password):
+        """'ok', 'invalid' (wrong password) or 'unknown' (no such account)."""
+        if not isinstance(username, str) or not isinstance(password, str):
+            return 'invalid'
+        cached = self.cache.get(role, username)
+        if cached is not None:
+            stored, verified = cached
+            if self.cache.matches(verified, password):
+                return 'ok'
+        else:
+            user = self.collection.find_one({"username": username, "role": role}, {"password": 1})
+            if user is None:
+                # Not cached: the account may be created by another process.
+                return 'unknown'
+            stored = user.get("password")
+
+        if not verify_password(stored, password):
+            if cached is None:
+                self.cache.put(role, username, stored)
+            return 'invalid'
+        if not is_hashed(stored):
+            stored = self._upgrade(role, username, stored, password)
+        self.cache.put(role, username, stored, password)
+        return 'ok'
+
+    def _upgrade(self, role, username, plaintext, password):
+        """Replace a legacy plaintext password with a hash; returns what is stored now."""
+        hashed = hash_password(password)
+        try:
+            # Matching on the old value leaves a concurrent change alone.
+            result = self.collection.update_one(
+                {"username": username, "role": role, "password": plaintext},
+                {"$set": {"password": hashed}})
+        except Exception as e:
+            log_error('accounts', f"Error upgrading password hash for {username}: {e}")
+            return plaintext
+        return hashed if result.modified_count else plaintext
+
+    def create(self, username, password, role='student'):
+        """Insert one account; False if the username is taken for that role."""
+        if not self._unique_index_ready() and self.collection.find_one(
+                {"username": username, "role": role}, {"_id": 1}) is not None:
+            return False
+        stored = hash_password(password)
+        try:
+            self.collection.insert_one({
+                "username": username,
+                "password": stored,
+                "role": role,
+                "created_at": datetime.now()
+            })
+        except DuplicateKeyError:
+            return False
+        self.cache.put(role, username, stored, password)
+        return True
+
+    def import_accounts(self, accounts):
+        """Insert parsed accounts in one unordered insert_many.
+
+        Returns {"inserted", "duplicates"}; duplicates lists the line and
+        username of rows that repeat an earlier row or an existing account.
+        """
+        unique, duplicates, seen = [], [], set()
+        if not self._unique_index_ready():
+            usernames = list({username for _, username, _, _ in accounts})
+            seen.update((doc.get('role'), doc['username']) for doc in self.collection.find(
+                {"username": {"$in": usernames}}, {"username": 1, "role": 1}))
+        for line, username, password, role in accounts:
+            if (role, username) in seen:
+                duplicates.append({"line": line, "username": username})
+            else:
+                seen.add((role, username))
+                unique.append((line, username, password, role))
+        if not unique:
+            return {"inserted": 0, "duplicates": duplicates}
+
+        # hashlib's scrypt/pbkdf2 release the GIL, so this uses every core.
+        with ThreadPoolExecutor(max_workers=self.hash_workers) as pool:
+            hashes = list(pool.map(hash_password, [password for _, _, password, _ in unique]))
+        now = datetime.now()
+        docs = [{"username": username, "password": stored, "role": role, "created_at": now}
+                for (_, username, _, role), stored in zip(unique, hashes)]
+
+        failed = set()
+        try:
+            self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            other = [error for error in errors if error.get('code') != DUPLICATE_KEY]
+            if other:
+                raise
+            failed = {error['index'] for error in errors}
+
+        inserted = 0
+        for index, ((line, username, password, role), stored) in enumerate(zip(unique, hashes)):
+            if index in failed:
+                duplicates.append({"line": line, "username": username})
+            else:
+                inserted += 1
+                self.cache.put(role, username, stored, password)
+        duplicates.sort(key=lambda row: row["line"])
+        return {"inserted": inserted, "duplicates": duplicates}
@@ -0,0 +1,239 @@
+"""Admission control for the code execution endpoints.
+
+Two checks stand in front of /check_debug_code and /submit_debug_code:
+
+- a token bucket per team and endpoint (rate per second, burst capacity),
+  so one team's script can't spend the Judge0 quota or the local runner
+  for everyone else;
+- for runs that execute on the request (/check_debug_code), a global cap on
+  concurrent executions with a bounded wait queue. A request that finds the
+  queue full, or waits longer than the timeout, is turned away.
+
+Both rejections raise Overloaded with a Retry-After in seconds, which the
+endpoints turn into a 429 at once instead of letting requests pile up.
+
+Buckets live in process memory by default. With several server processes,
+MongoTokenBuckets keeps them in a MongoDB collection instead (one document
+per team and endpoint, updated by compare-and-set on its timestamp). The
+concurrency cap is always per process.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from metrics import log_error
+
+# Idle buckets are dropped once there are this many (a full bucket and a
+# missing one admit the same).
+MAX_BUCKETS = 10000
+# Compare-and-set attempts on a shared bucket before letting the request in.
+CAS_ATTEMPTS = 5
+
+
+class Overloaded(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason  # 'rate_limited' or 'busy'
+        self.retry_after = max(1, math.ceil(retry_after))
+
+    @property
+    def message(self):
+        if self.reason == 'rate_limited':
+            return f"Too many requests from your team. Please retry in {self.retry_after} s."
+        return f"All code runners are busy. Please retry in {self.retry_after} s."
+
+    @property
+    def headers(self):
+        return {'Retry-After': str(self.retry_after)}
+
+
+class TokenBuckets:
+    """In-process token buckets: rate tokens per second up to burst."""
+
+    shared = False
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, cost=1):
+        """Take cost tokens from key's bucket; returns 0, or seconds until they'd be there."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < cost:
+                self._buckets[key] = (tokens, now)
+                return (cost - tokens) / self.rate
+            self._buckets[key] = (tokens - cost, now)
+            if len(self._buckets) > MAX_BUCKETS:
+                self._prune(now)
+            return 0
+
+    def _prune(self, now):
+        # Caller holds _lock.
+        full = [key for key, (tokens, updated) in self._buckets.items()
+                if tokens + (now - updated) * self.rate >= self.burst]
+        for key in full:
+            del self._buckets[key]
+
+
+class MongoTokenBuckets:
+    """Token buckets shared by several processes through a MongoDB collection."""
+
+    shared = True
+
+    def __init__(self, collection, rate, burst, prefix):
+        self.collection = collection
+        self.rate = rate
+        self.burst = burst
+        self.prefix = prefix  # keeps endpoints apart in one collection
+
+    def take(self, key, cost=1):
+        _id = f"{self.prefix}:{key}"
+        try:
+            for _ in range(CAS_ATTEMPTS):
+                now = time.time()
+                doc = self.collection.find_one({"_id": _id})
+                if doc is None:
+                    tokens = self.burst
+                else:
+                    tokens = min(self.burst, doc['tokens'] + max(0.0, now - doc['updated']) * self.rate)
+                if tokens < cost:
+                    return (cost - tokens) / self.rate
+                if doc is None:
+                    try:
+                        self.collection.insert_one({"_id": _id, "tokens": tokens - cost, "updated": now})
+                        return 0
+                    except DuplicateKeyError:
+                        continue
+                result = self.collection.update_one({"_id": _id, "updated": doc['updated']},
+                                                    {"$set": {"tokens": tokens - cost, "updated": now}})
+                if result.matched_count:
+                    return 0
+        except PyMongoError as e:
+            log_error('admission', f"Error reading shared rate limit for {key}: {e}")
+        # Database trouble or heavy contention on one team's bucket: let it through.
+        return 0
+
+
+class ConcurrencyLimiter:
+    """At most limit holders at once; up to max_waiting more wait up to timeout seconds."""
+
+    def __init__(self, limit, max_waiting, timeout):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._available = threading.Condition()
+
+    def _enter_queue(self):
+        # Caller holds _available. True if a slot was taken straight away.
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return True
+        if self.waiting >= self.max_waiting:
+            raise Overloaded('busy', self.timeout)
+        self.waiting += 1
+        return False
+
+    def acquire(self):
+        with self._available:
+            if self._enter_queue():
+                return
+            try:
+                if not self._available.wait_for(lambda: self.active < self.limit, timeout=self.timeout):
+                    raise Overloaded('busy', self.timeout)
+                self.active += 1
+            finally:
+                self.waiting -= 1
+
+    async def acquire_async(self, poll_interval=0.05):
+        """acquire() for the event loop: polls instead of blocking a thread."""
+        with self._available:
+            if self._enter_queue():
+                return
+        deadline = time.monotonic() + self.timeout
+        try:
+            while True:
+                await asyncio.sleep(poll_interval)
+                with self._available:
+                    if self.active < self.limit:
+                        self.active += 1
+                        return
+                if time.monotonic() >= deadline:
+                    raise Overloaded('busy', self.timeout)
+        finally:
+            with self._available:
+                self.waiting -= 1
+
+    def release(self):
+        with self._available:
+            self.active -= 1
+            self._available.notify()
+
+
+class AdmissionControl:
+    def __init__(self, buckets, limiter):
+        self.buckets = buckets  # endpoint -> TokenBuckets or MongoTokenBuckets
+        self.limiter = limiter
+        self._counts = defaultdict(int)  # (endpoint, outcome) -> requests
+        self._lock = threading.Lock()
+
+    def _count(self, endpoint, outcome):
+        with self._lock:
+            self._counts[(endpoint, outcome)] += 1
+
+    def admit(self, endpoint, team):
+        """Charge the team's bucket for endpoint; raises Overloaded when it is empty."""
+        wait = self.buckets[endpoint].take(team)
+        if wait:
+            self._count(endpoint, 'rate_limited')
+            raise Overloaded('rate_limited', wait)
+        self._count(endpoint, 'admitted')
+
+    @contextmanager
+    def execution_slot(self, endpoint):
+        """Hold one of the global execution slots; raises Overloaded when none frees up in time."""
+        try:
+            self.limiter.acquire()
+        except Overloaded:
+            self._count(endpoint, 'busy')
+            raise
+        try:
+            yield
+        finally:
+            self.limiter.release()
+
+    async def acquire_async(self, endpoint):
+        try:
+            await self.limiter.acquire_async()
+        except Overloaded:
+            self._count(endpoint, 'busy')
+            raise
+
+    def counts(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def stats(self):
+        endpoints = {}
+        for (endpoint, outcome), count in self.counts().items():
+            endpoints.setdefault(endpoint, {})[outcome] = count
+        return {
+            "endpoints": {endpoint: {"rate_per_second": buckets.rate, "burst": buckets.burst,
+                                     "shared": buckets.shared,
+                                     **endpoints.get(endpoint, {})}
+                          for endpoint, buckets in self.buckets.items()},
+            "executions": {"active": self.limiter.active, "waiting": self.limiter.waiting,
+                           "limit": self.limiter.limit, "max_waiting": self.limiter.max_waiting,
+                           "wait_timeout_seconds": self.limiter.timeout}
+        }
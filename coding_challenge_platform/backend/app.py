@@ -1,67 +1,82 @@
-import requests
-# --- Helper for Judge0 API (Free Compiler API) ---
-def judge0_compile(source_code, language_id, stdin=None):
-    """
-    Compile and run code using Judge0 API. Returns output, stderr, and status.
-    language_id: see https://ce.judge0.com/languages (e.g., 71 for Python 3)
-    """
-    url = "https://ce.judge0.com/submissions/?base64_encoded=false&wait=true"
-    payload = {
-        "source_code": source_code,
-        "language_id": language_id,
-        "stdin": stdin or ""
-    }
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        if resp.status_code == 201:
-            result = resp.json()
-            return {
-                "stdout": result.get("stdout", ""),
-                "stderr": result.get("stderr", ""),
-                "status": result.get("status", {}).get("description", ""),
-                "time": result.get("time", "")
-            }
-        else:
-            return {"error": f"Judge0 error: {resp.status_code}"}
-    except Exception as e:
-        return {"error": str(e)}
-
-# --- Round 3: Check Code (compile/run before submit) ---
-@app.route('/check_debug_code', methods=['POST'])
-def check_debug_code():
-    data = request.get_json()
-    code = data.get('code')
-    language = data.get('lang', 'py')
-    stdin = data.get('input', '')
-    # Map language to Judge0 language_id
-    lang_map = {'py': 71, 'c': 50, 'cpp': 54, 'java': 62}
-    language_id = lang_map.get(language, 71)
-    result = judge0_compile(code, language_id, stdin)
-    return jsonify(result)
 import os
-import random
-from flask import Flask, jsonify, request, send_from_directory
+import json
+from flask import Flask, Response, abort, g, jsonify, request, send_from_directory
 from flask_cors import CORS
 import subprocess
-import difflib
-from openpyxl import load_workbook
 from datetime import datetime
 import secrets
+import threading
+import time
+import zlib
 from pymongo import MongoClient
 from bson import ObjectId
+from bson.errors import InvalidId
+from question_bank import QuestionBank
+from executor import LANGUAGES, get_backend
+from grader import grade
+from suite_store import SuiteError, TestSuiteStore
+from grading_queue import GradingQueue, QueueFull
+from scramble import ReferenceCache, VariantPool, normalize_lines, similarity
+from leaderboard import LeaderboardCache
+from indexes import ensure_indexes
+from streaming import FORMATS as STREAM_FORMATS, encode as encode_rows, ndjson
+from submission_index import SUBMISSION_ROUNDS, SubmissionIndex
+from similarity_index import SimilarityIndex
+from result_cache import CachingBackend, ResultCache, run_key
+from admission import AdmissionControl, ConcurrencyLimiter, MongoTokenBuckets, Overloaded, TokenBuckets
+from round_sessions import RoundSessions
+from accounts import AccountImportError, AccountStore, CredentialCache, parse_accounts
+from static_assets import StaticAssets
+from problem_catalog import ProblemCatalog
+from export import ArchiveTooLarge, Entry, StoredZip, file_entry, fingerprint
+from score_buffer import ScoreBuffer
+from uploads import IMAGE_EXTENSIONS, BlobStore, Thumbnailer, UploadRequest, save_upload
+from metrics import (ERRORS, HTTP_REQUESTS, REGISTRY, Gauge, MongoCommandTimer, SamplingProfiler,
+                     TimedBackend, log_error)
 
-app = Flask(__name__, static_folder='../frontend', static_url_path='')
+# The frontend is served by index/serve_static below (see static_assets.py).
+app = Flask(__name__, static_folder=None)
 CORS(app)  # Enable CORS for all routes
 
+# Hashed, precompressed and held in memory from startup.
+static_assets = StaticAssets(os.path.join(app.root_path, '..', 'frontend'))
+static_assets.load()
+
+# --- Metrics: per-route latency (see metrics.py and /metrics) ---
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        HTTP_REQUESTS.observe(time.perf_counter() - started, method=request.method,
+                              route=route, status=response.status_code)
+    return response
+
+@app.teardown_request
+def count_unhandled_error(exc):
+    if exc is not None:
+        ERRORS.inc(source='unhandled')
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    limit = getattr(request, 'upload_limit', None)
+    if limit is not None:
+        return jsonify({"message": f"File too large (limit {limit // (1024 * 1024)} MB)."}), 413
+    return jsonify({"message": "Request too large."}), 413
+
 # Root route - serve the main page
 @app.route("/")
 def index():
-    return send_from_directory('../frontend', 'index.html')
+    return static_assets.response('index.html', request) or abort(404)
 
 # Serve static files (CSS, JS, images)
 @app.route("/<path:path>")
 def serve_static(path):
-    return send_from_directory('../frontend', path)
+    return static_assets.response(path, request) or abort(404)
 
 @app.route("/api/hello")
 def hello():
@@ -71,6 +86,89 @@ def hello():
 UPLOAD_FOLDER = 'uploads'
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "adminpass"
+MCQ_FILE = os.path.join(UPLOAD_FOLDER, 'mcq', 'questions.xlsx')
+
+# Uploaded files stream to disk, hashed, and are refused past these sizes
+# (see uploads.py). Round 4 submissions are stored once per content.
+ROUND4_MAX_BYTES = int(os.environ.get('ROUND4_MAX_MB', 5)) * 1024 * 1024
+ADMIN_UPLOAD_MAX_BYTES = int(os.environ.get('ADMIN_UPLOAD_MAX_MB', 50)) * 1024 * 1024
+app.request_class = UploadRequest
+UploadRequest.upload_dir = os.path.join(UPLOAD_FOLDER, 'tmp')
+UploadRequest.limits = {
+    'submit_frontend': ROUND4_MAX_BYTES,
+    'admin_upload': ADMIN_UPLOAD_MAX_BYTES,
+    'import_users': ADMIN_UPLOAD_MAX_BYTES,
+}
+blob_store = BlobStore(os.path.join(UPLOAD_FOLDER, 'blobs'))
+# Previews for the admin submissions view, made off the request path.
+thumbnails = Thumbnailer(os.path.join(UPLOAD_FOLDER, 'blobs', 'thumbs'))
+
+# Parsed once and shared by all requests; rebuilt when the workbook changes.
+question_bank = QuestionBank(MCQ_FILE)
+
+# Compiles and runs Round 3 code (local sandbox by default, see executor.py).
+execution_backend = get_backend()
+# Check and submit share one cache of results, so repeated identical runs
+# (and identical runs already in flight) don't execute again.
+execution_cache = ResultCache(
+    max_entries=int(os.environ.get('EXEC_CACHE_SIZE', 2048)),
+    ttl=int(os.environ.get('EXEC_CACHE_TTL', 600))
+)
+cached_execution = CachingBackend(
+    TimedBackend(execution_backend, type(execution_backend).__name__.replace('Backend', '').lower()),
+    execution_cache
+)
+# How many test cases of one submission may run at the same time.
+GRADING_CONCURRENCY = int(os.environ.get('GRADING_CONCURRENCY', 4))
+
+# Round 3 test suites, unpacked and indexed when uploaded (see suite_store.py).
+# Problems without an uploaded suite are graded against DEFAULT_TEST_CASES.
+test_suites = TestSuiteStore(os.path.join(UPLOAD_FOLDER, 'debug'))
+test_suites.load()
+DEFAULT_TEST_CASES = [{'input': '10', 'expected_output': '20\n'}]
+
+# Round 3 submissions are graded off the request path (see grading_queue.py).
+grading_queue = GradingQueue(
+    workers=int(os.environ.get('GRADING_WORKERS', 4)),
+    max_depth=int(os.environ.get('GRADING_QUEUE_MAX', 1000))
+)
+
+# Normalised Round 2 reference solutions, re-read only when a file changes.
+scramble_references = ReferenceCache(max_files=int(os.environ.get('SCRAMBLE_CACHE_FILES', 256)))
+# Pre-scrambled Round 2 puzzles; each team gets a fixed variant per file.
+scramble_variants = VariantPool(size=int(os.environ.get('SCRAMBLE_VARIANTS', 16)),
+                                max_files=int(os.environ.get('SCRAMBLE_CACHE_FILES', 256)))
+
+def scramble_file(file_path):
+    """Full path of a Round 2 file given as scramble/<lang>/<file>, or None if it is outside uploads/scramble."""
+    full_path = os.path.join(UPLOAD_FOLDER, file_path)
+    scramble_root = os.path.realpath(os.path.join(UPLOAD_FOLDER, 'scramble'))
+    resolved = os.path.realpath(full_path)
+    if resolved == scramble_root or os.path.commonpath([resolved, scramble_root]) != scramble_root:
+        return None
+    return full_path
+
+def problem_file_changed(full_path, removed):
+    """Rebuild the Round 2 caches of a problem file that was uploaded, edited or deleted."""
+    if os.path.relpath(full_path, UPLOAD_FOLDER).split(os.sep)[0] != 'scramble':
+        return
+    scramble_references.invalidate(full_path)
+    if removed:
+        scramble_variants.invalidate(full_path)
+    else:
+        scramble_variants.build(full_path)
+
+# Round 2/3 problem files listed from memory with ETags (see problem_catalog.py);
+# files changed outside admin_upload are noticed within PROBLEM_POLL_INTERVAL.
+problem_catalog = ProblemCatalog(UPLOAD_FOLDER, poll_interval=float(os.environ.get('PROBLEM_POLL_INTERVAL', 2)),
+                                 on_change=problem_file_changed)
+
+# Metadata of every Round 2-4 submission file, written by the submit endpoints
+# and queried by the admin submissions view (see submission_index.py).
+submission_index = SubmissionIndex(UPLOAD_FOLDER)
+# MinHash signatures of Round 2/3 submissions for spotting copies across teams
+# (see similarity_index.py).
+similarity_index = SimilarityIndex(UPLOAD_FOLDER)
 
 # --- MongoDB Configuration ---
 # Use a remote MongoDB instance
@@ -79,7 +177,7 @@ DB_NAME = "coding_challenge"
 SCORES_COLLECTION_NAME = "scores"
 
 try:
-    mongo_client = MongoClient(MONGO_URI)
+    mongo_client = MongoClient(MONGO_URI, event_listeners=[MongoCommandTimer()])
     mongo_db = mongo_client[DB_NAME]
     scores_collection = mongo_db[SCORES_COLLECTION_NAME]
     users_collection = mongo_db["users"]
@@ -89,6 +187,68 @@ except Exception as e:
     scores_collection = None
     users_collection = None
 
+# Team and admin accounts (see accounts.py). Verified logins are cached in
+# process so the login storm at contest start skips MongoDB and the hash.
+credential_cache = CredentialCache(
+    max_entries=int(os.environ.get('LOGIN_CACHE_SIZE', 4096)),
+    ttl=int(os.environ.get('LOGIN_CACHE_TTL', 300))
+)
+accounts = AccountStore(users_collection, credential_cache) if users_collection is not None else None
+
+# Score documents are journaled locally and written to MongoDB in batches
+# off the request path (see score_buffer.py).
+score_buffer = None
+if scores_collection is not None:
+    score_buffer = ScoreBuffer(
+        scores_collection,
+        os.environ.get('SCORE_JOURNAL', os.path.join(UPLOAD_FOLDER, 'score_journal.jsonl')),
+        max_batch=int(os.environ.get('SCORE_BATCH_SIZE', 500)),
+        flush_interval=float(os.environ.get('SCORE_FLUSH_INTERVAL', 0.5)),
+        fsync=os.environ.get('SCORE_JOURNAL_FSYNC') == '1'
+    )
+
+# Weighted total used to rank teams on the leaderboard (round_name -> weight).
+ROUND_WEIGHTS = {'MCQ': 1.0, 'Scramble': 1.0, 'Debugging': 1.0}
+leaderboard = None
+if scores_collection is not None:
+    leaderboard = LeaderboardCache(scores_collection, ROUND_WEIGHTS,
+                                   ttl=int(os.environ.get('LEADERBOARD_TTL', 30)),
+                                   flush=score_buffer.flush)
+
+# Timed rounds (round_name -> minutes). A team's clock starts when it first
+# fetches the round; submissions after the limit (plus a little grace for the
+# client's auto-submit) are refused. See round_sessions.py.
+ROUND_TIME_LIMITS = {'MCQ': 10, 'Debugging': 45}
+ROUND_GRACE_SECONDS = 30
+round_sessions = RoundSessions(
+    mongo_db["round_sessions"] if scores_collection is not None else None,
+    ROUND_TIME_LIMITS, grace_seconds=ROUND_GRACE_SECONDS
+)
+
+# Admission control for the execution endpoints (see admission.py): a token
+# bucket per team and endpoint, and a cap on runs executing on the request.
+# ADMISSION_BACKEND=mongo shares the buckets between server processes.
+ADMISSION_RATES = {
+    # endpoint -> (requests per minute, burst)
+    'check': (float(os.environ.get('CHECK_RATE_PER_MIN', 20)), int(os.environ.get('CHECK_BURST', 10))),
+    'submit': (float(os.environ.get('SUBMIT_RATE_PER_MIN', 6)), int(os.environ.get('SUBMIT_BURST', 5))),
+}
+if os.environ.get('ADMISSION_BACKEND') == 'mongo' and scores_collection is not None:
+    admission_buckets = {endpoint: MongoTokenBuckets(mongo_db["admission_buckets"], per_minute / 60, burst, endpoint)
+                         for endpoint, (per_minute, burst) in ADMISSION_RATES.items()}
+else:
+    admission_buckets = {endpoint: TokenBuckets(per_minute / 60, burst)
+                         for endpoint, (per_minute, burst) in ADMISSION_RATES.items()}
+admission = AdmissionControl(admission_buckets, ConcurrencyLimiter(
+    limit=int(os.environ.get('EXECUTION_CONCURRENCY', 8)),
+    max_waiting=int(os.environ.get('EXECUTION_QUEUE', 32)),
+    timeout=float(os.environ.get('EXECUTION_QUEUE_TIMEOUT', 5))
+))
+
+def overloaded_response(error):
+    """429 for a request turned away by admission control."""
+    return jsonify({"message": error.message, "retry_after": error.retry_after}), 429, error.headers
+
 def init_db():
     os.makedirs(os.path.join(UPLOAD_FOLDER, 'mcq'), exist_ok=True)
     os.makedirs(os.path.join(UPLOAD_FOLDER, 'scramble', 'py'), exist_ok=True)
@@ -100,41 +260,90 @@ def init_db():
     os.makedirs(os.path.join(UPLOAD_FOLDER, 'debug', 'cpp'), exist_ok=True)
     os.makedirs(os.path.join(UPLOAD_FOLDER, 'debug', 'java'), exist_ok=True)
     os.makedirs(os.path.join(UPLOAD_FOLDER, 'frontend_submissions'), exist_ok=True)
+    problem_catalog.load()
+    problem_catalog.start()
+    # Index builds wait on the database, so don't hold up startup for them.
+    threading.Thread(target=ensure_indexes, args=(users_collection, scores_collection, round_sessions.collection),
+                     name='ensure-indexes', daemon=True).start()
+    threading.Thread(target=round_sessions.load, name='load-round-sessions', daemon=True).start()
+    threading.Thread(target=similarity_index.load, name='load-similarity-index', daemon=True).start()
+    # Scores a previous process journaled but had not written yet.
+    if score_buffer is not None:
+        score_buffer.recover()
+    # First start with an empty index: pick up submissions already on disk.
+    if submission_index.is_empty():
+        threading.Thread(target=submission_index.backfill, name='index-submissions', daemon=True).start()
+
+def round_deadline_error(username, round_name, now):
+    """Refusal response if a timed round's limit has passed for the team, else None."""
+    if round_name not in ROUND_TIME_LIMITS or not username:
+        return None
+    within, _ = round_sessions.check(username, round_name, now)
+    if within:
+        return None
+    limit = ROUND_TIME_LIMITS[round_name]
+    return jsonify({"message": f"Time limit exceeded ({limit} min). Submission not accepted."}), 403
+
+def index_submission(round_folder, username, language, file_path, problem=None, digest=None, code=None):
+    """Record a saved submission file; file_path is relative to UPLOAD_FOLDER.
+
+    Code submissions (code given) also go into the similarity index.
+    """
+    try:
+        submission_index.record(round_folder, username, language, file_path, problem, digest)
+    except Exception as e:
+        log_error('submission_index', f"Error indexing submission {file_path}: {e}")
+    if code is not None and problem:
+        try:
+            similarity_index.add(problem, username, file_path, code)
+        except Exception as e:
+            log_error('similarity_index', f"Error signing submission {file_path}: {e}")
+
+# Runs at import so gunicorn workers get the folders and indexes too.
+init_db()
 
 # --- Login Endpoints ---
+def login_fields():
+    """(username, password) from the JSON body; either is None unless it is a non-empty string."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None, None
+    return tuple(value if isinstance(value, str) and value else None
+                 for value in (data.get('username'), data.get('password')))
+
 @app.route('/admin_login', methods=['POST'])
 def admin_login():
-    data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
+    username, password = login_fields()
+    if not username or not password:
+        return jsonify({"message": "Invalid credentials"}), 401
     
     # Check for hardcoded admin
     if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
         return jsonify({"message": "Admin login successful!"}), 200
     
     # Check users collection
-    if users_collection is not None:
-        user = users_collection.find_one({"username": username, "role": "admin"})
-        if user and user.get("password") == password:
+    if accounts is not None:
+        if accounts.authenticate('admin', username, password) == 'ok':
             return jsonify({"message": "Admin login successful!"}), 200
     
     return jsonify({"message": "Invalid credentials"}), 401
 
 @app.route('/student_login', methods=['POST'])
 def student_login():
-    data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
+    username, password = login_fields()
     
     if not username or not password:
         return jsonify({"message": "Username and password are required"}), 400
     
     # Check users collection
-    if users_collection is not None:
-        user = users_collection.find_one({"username": username, "role": "student"})
-        if user and user.get("password") == password:
+    if accounts is not None:
+        try:
+            outcome = accounts.authenticate('student', username, password)
+        except Exception as e:
+            return jsonify({"message": "Login failed", "error": str(e)}), 500
+        if outcome == 'ok':
             return jsonify({"message": "Student login successful!"}), 200
-        elif user:
+        elif outcome == 'invalid':
             return jsonify({"message": "Invalid password"}), 401
         else:
             return jsonify({"message": "Username not found. Please sign up first."}), 404
@@ -143,33 +352,46 @@ def student_login():
 
 @app.route('/student_signup', methods=['POST'])
 def student_signup():
-    data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
+    username, password = login_fields()
     
     if not username or not password:
         return jsonify({"message": "Username and password are required"}), 400
     
-    if users_collection is not None:
-        # Check if user already exists
-        existing_user = users_collection.find_one({"username": username, "role": "student"})
-        if existing_user:
-            return jsonify({"message": "Team username already exists. Please choose another."}), 400
-        
-        # Create new student user
+    if accounts is not None:
+        # One insert; the unique (username, role) index rejects a taken name.
         try:
-            users_collection.insert_one({
-                "username": username,
-                "password": password,
-                "role": "student",
-                "created_at": datetime.now()
-            })
+            if not accounts.create(username, password, 'student'):
+                return jsonify({"message": "Team username already exists. Please choose another."}), 400
             return jsonify({"message": "Team account created successfully!"}), 201
         except Exception as e:
             return jsonify({"message": "Error creating account", "error": str(e)}), 500
     
     return jsonify({"message": "Sign up service unavailable"}), 500
-    
+
+@app.route('/admin/users/import', methods=['POST'])
+def import_users():
+    """Create many accounts from a .csv/.xlsx with username, password and optional role columns."""
+    file = request.files.get('file')
+    if not file or file.filename == '':
+        return jsonify({"message": "No file part"}), 400
+    if accounts is None:
+        return jsonify({"message": "Database not available"}), 500
+    try:
+        rows, invalid = parse_accounts(file.filename.lower(), file.stream)
+    except AccountImportError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"message": "Could not read the account list", "error": str(e)}), 400
+    try:
+        result = accounts.import_accounts(rows)
+    except Exception as e:
+        log_error('accounts', f"Error importing accounts: {e}")
+        return jsonify({"message": "Failed to import accounts", "error": str(e)}), 500
+    result["invalid"] = invalid
+    result["message"] = (f"Created {result['inserted']} accounts; {len(result['duplicates'])} already existed, "
+                         f"{len(invalid)} rows skipped.")
+    return jsonify(result), 200
+
 # --- Admin File Upload Endpoint ---
 @app.route('/admin_upload', methods=['POST'])
 def admin_upload():
@@ -180,10 +402,12 @@ def admin_upload():
     if not file or file.filename == '':
         return jsonify({"message": "No file part"}), 400
 
-    if round_name == 'mcq':
+    if round_name == 'users':
+        return import_users()
+    elif round_name == 'mcq':
         if not file.filename.endswith('.xlsx'):
             return jsonify({"message": "MCQ files must be .xlsx"}), 400
-        file_path = os.path.join(UPLOAD_FOLDER, 'mcq', 'questions.xlsx')
+        file_path = MCQ_FILE
     elif round_name == 'scramble':
         if lang not in ['py', 'c', 'cpp', 'java']:
             return jsonify({"message": "Invalid language for scramble file."}), 400
@@ -192,12 +416,28 @@ def admin_upload():
         if lang not in ['py', 'c', 'cpp', 'java']:
             return jsonify({"message": "Invalid language for debug file."}), 400
         file_path = os.path.join(UPLOAD_FOLDER, 'debug', lang, file.filename)
+    elif round_name == 'debug_tests':
+        if lang not in ['py', 'c', 'cpp', 'java']:
+            return jsonify({"message": "Invalid language for test suite."}), 400
+        problem = request.form.get('problem')
+        try:
+            count = test_suites.save(lang, problem, file.filename, file.stream)
+            return jsonify({"message": f"Uploaded {count} test cases for {problem}."}), 200
+        except SuiteError as e:
+            return jsonify({"message": str(e)}), 400
+        except Exception as e:
+            return jsonify({"message": "Failed to save test suite", "error": str(e)}), 500
     else:
         return jsonify({"message": "Invalid round selected"}), 400
 
     try:
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        file.save(file_path)
+        # Moved into place whole, so readers never see a partial file.
+        save_upload(file, file_path)
+        if round_name == 'mcq':
+            question_bank.reload()
+        else:
+            # Rebuilds the Round 2 caches of the file through problem_file_changed.
+            problem_catalog.refresh(round_name, lang)
         return jsonify({"message": f"Successfully uploaded file for {round_name} round."}), 200
     except Exception as e:
         return jsonify({"message": "Failed to save file", "error": str(e)}), 500
@@ -210,18 +450,13 @@ def serve_index():
 # Round 1: Multiple Choice Questions
 @app.route('/get_mcq_questions')
 def get_mcq_questions():
-    file_path = os.path.join(UPLOAD_FOLDER, 'mcq', 'questions.xlsx')
-    if not os.path.exists(file_path):
-        return jsonify({"error": "questions.xlsx not found. Admin needs to upload this file."}), 404
     try:
-        wb = load_workbook(file_path)
-        ws = wb.active
-        headers = [cell.value for cell in ws[1]]
-        questions = []
-        for row in ws.iter_rows(min_row=2, values_only=False):
-            question = {headers[i]: row[i].value for i in range(len(headers))}
-            questions.append(question)
-        random_questions = random.sample(questions, min(10, len(questions)))
+        random_questions = question_bank.sample(10)
+        if random_questions is None:
+            return jsonify({"error": "questions.xlsx not found. Admin needs to upload this file."}), 404
+        username = request.args.get('username')
+        if username:
+            round_sessions.start(username, 'MCQ')
         return jsonify(random_questions)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -232,6 +467,9 @@ def submit_mcq_score():
         return jsonify({"message": "Database not available"}), 500
     
     data = request.get_json()
+    refusal = round_deadline_error(data.get('username'), 'MCQ', datetime.now())
+    if refusal:
+        return refusal
     score_doc = {
         "username": data.get('username'),
         "round_name": 'MCQ',
@@ -240,7 +478,8 @@ def submit_mcq_score():
         "percentage": data.get('percentage'),
         "timestamp": datetime.now()
     }
-    scores_collection.insert_one(score_doc)
+    score_buffer.add(score_doc)
+    leaderboard.record(score_doc)
     
     # Return score information immediately
     return jsonify({
@@ -252,15 +491,19 @@ def submit_mcq_score():
         }
     }), 200
 
+def problem_list_response(round_name, lang):
+    """File names of a problem directory from the catalog, with an ETag (304 when unchanged)."""
+    listing = problem_catalog.listing(round_name, lang or '')
+    if listing is None:
+        return jsonify([])
+    response = Response(listing.body, mimetype='application/json', headers={'Cache-Control': 'no-cache'})
+    response.set_etag(listing.etag)
+    return response.make_conditional(request)
+
 # Round 2: Code Scramble
 @app.route('/get_scrambled_code_list', methods=['GET'])
 def get_scrambled_code_list():
-    lang = request.args.get('lang', 'py')
-    dir_path = os.path.join(UPLOAD_FOLDER, 'scramble', lang)
-    if not os.path.exists(dir_path):
-        return jsonify([])
-    files = [f for f in os.listdir(dir_path) if os.path.isfile(os.path.join(dir_path, f))]
-    return jsonify(files)
+    return problem_list_response('scramble', request.args.get('lang', 'py'))
 
 @app.route('/get_scrambled_code', methods=['GET'])
 def get_scrambled_code():
@@ -268,17 +511,14 @@ def get_scrambled_code():
     if not file_path:
         return jsonify({"error": "File path not provided"}), 400
 
-    full_path = os.path.join(UPLOAD_FOLDER, file_path)
-    if not os.path.exists(full_path):
-        return jsonify({"error": f"File {file_path} not found. Admin needs to upload."}), 404
-
+    full_path = scramble_file(file_path)
+    if full_path is None:
+        return jsonify({"error": "Invalid file path"}), 400
     try:
-        with open(full_path, 'r') as f:
-            code = f.read()
-            lines = [line for line in code.strip().split('\n') if line.strip()]
-            random.shuffle(lines)
-            scrambled_code = '\n'.join(lines)
-            return jsonify({"code": scrambled_code})
+        body = scramble_variants.variant(full_path, request.args.get('username') or None)
+        return Response(body, mimetype='application/json')
+    except FileNotFoundError:
+        return jsonify({"error": f"File {file_path} not found. Admin needs to upload."}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -296,22 +536,20 @@ def submit_scrambled_code():
     if not file_path:
         return jsonify({"error": "File path not provided"}), 400
 
-    full_path = os.path.join(UPLOAD_FOLDER, file_path)
-    if not os.path.exists(full_path):
-        return jsonify({"error": f"File {file_path} not found. Admin needs to upload."}), 404
-        
+    full_path = scramble_file(file_path)
+    if full_path is None:
+        return jsonify({"error": "Invalid file path"}), 400
     try:
-        with open(full_path, 'r') as f:
-            correct_code = f.read()
-            correct_lines = [line.strip() for line in correct_code.strip().split('\n') if line.strip()]
+        correct_lines = scramble_references.lines(full_path)
+    except FileNotFoundError:
+        return jsonify({"error": f"File {file_path} not found. Admin needs to upload."}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
         
-    submitted_lines = [line.strip() for line in submitted_code.strip().split('\n') if line.strip()]
+    submitted_lines = normalize_lines(submitted_code)
     num_attempted = len(submitted_lines)
     num_correct = sum(1 for i, line in enumerate(submitted_lines) if i < len(correct_lines) and line == correct_lines[i])
-    matcher = difflib.SequenceMatcher(None, correct_lines, submitted_lines)
-    score = matcher.ratio() * 100
+    score = similarity(correct_lines, submitted_lines) * 100
     
     # Save submitted code to team folder structure
     if username:
@@ -325,18 +563,22 @@ def submit_scrambled_code():
         try:
             with open(code_file, 'w') as f:
                 f.write(submitted_code)
+            index_submission('Round2', username, lang, os.path.relpath(code_file, UPLOAD_FOLDER), file_path,
+                             code=submitted_code)
         except Exception as e:
-            print(f"Error saving submitted code: {e}")
+            log_error('save_submission', f"Error saving submitted code: {e}")
         
         score_doc = {
             "username": username,
             "round_name": 'Scramble',
+            "lang": lang,
             "correct_answers": num_correct,
             "total_questions": num_attempted,
             "percentage": score,
             "timestamp": datetime.now()
         }
-        scores_collection.insert_one(score_doc)
+        score_buffer.add(score_doc)
+        leaderboard.record(score_doc)
     
     return jsonify({
         "team_name": username,
@@ -348,14 +590,32 @@ def submit_scrambled_code():
     })
 
 # Round 3: Code Debugging
+@app.route('/check_debug_code', methods=['POST'])
+def check_debug_code():
+    """Compile/run code with custom input before submitting"""
+    data = request.get_json()
+    code = data.get('code')
+    language = data.get('lang', 'py')
+    stdin = data.get('input', '')
+    username = data.get('username')
+    if not username:
+        return jsonify({"message": "Username is required"}), 400
+    if language not in LANGUAGES:
+        language = 'py'
+    try:
+        admission.admit('check', username)
+        # A cached result costs nothing, so it doesn't wait for a runner.
+        result = execution_cache.peek(run_key(code, language, stdin))
+        if result is None:
+            with admission.execution_slot('check'):
+                result = cached_execution.run(code, language, stdin)
+    except Overloaded as e:
+        return overloaded_response(e)
+    return jsonify(result)
+
 @app.route('/get_buggy_code_list', methods=['GET'])
 def get_buggy_code_list():
-    lang = request.args.get('lang', 'py')
-    dir_path = os.path.join(UPLOAD_FOLDER, 'debug', lang)
-    if not os.path.exists(dir_path):
-        return jsonify([])
-    files = [f for f in os.listdir(dir_path) if os.path.isfile(os.path.join(dir_path, f))]
-    return jsonify(files)
+    return problem_list_response('debug', request.args.get('lang', 'py'))
 
 @app.route('/get_buggy_code', methods=['GET'])
 def get_buggy_code():
@@ -363,10 +623,21 @@ def get_buggy_code():
     if not file_path:
         return jsonify({"error": "File path not provided"}), 400
     
-    full_path = os.path.join(UPLOAD_FOLDER, 'debug', file_path)
-    if not os.path.exists(full_path):
+    # The page asks for debug/<lang>/<file>, the same path it submits.
+    debug_root = os.path.abspath(os.path.join(UPLOAD_FOLDER, 'debug'))
+    relative = os.path.normpath(file_path)
+    if relative.split(os.sep)[0] == 'debug':
+        relative = os.path.relpath(relative, 'debug')
+    full_path = os.path.abspath(os.path.join(debug_root, relative))
+    if os.path.commonpath([full_path, debug_root]) != debug_root:
+        return jsonify({"error": "Invalid file path"}), 400
+    if not os.path.isfile(full_path):
         return jsonify({"error": f"File {file_path} not found. Admin needs to upload."}), 404
     
+    username = request.args.get('username')
+    if username:
+        round_sessions.start(username, 'Debugging')
+
     try:
         with open(full_path, 'r') as f:
             code = f.read()
@@ -376,7 +647,7 @@ def get_buggy_code():
 
 @app.route('/submit_debug_code', methods=['POST'])
 def submit_debug_code():
-    if not scores_collection:
+    if scores_collection is None:
         return jsonify({"message": "Database not available"}), 500
 
     data = request.get_json()
@@ -387,32 +658,44 @@ def submit_debug_code():
 
     if not file_path:
         return jsonify({"error": "File path not provided"}), 400
+    try:
+        admission.admit('submit', username or request.remote_addr)
+    except Overloaded as e:
+        return overloaded_response(e)
 
-    # --- 45 min time limit logic ---
-    # Find/create a start time for this team/round
-    time_limit_minutes = 45
+    # --- 45 min time limit, counted from the team's first fetch of the round ---
     now = datetime.now()
-    start_time = None
-    # Try to find the earliest submission for this team in Round3
-    prev = scores_collection.find_one({"username": username, "round_name": "Debugging"}, sort=[("timestamp", 1)])
-    if prev:
-        start_time = prev.get("timestamp")
-    else:
-        start_time = now
-    elapsed = (now - start_time).total_seconds() / 60.0
-    if elapsed > time_limit_minutes:
-        return jsonify({"message": f"Time limit exceeded ({time_limit_minutes} min). Submission not accepted."}), 403
-
-    # --- Test cases (expand as needed) ---
-    test_cases = [{'input': '10', 'expected_output': '20\n'}]
-    passed_tests = 0
-    total_tests = len(test_cases)
-    lang_map = {'py': 71, 'c': 50, 'cpp': 54, 'java': 62}
-    language_id = lang_map.get(language, 71)
-    for case in test_cases:
-        result = judge0_compile(submitted_code, language_id, case['input'])
-        if result.get('stdout', '') == case['expected_output']:
-            passed_tests += 1
+    refusal = round_deadline_error(username, 'Debugging', now)
+    if refusal:
+        return refusal
+    # Anonymous submissions are graded but not timed (nor saved).
+    elapsed = round_sessions.check(username, 'Debugging', now)[1] if username else 0.0
+
+    # --- Test cases: the problem's uploaded suite, streamed from disk ---
+    problem_lang, problem = os.path.split(os.path.normpath(file_path))
+    test_cases = test_suites.cases(os.path.basename(problem_lang) or language, problem)
+    if test_cases is None:
+        test_cases = DEFAULT_TEST_CASES
+
+    # Grading runs on the queue's worker threads; the client polls for the result.
+    try:
+        job_id = grading_queue.submit(grade_debug_submission, username, language, submitted_code,
+                                      test_cases, now, elapsed, file_path)
+    except QueueFull:
+        return jsonify({"message": "Grading queue is full. Please retry in a few seconds."}), 503, {'Retry-After': '5'}
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/grading_jobs/{job_id}",
+        "message": "Code submitted. Grading in progress."
+    }), 202
+
+def grade_debug_submission(username, language, submitted_code, test_cases, now, elapsed, problem=None):
+    """Grade a queued Round 3 submission, save it and record the score."""
+    run_language = language if language in LANGUAGES else 'py'
+    report = grade(cached_execution, submitted_code, run_language, test_cases, GRADING_CONCURRENCY)
+    passed_tests = report['passed_tests']
+    total_tests = report['total_tests']
 
     score = (passed_tests / total_tests) * 100 if total_tests else 0
 
@@ -425,28 +708,71 @@ def submit_debug_code():
         try:
             with open(code_file, 'w') as f:
                 f.write(submitted_code)
+            index_submission('Round3', username, language, os.path.relpath(code_file, UPLOAD_FOLDER), problem,
+                             code=submitted_code)
         except Exception as e:
-            print(f"Error saving submitted code: {e}")
+            log_error('save_submission', f"Error saving submitted code: {e}")
         score_doc = {
             "username": username,
             "round_name": 'Debugging',
+            "lang": language,
             "correct_answers": passed_tests,
             "total_questions": total_tests,
             "percentage": score,
             "timestamp": now,
             "time_taken_min": round(elapsed, 2)
         }
-        scores_collection.insert_one(score_doc)
+        score_buffer.add(score_doc)
+        leaderboard.record(score_doc)
 
-    return jsonify({
+    return {
         "team_name": username,
         "passed_tests": passed_tests,
         "total_tests": total_tests,
         "accuracy": f"{score:.2f}%",
         "score": score,
         "time_taken_min": round(elapsed, 2),
+        "cases": report['cases'],
+        "grading_time": report['grading_time'],
         "message": "Code submitted and tested successfully!"
-    })
+    }
+
+@app.route('/grading_jobs/<job_id>', methods=['GET'])
+def get_grading_job(job_id):
+    job = grading_queue.get(job_id)
+    if job is None:
+        return jsonify({"message": "Unknown or expired job id"}), 404
+    return jsonify(job), 200
+
+@app.route('/grading_jobs/<job_id>/events', methods=['GET'])
+def stream_grading_job(job_id):
+    """Server-Sent Events stream of a job's status until it finishes"""
+    job = grading_queue.get(job_id)
+    if job is None:
+        return jsonify({"message": "Unknown or expired job id"}), 404
+
+    def events(job):
+        while True:
+            yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+            if job['status'] in ('done', 'failed'):
+                return
+            last_status = job['status']
+            job = grading_queue.wait_for_change(job_id, last_status, timeout=15)
+            if job is None:
+                return
+            if job['status'] == last_status:
+                yield ": keep-alive\n\n"
+
+    return Response(events(job), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/round_session', methods=['GET'])
+def get_round_session():
+    """Server-side timer for a team's round: start time, limit and remaining seconds"""
+    username = request.args.get('username')
+    round_name = request.args.get('round')
+    if not username or not round_name:
+        return jsonify({"error": "username and round are required"}), 400
+    return jsonify(round_sessions.status(username, round_name)), 200
 
 @app.route('/submit_frontend', methods=['POST'])
 def submit_frontend():
@@ -468,29 +794,117 @@ def submit_frontend():
     file_path = os.path.join(UPLOAD_FOLDER, 'Round4', username, secure_filename)
 
     try:
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        file.save(file_path)
+        digest, _, blob_path = blob_store.put(file, file_path)
+        index_submission('Round4', username, 'N/A', os.path.relpath(file_path, UPLOAD_FOLDER), digest=digest)
+        if file_ext in IMAGE_EXTENSIONS:
+            thumbnails.submit(digest, blob_path)
         return jsonify({"message": "File uploaded successfully!"}), 200
     except Exception as e:
         return jsonify({"message": "Failed to save file", "error": str(e)}), 500
 
 # --- Admin Dashboard Endpoints ---
+# Paginated/exported listings: ?limit=&after_ts=&after_id= (or after_path) for
+# pages, ?team=&round=&lang= filters, ?format=json|ndjson|csv for streaming.
+MAX_PAGE_SIZE = 1000
+SCORE_FIELDS = ['_id', 'username', 'round_name', 'lang', 'correct_answers', 'total_questions',
+                'percentage', 'time_taken_min', 'timestamp']
+SUBMISSION_FIELDS = ['team_name', 'round_name', 'filename', 'language', 'file_path', 'problem', 'timestamp', 'size',
+                     'digest']
+
+def _page_limit():
+    """Page size for paginated requests, or None for a full listing."""
+    limit = request.args.get('limit', type=int)
+    if limit is None and (request.args.get('after_ts') or request.args.get('after_id')):
+        limit = 100
+    if limit is None:
+        return None
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def _listing_response(chunks, mimetype, name, fmt, headers=None):
+    headers = dict(headers or {})
+    if fmt in ('ndjson', 'csv'):
+        headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    return Response(chunks, mimetype=mimetype, headers=headers)
+
+def _serialize_score(score):
+    score['_id'] = str(score['_id'])
+    if hasattr(score.get('timestamp'), 'strftime'):
+        score['timestamp'] = score['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
+    return score
+
 @app.route('/admin/scores', methods=['GET'])
 def get_admin_scores():
     if scores_collection is None:
         return jsonify({"message": "Database not available"}), 500
-        
+
+    fmt = request.args.get('format', 'json')
+    if fmt not in STREAM_FORMATS:
+        return jsonify({"message": f"Unsupported format: {fmt}"}), 400
+    query = {}
+    for param, field in (('team', 'username'), ('round', 'round_name'), ('lang', 'lang')):
+        if request.args.get(param):
+            query[field] = request.args.get(param)
     try:
-        scores = list(scores_collection.find().sort("timestamp", -1))
-        # Convert ObjectId and datetime to string for JSON serialization
-        for score in scores:
-            score['_id'] = str(score['_id'])
-            score['timestamp'] = score['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
-        return jsonify(scores), 200
+        if request.args.get('after_ts'):
+            after_ts = datetime.fromisoformat(request.args['after_ts'])
+            if request.args.get('after_id'):
+                after_id = ObjectId(request.args['after_id'])
+                query['$or'] = [{"timestamp": {"$lt": after_ts}},
+                                {"timestamp": after_ts, "_id": {"$lt": after_id}}]
+            else:
+                query['timestamp'] = {"$lt": after_ts}
+    except (ValueError, InvalidId):
+        return jsonify({"message": "Invalid after_ts/after_id cursor"}), 400
+
+    try:
+        cursor = scores_collection.find(query).sort([("timestamp", -1), ("_id", -1)])
+        limit = _page_limit()
+        if limit is None:
+            # Full listing: rows are encoded as they come off the cursor.
+            chunks, mimetype = encode_rows((_serialize_score(s) for s in cursor.batch_size(500)), fmt, SCORE_FIELDS)
+            return _listing_response(chunks, mimetype, 'scores', fmt)
+
+        scores = list(cursor.limit(limit))
+        next_cursor = None
+        if len(scores) == limit and hasattr(scores[-1].get('timestamp'), 'isoformat'):
+            next_cursor = {"after_ts": scores[-1]['timestamp'].isoformat(), "after_id": str(scores[-1]['_id'])}
+        scores = [_serialize_score(s) for s in scores]
+        if fmt == 'json':
+            return jsonify({"items": scores, "next_cursor": next_cursor}), 200
+        chunks, mimetype = encode_rows(scores, fmt, SCORE_FIELDS)
+        headers = {'X-Next-Cursor': json.dumps(next_cursor)} if next_cursor else None
+        return _listing_response(chunks, mimetype, 'scores', fmt, headers)
     except Exception as e:
         return jsonify({"message": "Failed to retrieve scores", "error": str(e)}), 500
 
+@app.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """Per-team best/latest score per round and weighted total, ranked"""
+    if leaderboard is None:
+        return jsonify({"message": "Database not available"}), 500
+    try:
+        return Response(leaderboard.json(), mimetype='application/json')
+    except Exception as e:
+        return jsonify({"message": "Failed to build leaderboard", "error": str(e)}), 500
+
 # --- Student Score Viewing Endpoint ---
+# Only the columns the student score table shows.
+STUDENT_SCORE_FIELDS = {
+    "username": 1, "round_name": 1, "correct_answers": 1, "total_questions": 1,
+    "percentage": 1, "timestamp": 1, "time_taken_min": 1
+}
+
+def with_pending_scores(username, scores):
+    """Add the team's scores still in the write-behind buffer, newest first."""
+    if score_buffer is None:
+        return scores
+    seen = {score['_id'] for score in scores}
+    pending = [{field: doc[field] for field in ('_id', *STUDENT_SCORE_FIELDS) if field in doc}
+               for doc in score_buffer.pending(username) if doc['_id'] not in seen]
+    if not pending:
+        return scores
+    return sorted(scores + pending, key=lambda score: score['timestamp'], reverse=True)
+
 @app.route('/student/scores', methods=['GET'])
 def get_student_scores():
     if scores_collection is None:
@@ -502,7 +916,8 @@ def get_student_scores():
     
     try:
         # Get all scores for this student
-        scores = list(scores_collection.find({"username": username}).sort("timestamp", -1))
+        scores = list(scores_collection.find({"username": username}, STUDENT_SCORE_FIELDS).sort("timestamp", -1))
+        scores = with_pending_scores(username, scores)
         
         # Convert ObjectId and datetime to string for JSON serialization
         for score in scores:
@@ -513,19 +928,92 @@ def get_student_scores():
     except Exception as e:
         return jsonify({"message": "Failed to retrieve scores", "error": str(e)}), 500
 
+@app.route('/admin/grading_queue', methods=['GET'])
+def get_grading_queue_stats():
+    """Queue depth plus recent wait and run times of Round 3 grading jobs"""
+    return jsonify(grading_queue.stats()), 200
+
+@app.route('/admin/execution_cache', methods=['GET'])
+def get_execution_cache_stats():
+    """Hit/miss counters of the shared Round 3 result cache"""
+    return jsonify(execution_cache.stats()), 200
+
+@app.route('/admin/admission', methods=['GET'])
+def get_admission_stats():
+    """Admitted and refused execution requests per endpoint, and runner slots in use"""
+    return jsonify(admission.stats()), 200
+
+@app.route('/admin/score_buffer', methods=['GET'])
+def get_score_buffer_stats():
+    """Scores waiting for MongoDB, batches written and journal size"""
+    if score_buffer is None:
+        return jsonify({"message": "Database not available"}), 500
+    return jsonify(score_buffer.stats()), 200
+
+@app.route('/admin/login_cache', methods=['GET'])
+def get_login_cache_stats():
+    """Size and hit rate of the in-process credential cache"""
+    return jsonify(credential_cache.stats()), 200
+
+# --- Metrics & Profiling ---
+REGISTRY.register(Gauge(
+    'grading_queue_jobs', 'Round 3 grading jobs waiting or running.',
+    lambda: {('queued',): grading_queue.stats()['queue_depth'], ('running',): grading_queue.stats()['running']},
+    ('state',)))
+REGISTRY.register(Gauge(
+    'execution_cache_lookups_total', 'Result cache lookups by outcome.',
+    lambda: {(outcome,): execution_cache.stats()[outcome] for outcome in ('hits', 'misses', 'shared_in_flight')},
+    ('outcome',), kind='counter'))
+REGISTRY.register(Gauge(
+    'admission_requests_total', 'Execution requests by endpoint and admission outcome.',
+    admission.counts,
+    ('endpoint', 'outcome'), kind='counter'))
+REGISTRY.register(Gauge(
+    'execution_slots', 'Runs executing on the request, and requests waiting for a slot.',
+    lambda: {('active',): admission.limiter.active, ('waiting',): admission.limiter.waiting},
+    ('state',)))
+REGISTRY.register(Gauge(
+    'score_buffer_pending', 'Score documents journaled but not yet written to MongoDB.',
+    lambda: score_buffer.stats()['pending'] if score_buffer is not None else None))
+REGISTRY.register(Gauge(
+    'login_cache_lookups_total', 'Credential cache lookups by outcome.',
+    lambda: {(outcome,): credential_cache.stats()[outcome] for outcome in ('hits', 'misses')},
+    ('outcome',), kind='counter'))
+profiler = SamplingProfiler()
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of the app's histograms and counters"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/admin/profiler', methods=['GET', 'POST'])
+def admin_profiler():
+    """Start/stop the sampling profiler (POST) or read its stacks (GET, format=collapsed for flame graphs)"""
+    if request.method == 'POST':
+        data = request.get_json() or {}
+        action = data.get('action')
+        if action == 'start':
+            interval_ms = min(max(int(data.get('interval_ms', 10)), 1), 1000)
+            if not profiler.start(interval_ms / 1000):
+                return jsonify({"message": "Profiler is already running"}), 409
+        elif action == 'stop':
+            profiler.stop()
+        else:
+            return jsonify({"message": "action must be 'start' or 'stop'"}), 400
+        return jsonify(profiler.status()), 200
+
+    if request.args.get('format') == 'collapsed':
+        return Response(profiler.collapsed(), mimetype='text/plain')
+    status = profiler.status()
+    status['top_stacks'] = profiler.collapsed(limit=request.args.get('limit', 20, type=int)).splitlines()
+    return jsonify(status), 200
+
 @app.route('/admin/questions', methods=['GET'])
 def get_admin_questions():
-    file_path = os.path.join(UPLOAD_FOLDER, 'mcq', 'questions.xlsx')
-    if not os.path.exists(file_path):
-        return jsonify({"error": "questions.xlsx not found"}), 404
     try:
-        wb = load_workbook(file_path)
-        ws = wb.active
-        headers = [cell.value for cell in ws[1]]
-        questions = []
-        for row in ws.iter_rows(min_row=2, values_only=False):
-            question = {headers[i]: row[i].value for i in range(len(headers))}
-            questions.append(question)
+        questions = question_bank.all()
+        if questions is None:
+            return jsonify({"error": "questions.xlsx not found"}), 404
         return jsonify(questions)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -536,20 +1024,24 @@ def delete_all_scores():
         return jsonify({"message": "Database not available"}), 500
         
     try:
+        score_buffer.clear()
         scores_collection.delete_many({})
+        leaderboard.invalidate()
+        # Round timers used to be derived from scores; a reset restarts them too.
+        round_sessions.collection.delete_many({})
+        round_sessions.clear()
         return jsonify({"message": "All scores deleted successfully."}), 200
     except Exception as e:
         return jsonify({"message": "Failed to delete scores", "error": str(e)}), 500
 
 @app.route('/admin/code_questions', methods=['GET'])
 def get_admin_code_files():
-    round_name = request.args.get('round')
-    lang = request.args.get('lang')
-    path = os.path.join(UPLOAD_FOLDER, round_name, lang)
-    if not os.path.exists(path):
-        return jsonify([])
-    files = [f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))]
-    return jsonify(files)
+    return problem_list_response(request.args.get('round'), request.args.get('lang'))
+
+@app.route('/admin/problem_catalog', methods=['GET'])
+def get_problem_catalog():
+    """Every Round 2/3 problem file with its size and SHA-256, by round/lang"""
+    return jsonify({"directories": problem_catalog.snapshot(), "stats": problem_catalog.stats()}), 200
 
 @app.route('/admin/code_content', methods=['GET'])
 def get_admin_code_content():
@@ -566,67 +1058,175 @@ def get_admin_code_content():
     except Exception as e:
         return f"Error reading file: {e}", 500
 
+@app.route('/admin/scramble_variant', methods=['GET'])
+def get_scramble_variant():
+    """The Round 2 puzzle a team was served for a file (for disputes)"""
+    file_path = request.args.get('file')
+    team = request.args.get('team')
+    if not file_path or not team:
+        return jsonify({"message": "file and team are required"}), 400
+    full_path = scramble_file(file_path)
+    if full_path is None:
+        return jsonify({"message": "Invalid file path"}), 400
+    try:
+        variant = json.loads(scramble_variants.variant(full_path, team))
+    except FileNotFoundError:
+        return jsonify({"message": f"File {file_path} not found"}), 404
+    return jsonify({"team": team, "file": file_path, **variant}), 200
+
+# Accept either the folder name or the display name in ?round=.
+SUBMISSION_ROUND_FOLDERS = {name: folder for folder, name in SUBMISSION_ROUNDS.items()}
+
+def _micros_to_iso(micros):
+    return datetime.fromtimestamp(micros // 1_000_000).replace(microsecond=micros % 1_000_000).isoformat()
+
+def _iso_to_micros(value):
+    moment = datetime.fromisoformat(value)
+    return int(moment.timestamp()) * 1_000_000 + moment.microsecond
+
 @app.route('/admin/submissions', methods=['GET'])
 def get_admin_submissions():
-    """Get all student submissions organized by team and round"""
+    """Get student submissions (newest first), optionally filtered and paginated"""
+    fmt = request.args.get('format', 'json')
+    if fmt not in STREAM_FORMATS:
+        return jsonify({"message": f"Unsupported format: {fmt}"}), 400
     try:
-        submissions = []
-        rounds = {
-            'Round2': 'Code Scramble',
-            'Round3': 'Code Debugging',
-            'Round4': 'Frontend Challenge'
-        }
-        
-        for round_folder, round_name in rounds.items():
-            round_path = os.path.join(UPLOAD_FOLDER, round_folder)
-            if not os.path.exists(round_path):
-                continue
-                
-            # List all team folders in this round
-            for team_name in os.listdir(round_path):
-                team_path = os.path.join(round_path, team_name)
-                if not os.path.isdir(team_path):
-                    continue
-                
-                # List all language folders or files for this team
-                for item in os.listdir(team_path):
-                    item_path = os.path.join(team_path, item)
-                    
-                    if os.path.isdir(item_path):
-                        # It's a language folder (e.g., 'c', 'py', 'cpp')
-                        for filename in os.listdir(item_path):
-                            file_path = os.path.join(item_path, filename)
-                            if os.path.isfile(file_path):
-                                stat_info = os.stat(file_path)
-                                submissions.append({
-                                    'team_name': team_name,
-                                    'round_name': round_name,
-                                    'filename': filename,
-                                    'language': item,
-                                    'file_path': os.path.join(round_folder, team_name, item, filename),
-                                    'timestamp': datetime.fromtimestamp(stat_info.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                                    'size': stat_info.st_size
-                                })
-                    else:
-                        # It's a file directly in the team folder
-                        stat_info = os.stat(item_path)
-                        submissions.append({
-                            'team_name': team_name,
-                            'round_name': round_name,
-                            'filename': item,
-                            'language': 'N/A',
-                            'file_path': os.path.join(round_folder, team_name, item),
-                            'timestamp': datetime.fromtimestamp(stat_info.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                            'size': stat_info.st_size
-                        })
-        
-        # Sort by timestamp (newest first)
-        submissions.sort(key=lambda x: x['timestamp'], reverse=True)
-        return jsonify(submissions), 200
-        
+        after = None
+        if request.args.get('after_ts'):
+            after = (_iso_to_micros(request.args['after_ts']), request.args.get('after_path', ''))
+    except ValueError:
+        return jsonify({"message": "Invalid after_ts cursor"}), 400
+
+    round_filter = request.args.get('round')
+    round_folder = SUBMISSION_ROUND_FOLDERS.get(round_filter, round_filter)
+
+    try:
+        limit = _page_limit()
+        files = submission_index.query(round_folder, request.args.get('team'), request.args.get('lang'),
+                                       after=after if limit is not None else None, limit=limit)
+        if limit is None:
+            if fmt == 'json':
+                return jsonify([record for _, record in files]), 200
+            chunks, mimetype = encode_rows((record for _, record in files), fmt, SUBMISSION_FIELDS)
+            return _listing_response(chunks, mimetype, 'submissions', fmt)
+
+        page = list(files)
+        next_cursor = None
+        if len(page) == limit:
+            next_cursor = {"after_ts": _micros_to_iso(page[-1][0]), "after_path": page[-1][1]['file_path']}
+        submissions = [record for _, record in page]
+        if fmt == 'json':
+            return jsonify({"items": submissions, "next_cursor": next_cursor}), 200
+        chunks, mimetype = encode_rows(submissions, fmt, SUBMISSION_FIELDS)
+        headers = {'X-Next-Cursor': json.dumps(next_cursor)} if next_cursor else None
+        return _listing_response(chunks, mimetype, 'submissions', fmt, headers)
+
     except Exception as e:
         return jsonify({"message": "Failed to retrieve submissions", "error": str(e)}), 500
 
+# Problems are stored by their file under uploads: scramble/... or debug/...
+SIMILARITY_ROUND_PREFIXES = {'Round2': 'scramble/', 'Round3': 'debug/'}
+
+@app.route('/admin/similarity_clusters', methods=['GET'])
+def get_similarity_clusters():
+    """Groups of teams with near-identical Round 2/3 submissions, per problem"""
+    round_filter = request.args.get('round')
+    round_folder = SUBMISSION_ROUND_FOLDERS.get(round_filter, round_filter)
+    if round_folder is not None and round_folder not in SIMILARITY_ROUND_PREFIXES:
+        return jsonify({"message": "round must be Round2 or Round3"}), 400
+    try:
+        threshold = float(request.args.get('threshold', 0.7))
+    except ValueError:
+        return jsonify({"message": "threshold must be a number"}), 400
+    if not 0 < threshold <= 1:
+        return jsonify({"message": "threshold must be in (0, 1]"}), 400
+
+    started = time.perf_counter()
+    indexed = similarity_index.problems()
+    prefix = SIMILARITY_ROUND_PREFIXES.get(round_folder, '')
+    selected = [problem for problem in indexed if problem.startswith(prefix)]
+    if request.args.get('problem'):
+        selected = [problem for problem in selected if problem == request.args['problem']]
+    clusters = similarity_index.clusters(selected, threshold)
+    return jsonify({
+        "threshold": threshold,
+        "problems": [{"problem": problem, "indexed": indexed.get(problem, 0), "clusters": found}
+                     for problem, found in sorted(clusters.items()) if found],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }), 200
+
+def _score_lines(query, last_id):
+    """scores.ndjson of the export, straight off the cursor (oldest first, so the bytes are stable)."""
+    if last_id is None:
+        return
+    cursor = scores_collection.find({**query, "_id": {"$lte": last_id}}).sort("_id", 1).batch_size(500)
+    for line in ndjson(_serialize_score(score) for score in cursor):
+        yield line.encode('utf-8')
+
+def _scores_entry(query):
+    """Archive entry for the scores; one pass over the cursor for its size and CRC.
+
+    Both passes stop at the newest _id seen now, so scores inserted while the
+    archive streams can't change its size; that _id is part of the ETag.
+    """
+    last = scores_collection.find_one(query, {"_id": 1}, sort=[("_id", -1)])
+    last_id = last['_id'] if last else None
+    size = crc = 0
+    for line in _score_lines(query, last_id):
+        size += len(line)
+        crc = zlib.crc32(line, crc)
+    newest = scores_collection.find_one(query, {"timestamp": 1}, sort=[("timestamp", -1)])
+    mtime = newest['timestamp'].timestamp() if newest and hasattr(newest.get('timestamp'), 'timestamp') else 0
+    return Entry('scores.ndjson', size, mtime, lambda: _score_lines(query, last_id), crc, version=str(last_id))
+
+@app.route('/admin/export', methods=['GET'])
+def export_submissions():
+    """Zip of the Round 2-4 submission files and scores.ndjson, streamed; resumable with Range"""
+    round_filter = request.args.get('round')
+    round_folder = SUBMISSION_ROUND_FOLDERS.get(round_filter, round_filter)
+    if round_folder is not None and round_folder not in SUBMISSION_ROUNDS:
+        return jsonify({"message": f"Unknown round: {round_filter}"}), 400
+    team = request.args.get('team')
+    if team is not None and (team != os.path.basename(team) or team.startswith('.')):
+        return jsonify({"message": "Invalid team"}), 400
+
+    entries = []
+    if scores_collection is not None and request.args.get('scores') != '0':
+        if score_buffer is not None:
+            score_buffer.flush()  # journaled scores belong in the archive too
+        entries.append(_scores_entry({"username": team} if team else {}))
+    for folder in ([round_folder] if round_folder else sorted(SUBMISSION_ROUNDS)):
+        root = os.path.join(UPLOAD_FOLDER, folder, team) if team else os.path.join(UPLOAD_FOLDER, folder)
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                full_path = os.path.join(dir_path, file_name)
+                name = os.path.relpath(full_path, UPLOAD_FOLDER).replace(os.sep, '/')
+                entries.append(file_entry(name, full_path, os.stat(full_path)))
+    try:
+        archive = StoredZip(entries)
+    except ArchiveTooLarge as e:
+        return jsonify({"message": str(e)}), 413
+
+    etag = fingerprint(entries)
+    team_part = ''.join(c if c.isalnum() or c in '-_' else '_' for c in team or '')
+    filename = '_'.join(part for part in ('contest_export', round_folder, team_part) if part)
+    headers = {'Accept-Ranges': 'bytes', 'Cache-Control': 'no-cache',
+               'Content-Disposition': f'attachment; filename={filename}.zip'}
+    start, stop, status = 0, archive.size, 200
+    if_range = request.if_range
+    if request.range is not None and (if_range.etag == etag or (if_range.etag is None and if_range.date is None)):
+        byte_range = request.range.range_for_length(archive.size)
+        if byte_range is None:
+            return Response(status=416, headers={'Content-Range': f'bytes */{archive.size}'})
+        start, stop = byte_range
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{archive.size}'
+    response = Response(archive.stream(start, stop), status=status, mimetype='application/zip', headers=headers)
+    response.headers['Content-Length'] = str(stop - start)
+    response.set_etag(etag)
+    return response
+
 @app.route('/admin/submission_content', methods=['GET'])
 def get_submission_content():
     """Get the content of a specific submission file"""
@@ -651,7 +1251,26 @@ def get_submission_content():
     except Exception as e:
         return jsonify({"error": f"Error reading file: {e}"}), 500
 
+@app.route('/admin/submission_thumbnail', methods=['GET'])
+def get_submission_thumbnail():
+    """Small preview of an image submission (the full image until the preview is made)"""
+    file_path = request.args.get('file_path')
+    if not file_path:
+        return jsonify({"error": "File path not provided"}), 400
+    if os.path.splitext(file_path)[1].lower() not in IMAGE_EXTENSIONS:
+        return jsonify({"error": "Not an image submission"}), 404
+    full_path = os.path.join(UPLOAD_FOLDER, file_path)
+    if not os.path.exists(full_path):
+        return jsonify({"error": "File not found"}), 404
+
+    digest = submission_index.digest(file_path)
+    thumb = thumbnails.get(digest) if digest else None
+    if thumb is not None:
+        return send_from_directory(os.path.dirname(thumb), os.path.basename(thumb), max_age=3600)
+    if digest:
+        thumbnails.submit(digest, full_path)
+    return send_from_directory(os.path.dirname(full_path), os.path.basename(full_path))
+
 if __name__ == '__main__':
     port=int(os.environ.get("Port",8000))
-    init_db()
     app.run(debug=True, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,263 @@
+"""Optional ASGI entry point (async serving mode).
+
+The Flask app in app.py keeps working unchanged under gunicorn. This module
+wraps it for an ASGI server and serves the endpoints that spend their time
+waiting on I/O natively, on the event loop, so a slow run or a long-lived
+stream does not pin a worker thread:
+
+    POST /check_debug_code           Judge0 over a pooled async HTTP client
+    GET  /grading_jobs/<id>          polled every second by each team
+    GET  /grading_jobs/<id>/events   Server-Sent Events
+    GET  /student/scores             Motor, when talking to a real mongod
+    GET  /leaderboard
+
+Every other route falls through to the Flask app on a thread pool. State
+(caches, grading queue, round sessions) is the same objects app.py uses, so
+run one process:
+
+    pip install -r requirements-asgi.txt
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import contextlib
+import json
+import os
+import random
+import time
+
+import httpx
+from a2wsgi import WSGIMiddleware
+from pymongo.collection import Collection
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as core
+from admission import Overloaded
+from executor import LANGUAGES, Judge0Backend
+from metrics import EXECUTIONS, HTTP_REQUESTS
+from result_cache import run_key
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:
+    AsyncIOMotorClient = None
+
+# Threads for the Flask routes (the WSGI adapter's pool).
+WSGI_THREADS = 32
+# How often waiting handlers re-check shared state, in seconds.
+POLL_INTERVAL = 0.1
+# Open Judge0 connections; async requests don't hold a thread, so this can
+# be far above the sync backend's worker count.
+JUDGE0_CONNECTIONS = int(os.environ.get('JUDGE0_ASYNC_CONNECTIONS', 256))
+
+
+class AsyncJudge0Client:
+    """Async twin of Judge0Backend.run() with the same pooling, retry and result shape."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        limits = httpx.Limits(max_connections=JUDGE0_CONNECTIONS, max_keepalive_connections=JUDGE0_CONNECTIONS)
+        self.client = httpx.AsyncClient(base_url=backend.base_url, timeout=backend.timeout, limits=limits)
+
+    async def _request(self, method, path, **kwargs):
+        backend = self.backend
+        for attempt in range(backend.retries + 1):
+            try:
+                resp = await self.client.request(method, path, **kwargs)
+            except httpx.TransportError:
+                if attempt == backend.retries:
+                    raise
+                await asyncio.sleep(random.uniform(0, backend.backoff * (2 ** attempt)))
+                continue
+            if resp.status_code not in backend.RETRY_STATUSES or attempt == backend.retries:
+                return resp
+            await asyncio.sleep(backend._retry_delay(attempt, resp))
+        return resp
+
+    async def run(self, source_code, language, stdin=None):
+        with EXECUTIONS.time(backend='judge0', operation='run_async', language=language):
+            return await self._run(source_code, language, stdin)
+
+    async def _run(self, source_code, language, stdin):
+        try:
+            resp = await self._request('POST', "/submissions/?base64_encoded=false&wait=true",
+                                       json=self.backend._payload(source_code, language, stdin))
+            if resp.status_code == 201:
+                return self.backend._result(resp.json())
+            return {"error": f"Judge0 error: {resp.status_code}"}
+        except Exception as e:
+            return {"error": str(e)}
+
+
+judge0 = AsyncJudge0Client(core.execution_backend) if isinstance(core.execution_backend, Judge0Backend) else None
+
+motor_scores = None
+if AsyncIOMotorClient is not None and isinstance(core.scores_collection, Collection):
+    motor_scores = AsyncIOMotorClient(core.MONGO_URI)[core.DB_NAME][core.SCORES_COLLECTION_NAME]
+
+
+async def _wait(pending):
+    while not pending.done.is_set():
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def _cached_run(code, language, stdin):
+    """core.cached_execution.run() without blocking the event loop."""
+    if judge0 is None:
+        # Local runs are CPU-bound; keep them off the loop.
+        return await run_in_threadpool(core.cached_execution.run, code, language, stdin)
+    cache = core.execution_cache
+    key = run_key(code, language, stdin)
+    state, value = cache.claim(key)
+    if state == 'hit':
+        return value
+    if state == 'wait':
+        await _wait(value)
+        if value.result is not None:
+            return value.result
+        return await judge0.run(code, language, stdin)
+    result = None
+    try:
+        result = await judge0.run(code, language, stdin)
+        return result
+    finally:
+        cache.complete(key, value, result)
+
+
+async def check_debug_code(request):
+    data = await request.json()
+    code = data.get('code')
+    language = data.get('lang', 'py')
+    stdin = data.get('input', '')
+    username = data.get('username')
+    if not username:
+        return JSONResponse({"message": "Username is required"}, status_code=400)
+    if language not in LANGUAGES:
+        language = 'py'
+    admission = core.admission
+    try:
+        if admission.buckets['check'].shared:
+            # A MongoDB round-trip; keep it off the loop.
+            await run_in_threadpool(admission.admit, 'check', username)
+        else:
+            admission.admit('check', username)
+        result = core.execution_cache.peek(run_key(code, language, stdin))
+        if result is None:
+            await admission.acquire_async('check')
+            try:
+                result = await _cached_run(code, language, stdin)
+            finally:
+                admission.limiter.release()
+    except Overloaded as e:
+        return JSONResponse({"message": e.message, "retry_after": e.retry_after}, status_code=429,
+                            headers=e.headers)
+    return JSONResponse(result)
+
+
+async def get_grading_job(request):
+    job = core.grading_queue.get(request.path_params['job_id'])
+    if job is None:
+        return JSONResponse({"message": "Unknown or expired job id"}, status_code=404)
+    return JSONResponse(job)
+
+
+async def stream_grading_job(request):
+    job_id = request.path_params['job_id']
+    job = core.grading_queue.get(job_id)
+    if job is None:
+        return JSONResponse({"message": "Unknown or expired job id"}, status_code=404)
+
+    async def events(job):
+        while True:
+            yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+            if job['status'] in ('done', 'failed'):
+                return
+            last_status = job['status']
+            waited = 0.0
+            while True:
+                await asyncio.sleep(POLL_INTERVAL)
+                waited += POLL_INTERVAL
+                job = core.grading_queue.get(job_id)
+                if job is None:
+                    return
+                if job['status'] != last_status:
+                    break
+                if waited >= 15:
+                    yield ": keep-alive\n\n"
+                    waited = 0.0
+
+    return StreamingResponse(events(job), media_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+async def get_student_scores(request):
+    if core.scores_collection is None:
+        return JSONResponse({"message": "Database not available"}, status_code=500)
+    username = request.query_params.get('username')
+    if not username:
+        return JSONResponse({"message": "Username is required"}, status_code=400)
+    try:
+        query = {"username": username}
+        if motor_scores is not None:
+            cursor = motor_scores.find(query, core.STUDENT_SCORE_FIELDS).sort("timestamp", -1)
+            scores = await cursor.to_list(length=None)
+        else:
+            scores = await run_in_threadpool(
+                lambda: list(core.scores_collection.find(query, core.STUDENT_SCORE_FIELDS).sort("timestamp", -1)))
+        scores = core.with_pending_scores(username, scores)
+        for score in scores:
+            score['_id'] = str(score['_id'])
+            score['timestamp'] = score['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
+        return JSONResponse(scores)
+    except Exception as e:
+        return JSONResponse({"message": "Failed to retrieve scores", "error": str(e)}, status_code=500)
+
+
+async def get_leaderboard(request):
+    if core.leaderboard is None:
+        return JSONResponse({"message": "Database not available"}, status_code=500)
+    try:
+        # Usually a cached string; a rebuild runs the aggregation, so off the loop.
+        return Response(await run_in_threadpool(core.leaderboard.json), media_type='application/json')
+    except Exception as e:
+        return JSONResponse({"message": "Failed to build leaderboard", "error": str(e)}, status_code=500)
+
+
+def timed(path, endpoint):
+    """Record a native route in the same per-route histogram as the Flask routes."""
+    async def handler(request):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await endpoint(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_REQUESTS.observe(time.perf_counter() - start, method=request.method, route=path, status=status)
+    return handler
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    if judge0 is not None:
+        await judge0.client.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route('/check_debug_code', timed('/check_debug_code', check_debug_code), methods=['POST']),
+        Route('/grading_jobs/{job_id}', timed('/grading_jobs/<job_id>', get_grading_job), methods=['GET']),
+        Route('/grading_jobs/{job_id}/events', timed('/grading_jobs/<job_id>/events', stream_grading_job),
+              methods=['GET']),
+        Route('/student/scores', timed('/student/scores', get_student_scores), methods=['GET']),
+        Route('/leaderboard', timed('/leaderboard', get_leaderboard), methods=['GET']),
+        Mount('/', app=WSGIMiddleware(core.app, workers=WSGI_THREADS)),
+    ],
+    # Same policy as flask_cors in app.py; answers preflights for the native routes.
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
@@ -0,0 +1,131 @@
+"""Benchmark: latency of the app's user/score queries with and without indexes.
+
+Seeds a scratch database with 100k score documents (and one user and one
+round session per team and round), times each hot query against bare
+collections, creates the indexes from indexes.py, and times them again. Needs a real mongod:
+
+    cd backend && MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_score_queries.py
+
+The scratch database (default coding_challenge_bench) is dropped at the end.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pymongo import MongoClient, UpdateOne  # noqa: E402
+
+from indexes import ensure_indexes  # noqa: E402
+from leaderboard import LeaderboardCache  # noqa: E402
+
+ROUNDS = ['MCQ', 'Scramble', 'Debugging']
+FLUSH_BATCH = 20  # sessions per round_sessions flush
+
+
+def seed(db, documents, teams, rng):
+    db.users.insert_many([
+        {"username": f"team{t:04d}", "password": "pw", "role": "student", "created_at": datetime.now()}
+        for t in range(teams)
+    ])
+    start = datetime.now() - timedelta(hours=3)
+    batch = []
+    for i in range(documents):
+        batch.append({
+            "username": f"team{rng.randrange(teams):04d}",
+            "round_name": rng.choice(ROUNDS),
+            "correct_answers": rng.randrange(10),
+            "total_questions": 10,
+            "percentage": rng.random() * 100,
+            "timestamp": start + timedelta(seconds=i * 0.1),
+        })
+        if len(batch) == 10000:
+            db.scores.insert_many(batch)
+            batch = []
+    if batch:
+        db.scores.insert_many(batch)
+    db.round_sessions.insert_many([
+        {"username": f"team{t:04d}", "round_name": name, "started_at": start}
+        for t in range(teams) for name in ROUNDS
+    ])
+
+
+def queries(db, teams, rng):
+    """The read paths of app.py, each with the projection the app uses."""
+    def team():
+        return f"team{rng.randrange(teams):04d}"
+
+    def session_flush():
+        # RoundSessions.flush(): one $min upsert per dirty session.
+        db.round_sessions.bulk_write([
+            UpdateOne({"username": team(), "round_name": rng.choice(ROUNDS)},
+                      {"$min": {"started_at": datetime.now()}}, upsert=True)
+            for _ in range(FLUSH_BATCH)
+        ], ordered=False)
+
+    pipeline = LeaderboardCache(db.scores, {name: 1.0 for name in ROUNDS})._pipeline()
+    return {
+        "student_login": lambda: db.users.find_one({"username": team(), "role": "student"}, {"password": 1}),
+        "session_flush": session_flush,
+        "leaderboard": lambda: list(db.scores.aggregate(pipeline, allowDiskUse=True)),
+        "student_scores": lambda: list(db.scores.find(
+            {"username": team()},
+            {"round_name": 1, "correct_answers": 1, "total_questions": 1, "percentage": 1, "timestamp": 1},
+        ).sort("timestamp", -1)),
+        "admin_team_round": lambda: list(db.scores.find(
+            {"username": team(), "round_name": rng.choice(ROUNDS)}
+        ).sort([("timestamp", -1), ("_id", -1)]).limit(100)),
+        "admin_scores_page": lambda: list(db.scores.find().sort([("timestamp", -1), ("_id", -1)]).limit(100)),
+    }
+
+
+def measure(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--uri', default=os.environ.get('MONGO_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--db', default='coding_challenge_bench')
+    parser.add_argument('--documents', type=int, default=100_000)
+    parser.add_argument('--teams', type=int, default=300)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    client = MongoClient(args.uri)
+    client.drop_database(args.db)
+    db = client[args.db]
+    try:
+        print(f"Seeding {args.documents} scores for {args.teams} teams...")
+        seed(db, args.documents, args.teams, rng)
+
+        results = {}
+        for phase in ('no indexes', 'indexed'):
+            if phase == 'indexed':
+                ensure_indexes(db.users, db.scores, db.round_sessions)
+            for name, fn in queries(db, args.teams, rng).items():
+                fn()  # warm up
+                results.setdefault(name, {})[phase] = measure(fn, args.iterations)
+
+        print(f"\n{'query':<20} | {'no indexes p50/p95 ms':>22} | {'indexed p50/p95 ms':>19}")
+        print('-' * 68)
+        for name, phases in results.items():
+            bare, indexed = phases['no indexes'], phases['indexed']
+            print(f"{name:<20} | {bare[0]:>10.2f} / {bare[1]:>9.2f} | {indexed[0]:>8.2f} / {indexed[1]:>8.2f}")
+    finally:
+        client.drop_database(args.db)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Micro-benchmark: Round 2 scoring with difflib vs. the bit-parallel LCS scorer.
+
+Generates synthetic C-like programs full of repeated lines ("{", "}",
+"return 0;"), puts a fraction of them back in order the way a team would,
+and reports the time and score of both scorers for each size and fraction.
+
+    cd backend && python benchmarks/bench_scramble_score.py [--sizes 100 1000 5000]
+"""
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scramble import lcs_length, similarity  # noqa: E402
+
+REPEATED = ['{', '}', 'return 0;', 'break;', 'i++;', '}', '}', 'else {']
+
+
+def make_program(size, rng):
+    lines = []
+    for i in range(size):
+        if rng.random() < 0.4:
+            lines.append(rng.choice(REPEATED))
+        else:
+            lines.append(f"x{rng.randrange(size // 4 + 1)} = y{i % 50} + {rng.randrange(100)};")
+    return lines
+
+
+def team_attempt(reference, rng, fixed_fraction=0.7):
+    """Shuffle the reference, then put a fraction of lines back in order."""
+    submitted = list(reference)
+    rng.shuffle(submitted)
+    keep = int(len(reference) * fixed_fraction)
+    return list(reference[:keep]) + submitted[keep:]
+
+
+def lcs_dp(a, b):
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def timed(fn, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return value, best
+
+
+def difflib_ratio(a, b):
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 1000, 2000, 5000])
+    parser.add_argument('--fixed', type=float, nargs='+', default=[0.0, 0.5, 0.9],
+                        help="fraction of lines the simulated team put back in order")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    # Exactness check of the bit-parallel LCS against the textbook DP.
+    for _ in range(200):
+        a = [rng.choice('abc}{') for _ in range(rng.randrange(40))]
+        b = [rng.choice('abc}{') for _ in range(rng.randrange(40))]
+        assert lcs_length(a, b) == lcs_dp(a, b), (a, b)
+    print("bit-parallel LCS matches DP on 200 random pairs\n")
+
+    print(f"{'lines':>6} {'fixed':>6} | {'difflib ms':>11} {'score':>7} | {'lcs ms':>8} {'score':>7} | {'speedup':>7}")
+    print('-' * 69)
+    for size in args.sizes:
+        reference = make_program(size, rng)
+        for fixed in args.fixed:
+            submitted = team_attempt(reference, rng, fixed)
+            old_score, old_time = timed(difflib_ratio, reference, submitted)
+            new_score, new_time = timed(similarity, reference, submitted)
+            print(f"{size:>6} {fixed:>6.0%} | {old_time * 1000:>11.2f} {old_score * 100:>6.1f}% | "
+                  f"{new_time * 1000:>8.2f} {new_score * 100:>6.1f}% | {old_time / new_time:>6.1f}x")
+    print("\ndifflib drops lines occurring in >1% of a 200+ line input (autojunk) and matches greedily,")
+    print("so its score is a lower bound on the exact LCS ratio and drifts on long files.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Benchmark: MinHash/LSH copy detection on a synthetic Round 3 corpus.
+
+Generates one buggy base program per problem and one submission per team:
+honest teams fix some of the bugs and make their own edits, while planted
+"rings" of 2-4 teams hand in one submission with cosmetic changes
+(comments, spacing, a changed line). Every submission is signed through
+SimilarityIndex.add() as the submit path does, then clusters are computed
+for all problems and checked against the planted rings. An exact all-pairs
+Jaccard pass over one problem shows what the LSH index avoids.
+
+    cd backend && python benchmarks/bench_similarity.py [--problems 20 --teams 500]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from itertools import combinations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from similarity_index import SimilarityIndex, shingles  # noqa: E402
+
+NAMES = ['total', 'count', 'index', 'value', 'result', 'left', 'right', 'mid', 'step', 'limit',
+         'buffer', 'offset', 'sum', 'best', 'node', 'item', 'key', 'width', 'height', 'depth']
+
+
+def random_line(rng):
+    a, b, c = rng.sample(NAMES, 3)
+    form = rng.randrange(4)
+    if form == 0:
+        return f"{a} = {b} + {c} * {rng.randrange(100)}"
+    if form == 1:
+        return f"if {a} > {rng.randrange(1000)}: {b} = {c}"
+    if form == 2:
+        return f"{a} = max({b}, {c} - {rng.randrange(50)})"
+    return f"for {a} in range({b}, {c} + {rng.randrange(10)}): {b} += {a}"
+
+
+def make_problem(rng, lines=80, bugs=5):
+    """(base program lines, {line number: fixed line})."""
+    base = [random_line(rng) for _ in range(lines)]
+    fixes = {number: random_line(rng) for number in rng.sample(range(lines), bugs)}
+    return base, fixes
+
+
+def honest_submission(base, fixes, rng):
+    lines = list(base)
+    for number in rng.sample(sorted(fixes), rng.randrange(1, len(fixes) + 1)):
+        lines[number] = fixes[number]
+    for _ in range(rng.randrange(2, 7)):
+        lines[rng.randrange(len(lines))] = random_line(rng)
+    return lines
+
+
+def disguise(lines, rng):
+    """A copy with comments, different spacing and one line changed."""
+    copied = [line.replace(' = ', '  =  ') if rng.random() < 0.3 else line for line in lines]
+    copied[rng.randrange(len(copied))] = random_line(rng)
+    for _ in range(3):
+        copied.insert(rng.randrange(len(copied)), f"# {rng.choice(NAMES)} check")
+    return copied
+
+
+def build_corpus(problems, teams, ring_rate, rng):
+    """{problem: (base text, {team: code})} and the planted rings [(problem, {teams})]."""
+    corpus = {}
+    rings = []
+    for p in range(problems):
+        base, fixes = make_problem(rng)
+        names = [f"team{t:04d}" for t in range(teams)]
+        rng.shuffle(names)
+        submissions = {}
+        while names:
+            size = rng.randint(2, 4) if rng.random() < ring_rate and len(names) >= 4 else 1
+            members, names = names[:size], names[size:]
+            original = honest_submission(base, fixes, rng)
+            submissions[members[0]] = '\n'.join(original)
+            for member in members[1:]:
+                submissions[member] = '\n'.join(disguise(original, rng))
+            if size > 1:
+                rings.append((f"debug/py/p{p:02d}.py", set(members)))
+        corpus[f"debug/py/p{p:02d}.py"] = ('\n'.join(base), submissions)
+    return corpus, rings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--problems', type=int, default=20)
+    parser.add_argument('--teams', type=int, default=500, help="submissions per problem")
+    parser.add_argument('--ring-rate', type=float, default=0.05,
+                        help="chance that a group of teams is a copying ring")
+    parser.add_argument('--threshold', type=float, default=0.7)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    corpus, rings = build_corpus(args.problems, args.teams, args.ring_rate, rng)
+    root = tempfile.mkdtemp(prefix='bench-similarity-')
+    try:
+        index = SimilarityIndex(root)
+        for problem, (base, _) in corpus.items():
+            os.makedirs(os.path.dirname(os.path.join(root, problem)), exist_ok=True)
+            with open(os.path.join(root, problem), 'w') as f:
+                f.write(base)
+
+        total = sum(len(submissions) for _, submissions in corpus.values())
+        start = time.perf_counter()
+        for problem, (_, submissions) in corpus.items():
+            for team, code in submissions.items():
+                index.add(problem, team, f"Round3/{team}/py/{problem}", code)
+        sign_time = time.perf_counter() - start
+        print(f"signed {total} submissions in {sign_time:.2f} s "
+              f"({sign_time / total * 1000:.2f} ms each, SQLite write included)")
+
+        start = time.perf_counter()
+        index.load()
+        print(f"reloaded the index from SQLite in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        start = time.perf_counter()
+        found = index.clusters(threshold=args.threshold)
+        cluster_time = time.perf_counter() - start
+        print(f"clusters for all {len(corpus)} problems in {cluster_time * 1000:.0f} ms "
+              f"({cluster_time / len(corpus) * 1000:.1f} ms per problem)\n")
+
+        planted_pairs = {(problem, pair) for problem, members in rings
+                         for pair in combinations(sorted(members), 2)}
+        reported_pairs = {(problem, tuple(link["teams"])) for problem, clusters in found.items()
+                          for cluster in clusters for link in cluster["pairs"]}
+        clustered = {problem: [{m["team"] for m in cluster["members"]} for cluster in clusters]
+                     for problem, clusters in found.items()}
+        whole = sum(1 for problem, members in rings
+                    if any(members <= cluster for cluster in clustered.get(problem, [])))
+        false_pairs = len(reported_pairs - planted_pairs)
+        print(f"planted rings:          {len(rings)} ({len(planted_pairs)} pairs)")
+        print(f"rings found whole:      {whole} ({whole / max(len(rings), 1):.1%})")
+        print(f"planted pairs linked:   {len(reported_pairs & planted_pairs)}")
+        print(f"pairs outside any ring: {false_pairs}")
+
+        problem, (base, submissions) = next(iter(corpus.items()))
+        base_set = shingles(base)
+        own = [shingles(code) - base_set for code in submissions.values()]
+        start = time.perf_counter()
+        for a, b in combinations(own, 2):
+            len(a & b) / (len(a | b) or 1)
+        exact_time = time.perf_counter() - start
+        n = len(own)
+        print(f"\nexact all-pairs Jaccard, one problem ({n} teams, {n * (n - 1) // 2} pairs): "
+              f"{exact_time * 1000:.0f} ms; {n * len(corpus)} teams in one pool would take "
+              f"~{exact_time * len(corpus) ** 2:.0f} s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
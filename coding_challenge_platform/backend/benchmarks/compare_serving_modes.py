@@ -0,0 +1,79 @@
+"""Load test: the Flask app under gunicorn (sync) vs asgi.py under uvicorn.
+
+Starts a Judge0 stand-in (mock_judge0.py, --fake-run with a fixed latency to
+play a remote judge), then for each mode launches the app with mongomock via
+serve_app.py and lets N simulated teams loop over the I/O-bound endpoints
+(check_debug_code, student/scores, leaderboard, grading job poll, a Flask
+fall-through route) for a fixed time. Prints p50/p95/p99 latency and
+throughput per endpoint and mode.
+
+    cd backend && python benchmarks/compare_serving_modes.py --teams 500 --duration 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import loadlib  # noqa: E402
+from mock_judge0 import serve as serve_judge0  # noqa: E402
+
+
+async def team(client, index, deadline, think, rec):
+    username = f"loadteam{index:04d}"
+    rng = random.Random(index)
+    iteration = 0
+    while time.monotonic() < deadline:
+        iteration += 1
+        # Distinct source per request, so the result cache doesn't answer it.
+        requests = [
+            ('check_debug_code', 'POST', '/check_debug_code',
+             {"json": {"code": f"# {username} {iteration}\nprint(input())", "lang": "py", "input": str(iteration),
+                       "username": username}}),
+            ('student_scores', 'GET', '/student/scores', {"params": {"username": username}}),
+            ('leaderboard', 'GET', '/leaderboard', {}),
+            ('grading_job_poll', 'GET', '/grading_jobs/unknown', {}),
+            ('buggy_code_list', 'GET', '/get_buggy_code_list', {"params": {"lang": "py"}}),
+        ]
+        name, method, path, kwargs = rng.choice(requests)
+        await rec.request(client, name, method, path, **kwargs)
+        await asyncio.sleep(rng.uniform(0.5 * think, 1.5 * think))
+
+
+async def drive(base_url, teams, duration, think):
+    rec = loadlib.Recorder()
+    async with loadlib.client(base_url, teams + 10) as client:
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(team(client, i, deadline, think, rec) for i in range(teams)))
+    rec.stop()
+    return rec
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--teams', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--think', type=float, default=2.0, help="mean seconds a team waits between requests")
+    parser.add_argument('--judge0-latency', type=float, default=0.3, help="seconds per Judge0 request")
+    parser.add_argument('--threads', type=int, default=16, help="gunicorn threads for the sync mode")
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--port', type=int, default=8101)
+    args = parser.parse_args()
+
+    judge0 = serve_judge0(0, latency=args.judge0_latency, workers=64, fake_run=True)
+    judge0_url = f"http://127.0.0.1:{judge0.server_port}"
+    print(f"{args.teams} teams for {args.duration:.0f}s per mode; Judge0 stand-in latency {args.judge0_latency}s")
+    # Runner slots as many as async Judge0 connections: this compares serving modes, not admission.
+    env = {'EXECUTION_BACKEND': 'judge0', 'JUDGE0_URL': judge0_url, 'JUDGE0_RETRIES': '0', 'EXECUTION_CONCURRENCY': '256'}
+    for offset, mode in enumerate(args.modes.split(',')):
+        with loadlib.launch(mode, args.port + offset, env, args.threads) as base_url:
+            rec = asyncio.run(drive(base_url, args.teams, args.duration, args.think))
+        rec.report(mode)
+    judge0.shutdown()
+
+
+if __name__ == '__main__':
+    main()
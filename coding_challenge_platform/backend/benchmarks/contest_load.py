@@ -0,0 +1,232 @@
+"""Load test: a whole contest against the real endpoints.
+
+Phases, each reported separately:
+
+  setup    the admin imports the team accounts (/admin/users/import) and
+           uploads an MCQ workbook, scramble and debug files and test
+           suites through /admin_upload
+  storm    every team logs in, all at once (with --accounts signup, every
+           team first signs up itself instead of being imported)
+  contest  every team plays Rounds 1-3 (MCQ fetch/timer/submit; scramble
+           list/fetch/submit per file; debug fetch, a few checks, submit and
+           poll the grading job; then its own scores) with think time between
+           steps, while admins poll the dashboard, leaderboard and queue
+
+Per endpoint it prints requests, errors, throughput and p50/p95/p99 latency;
+--json writes the same numbers for comparing runs.
+
+By default the app runs in a scratch directory on mongomock (serve_app.py)
+with Round 3 code sent to a Judge0 stand-in that echoes stdin
+(mock_judge0.py --fake-run), so the numbers measure app.py itself:
+
+    cd backend && python benchmarks/contest_load.py --teams 200
+    python benchmarks/contest_load.py --mode asgi --json asgi.json
+    python benchmarks/contest_load.py --mongo-uri mongodb://localhost:27017   # writes to its coding_challenge db
+    python benchmarks/contest_load.py --url http://localhost:8000              # an already running server
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openpyxl import Workbook  # noqa: E402
+
+import loadlib  # noqa: E402
+from mock_judge0 import serve as serve_judge0  # noqa: E402
+
+LANG = 'py'
+SCRAMBLE_FILE = "def total(values):\n    result = 0\n    for value in values:\n        result += value\n    return result\n\nprint(total([1, 2, 3]))\n"
+BUGGY_CODE = "line = input()\nprint(line + '!')\n"
+FIXED_CODE = "line = input()\nprint(line)\n"
+
+
+def workbook(questions):
+    book = Workbook()
+    sheet = book.active
+    sheet.append(['id', 'question_text', 'optionA', 'optionB', 'optionC', 'optionD', 'correct_answer'])
+    for i in range(questions):
+        sheet.append([i + 1, f"Question {i + 1}?", 'a', 'b', 'c', 'd', 'a'])
+    buffer = io.BytesIO()
+    book.save(buffer)
+    return buffer.getvalue()
+
+
+def team_name(index):
+    return f"team{index:04d}"
+
+
+async def setup(client, rec, args):
+    async def upload(name, form, filename, data, path='/admin_upload'):
+        resp = await rec.request(client, name, 'POST', path, data=form, files={'file': (filename, data)})
+        if resp is None or resp.status_code != 200:
+            raise RuntimeError(f"upload of {filename} failed: {resp.text if resp is not None else 'no response'}")
+
+    if args.accounts == 'import':
+        teams = ''.join(f"{team_name(i)},pw\n" for i in range(args.teams))
+        await upload('admin/users/import', {}, 'teams.csv', f"username,password\n{teams}".encode(),
+                     path='/admin/users/import')
+    await upload('admin_upload mcq', {'round': 'mcq'}, 'questions.xlsx', workbook(args.questions))
+    for i in range(args.problems):
+        await upload('admin_upload scramble', {'round': 'scramble', 'lang': LANG}, f'scramble{i}.py',
+                     SCRAMBLE_FILE.encode())
+        await upload('admin_upload debug', {'round': 'debug', 'lang': LANG}, f'debug{i}.py', BUGGY_CODE.encode())
+        cases = [{"input": f"case {n}", "expected_output": f"case {n}\n"} for n in range(args.cases)]
+        await upload('admin_upload debug_tests', {'round': 'debug_tests', 'lang': LANG, 'problem': f'debug{i}.py'},
+                     'tests.json', json.dumps(cases).encode())
+
+
+async def storm(client, rec, args):
+    if args.accounts == 'signup':
+        await asyncio.gather(*(
+            rec.request(client, 'student_signup', 'POST', '/student_signup', ok_statuses={201, 400},
+                        json={"username": team_name(i), "password": "pw"})
+            for i in range(args.teams)))
+    await asyncio.gather(*(
+        rec.request(client, 'student_login', 'POST', '/student_login', ok_statuses={200},
+                    json={"username": team_name(i), "password": "pw"})
+        for i in range(args.teams)))
+
+
+async def play(client, rec, index, args):
+    username = team_name(index)
+    rng = random.Random(index)
+
+    async def think():
+        await asyncio.sleep(rng.uniform(0.5 * args.think, 1.5 * args.think))
+
+    # Round 1: MCQ
+    resp = await rec.request(client, 'get_mcq_questions', 'GET', '/get_mcq_questions', params={"username": username})
+    questions = resp.json() if resp is not None and resp.status_code == 200 else []
+    await rec.request(client, 'round_session', 'GET', '/round_session', params={"username": username, "round": "MCQ"})
+    await think()
+    correct = sum(1 for _ in questions if rng.random() < 0.6)
+    await rec.request(client, 'submit_mcq_score', 'POST', '/submit_mcq_score', json={
+        "username": username, "correct_answers": correct, "total_questions": len(questions),
+        "percentage": correct * 100 / len(questions) if questions else 0})
+
+    # Round 2: Code Scramble
+    resp = await rec.request(client, 'get_scrambled_code_list', 'GET', '/get_scrambled_code_list',
+                             params={"lang": LANG})
+    for filename in (resp.json() if resp is not None and resp.status_code == 200 else []):
+        file_path = f"scramble/{LANG}/{filename}"
+        resp = await rec.request(client, 'get_scrambled_code', 'GET', '/get_scrambled_code',
+                                 params={"file": file_path, "username": username})
+        await think()
+        lines = SCRAMBLE_FILE.splitlines()
+        if rng.random() < 0.5:
+            rng.shuffle(lines)  # not every team unscrambles it
+        await rec.request(client, 'submit_scrambled_code', 'POST', '/submit_scrambled_code', json={
+            "code": "\n".join(lines), "file_path": file_path, "username": username, "lang": LANG})
+
+    # Round 3: Code Debugging
+    resp = await rec.request(client, 'get_buggy_code_list', 'GET', '/get_buggy_code_list', params={"lang": LANG})
+    for filename in (resp.json() if resp is not None and resp.status_code == 200 else []):
+        await rec.request(client, 'get_buggy_code', 'GET', '/get_buggy_code',
+                          params={"file": f"debug/{LANG}/{filename}", "username": username})
+        for attempt in range(args.checks):
+            await think()
+            # Teams re-check the same code and input; the last attempt is the fix.
+            code = FIXED_CODE if attempt == args.checks - 1 else BUGGY_CODE
+            await rec.request(client, 'check_debug_code', 'POST', '/check_debug_code', json={
+                "code": code, "lang": LANG, "input": "sample", "username": username})
+        resp = await rec.request(client, 'submit_debug_code', 'POST', '/submit_debug_code', ok_statuses={202}, json={
+            "code": FIXED_CODE, "lang": LANG, "username": username, "file_path": f"debug/{LANG}/{filename}"})
+        if resp is None or resp.status_code != 202:
+            continue
+        status_url = resp.json()['status_url']
+        while True:
+            await asyncio.sleep(1)
+            resp = await rec.request(client, 'grading_jobs/<id>', 'GET', status_url)
+            if resp is None or resp.status_code != 200 or resp.json()['status'] in ('done', 'failed'):
+                break
+
+    await rec.request(client, 'student/scores', 'GET', '/student/scores', params={"username": username})
+
+
+async def admin(client, rec, done, interval):
+    polls = [
+        ('admin/scores', '/admin/scores', {"limit": 100}),
+        ('admin/submissions', '/admin/submissions', {"limit": 100}),
+        ('leaderboard', '/leaderboard', {}),
+        ('admin/grading_queue', '/admin/grading_queue', {}),
+    ]
+    while not done.is_set():
+        for name, path, params in polls:
+            await rec.request(client, name, 'GET', path, params=params)
+        try:
+            await asyncio.wait_for(done.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def contest(client, rec, args):
+    done = asyncio.Event()
+    admins = [asyncio.create_task(admin(client, rec, done, args.admin_interval)) for _ in range(args.admins)]
+    await asyncio.gather(*(play(client, rec, i, args) for i in range(args.teams)))
+    done.set()
+    await asyncio.gather(*admins)
+
+
+async def run(base_url, args):
+    results = {}
+    async with loadlib.client(base_url, args.teams + args.admins + 10) as client:
+        for phase, fn in (('setup', lambda rec: setup(client, rec, args)),
+                          ('storm', lambda rec: storm(client, rec, args)),
+                          ('contest', lambda rec: contest(client, rec, args))):
+            rec = loadlib.Recorder()
+            await fn(rec)
+            rec.stop()
+            results[phase] = rec.report(f"{phase}: {args.teams} teams, {args.mode}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--teams', type=int, default=200)
+    parser.add_argument('--admins', type=int, default=2)
+    parser.add_argument('--admin-interval', type=float, default=5.0, help="seconds between dashboard refreshes")
+    parser.add_argument('--think', type=float, default=1.0, help="mean seconds a team spends between steps")
+    parser.add_argument('--problems', type=int, default=2, help="scramble and debug files per round")
+    parser.add_argument('--questions', type=int, default=30)
+    parser.add_argument('--cases', type=int, default=10, help="test cases per debug problem")
+    parser.add_argument('--accounts', choices=['import', 'signup'], default='import',
+                        help="create the teams by one admin import or by each team signing up")
+    parser.add_argument('--checks', type=int, default=3, help="check_debug_code presses per debug problem")
+    parser.add_argument('--mode', choices=['wsgi', 'asgi'], default='wsgi')
+    parser.add_argument('--threads', type=int, default=16, help="gunicorn threads in wsgi mode")
+    parser.add_argument('--port', type=int, default=8201)
+    parser.add_argument('--url', help="load an already running server instead of launching one")
+    parser.add_argument('--mongo-uri', help="use this mongod instead of mongomock")
+    parser.add_argument('--executor', choices=['mock', 'local'], default='mock',
+                        help="mock: Judge0 stand-in that echoes stdin; local: the real sandbox")
+    parser.add_argument('--judge0-latency', type=float, default=0.2)
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+
+    if args.url:
+        results = asyncio.run(run(args.url.rstrip('/'), args))
+    else:
+        env = {}
+        judge0 = None
+        if args.executor == 'mock':
+            judge0 = serve_judge0(0, latency=args.judge0_latency, workers=64, fake_run=True)
+            env.update(EXECUTION_BACKEND='judge0', JUDGE0_URL=f"http://127.0.0.1:{judge0.server_port}")
+        if args.mongo_uri:
+            env['MONGO_URI'] = args.mongo_uri
+        try:
+            with loadlib.launch(args.mode, args.port, env, args.threads, mongomock=not args.mongo_uri) as base_url:
+                results = asyncio.run(run(base_url, args))
+        finally:
+            if judge0 is not None:
+                judge0.shutdown()
+    if args.json:
+        loadlib.save({"args": vars(args), "phases": results}, args.json)
+
+
+if __name__ == '__main__':
+    main()
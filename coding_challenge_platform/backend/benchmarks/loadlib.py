@@ -0,0 +1,119 @@
+"""Shared pieces of the load-test scripts: server launch, timing, reporting."""
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(samples, fraction):
+    """samples must be sorted."""
+    if not samples:
+        return float('nan')
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class Recorder:
+    """Latencies and error counts per endpoint name."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started = time.monotonic()
+        self.finished = None
+
+    async def request(self, client, name, method, path, ok_statuses=None, **kwargs):
+        """Send a request and time it under name; returns the response or None.
+
+        A response counts as an error if it is a 5xx, or not in ok_statuses
+        when that is given (e.g. a 403 after a round's deadline is expected).
+        """
+        start = time.perf_counter()
+        try:
+            resp = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        elapsed = time.perf_counter() - start
+        if resp.status_code >= 500 or (ok_statuses is not None and resp.status_code not in ok_statuses):
+            self.errors[name] += 1
+        else:
+            self.latencies[name].append(elapsed)
+        return resp
+
+    def stop(self):
+        self.finished = time.monotonic()
+
+    def summary(self):
+        wall = (self.finished or time.monotonic()) - self.started
+        rows = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            samples = sorted(self.latencies[name])
+            rows[name] = {
+                "ok": len(samples),
+                "errors": self.errors[name],
+                "throughput": round(len(samples) / wall, 2),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+            }
+        total = sum(row["ok"] for row in rows.values())
+        return {"wall_seconds": round(wall, 2), "requests": total,
+                "throughput": round(total / wall, 2), "endpoints": rows}
+
+    def report(self, title):
+        summary = self.summary()
+        print(f"\n== {title} ({summary['wall_seconds']}s) ==")
+        print(f"{'endpoint':<26} {'ok':>7} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, row in summary["endpoints"].items():
+            print(f"{name:<26} {row['ok']:>7} {row['errors']:>5} {row['throughput']:>8.1f} "
+                  f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+        print(f"{'all':<26} {summary['requests']:>7} {'':>5} {summary['throughput']:>8.1f}")
+        return summary
+
+
+def client(base_url, connections, timeout=120):
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    return httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits)
+
+
+def wait_ready(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/get_buggy_code_list", timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+@contextlib.contextmanager
+def launch(mode, port, env=None, threads=16, mongomock=True):
+    """Run serve_app.py in a scratch directory; yields the base URL."""
+    args = [sys.executable, os.path.join(HERE, 'serve_app.py'), '--mode', mode, '--port', str(port),
+            '--threads', str(threads)]
+    if mongomock:
+        args.append('--mongomock')
+    with tempfile.TemporaryDirectory(prefix=f'ccp-load-{mode}-') as workdir:
+        server = subprocess.Popen(args + ['--workdir', workdir], env=dict(os.environ, **(env or {})))
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            wait_ready(base_url)
+            yield base_url
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def save(summary, path):
+    with open(path, 'w') as f:
+        json.dump(summary, f, indent=2)
@@ -0,0 +1,192 @@
+"""A local stand-in for the Judge0 API, for testing Judge0Backend offline.
+
+Implements the endpoints the app uses:
+
+    POST /submissions/?wait=true     run one submission, return its result
+    POST /submissions/batch          queue several, return their tokens
+    GET  /submissions/batch?tokens=  results (status id 1/2 while pending)
+    GET  /submissions/<token>
+
+Code runs on this machine through executor.LocalBackend, or with --fake-run
+is not run at all (stdout echoes stdin), so load tests measure the app rather
+than the sandbox. --latency adds a fixed delay per request and --fail-rate
+answers that fraction of requests with a 503 (or a 429 with Retry-After), to
+exercise the client's retries.
+
+    cd backend && python benchmarks/mock_judge0.py --port 2358 --fail-rate 0.2
+    EXECUTION_BACKEND=judge0 JUDGE0_URL=http://localhost:2358 python app.py
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from executor import STATUS_ACCEPTED, LocalBackend  # noqa: E402
+
+LANGUAGES_BY_ID = {71: 'py', 50: 'c', 54: 'cpp', 62: 'java'}
+STATUS_IDS = {
+    STATUS_ACCEPTED: 3,
+    "Time Limit Exceeded": 5,
+    "Compilation Error": 6,
+}
+
+
+class MockJudge0:
+    def __init__(self, latency=0.0, fail_rate=0.0, workers=4, fake_run=False):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fake_run = fake_run
+        self.backend = LocalBackend(max_workers=workers)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mock-judge0')
+        self.results = {}
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "injected_failures": 0, "runs": 0}
+
+    def execute(self, submission):
+        if self.fake_run:
+            with self.lock:
+                self.counters['runs'] += 1
+            return {"stdout": submission.get('stdin', ''), "stderr": "", "time": "0.001",
+                    "status": {"id": 3, "description": STATUS_ACCEPTED}}
+        language = LANGUAGES_BY_ID.get(submission.get('language_id'), 'py')
+        result = self.backend.run(submission.get('source_code', ''), language, submission.get('stdin', ''))
+        with self.lock:
+            self.counters['runs'] += 1
+        if 'error' in result:
+            return {"stdout": None, "stderr": result['error'], "time": None,
+                    "status": {"id": 13, "description": "Internal Error"}}
+        description = result['status']
+        status_id = STATUS_IDS.get(description, 7 if description.startswith("Runtime Error") else 11)
+        return {"stdout": result['stdout'], "stderr": result['stderr'], "time": result['time'],
+                "status": {"id": status_id, "description": description}}
+
+    def enqueue(self, submission):
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.results[token] = {"token": token, "stdout": None, "stderr": None, "time": None,
+                                   "status": {"id": 1, "description": "In Queue"}}
+
+        def job():
+            result = self.execute(submission)
+            result['token'] = token
+            with self.lock:
+                self.results[token] = result
+
+        self.pool.submit(job)
+        return token
+
+    def lookup(self, token):
+        with self.lock:
+            return self.results.get(token)
+
+
+def make_handler(judge):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=None, headers=None):
+            data = json.dumps(body).encode() if body is not None else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def _inject(self):
+            """Apply latency and maybe answer with an injected failure; True if handled."""
+            with judge.lock:
+                judge.counters['requests'] += 1
+            if judge.latency:
+                time.sleep(judge.latency)
+            if judge.fail_rate and random.random() < judge.fail_rate:
+                with judge.lock:
+                    judge.counters['injected_failures'] += 1
+                if random.random() < 0.5:
+                    self._send(429, {"error": "Too many requests"}, {'Retry-After': '0'})
+                else:
+                    self._send(503, {"error": "Service unavailable"})
+                return True
+            return False
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = self._read_json()
+            if self._inject():
+                return
+            if url.path.rstrip('/') == '/submissions/batch':
+                self._send(201, [{"token": judge.enqueue(s)} for s in body.get('submissions', [])])
+            elif url.path.rstrip('/') == '/submissions':
+                if parse_qs(url.query).get('wait') == ['true']:
+                    self._send(201, judge.execute(body))
+                else:
+                    self._send(201, {"token": judge.enqueue(body)})
+            else:
+                self._send(404, {"error": "Not found"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/stats':
+                with judge.lock:
+                    self._send(200, dict(judge.counters))
+                return
+            if self._inject():
+                return
+            if url.path.rstrip('/') == '/submissions/batch':
+                tokens = parse_qs(url.query).get('tokens', [''])[0].split(',')
+                self._send(200, {"submissions": [judge.lookup(token) for token in tokens]})
+            elif url.path.startswith('/submissions/'):
+                result = judge.lookup(url.path.rsplit('/', 1)[-1])
+                self._send(200 if result else 404, result or {"error": "Not found"})
+            else:
+                self._send(404, {"error": "Not found"})
+
+    return Handler
+
+
+def serve(port=2358, latency=0.0, fail_rate=0.0, workers=4, fake_run=False):
+    """Start the mock in a background thread and return the server."""
+    judge = MockJudge0(latency, fail_rate, workers, fake_run)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(judge))
+    server.daemon_threads = True
+    server.judge = judge
+    threading.Thread(target=server.serve_forever, name='mock-judge0', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=2358)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="fraction of requests answered 429/503")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--fake-run', action='store_true', help="don't execute code; echo stdin as stdout")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.fail_rate, args.workers, args.fake_run)
+    print(f"Mock Judge0 listening on http://127.0.0.1:{server.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Run the app for load tests, under gunicorn (sync) or uvicorn (async).
+
+    cd backend && python benchmarks/serve_app.py --mode wsgi --port 8001 --mongomock
+
+--mongomock swaps pymongo's client for mongomock before app.py is imported,
+so no mongod is needed. --workdir runs the server in a scratch directory,
+whose uploads/ folder the app then creates and fills. Point the app at a
+Judge0 stand-in (benchmarks/mock_judge0.py) with the usual EXECUTION_BACKEND
+and JUDGE0_URL variables.
+"""
+import argparse
+import os
+import sys
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def _prepare(mongomock):
+    sys.path.insert(0, os.path.abspath(BACKEND))
+    if mongomock:
+        import mongomock as mongomock_module
+        import pymongo
+        pymongo.MongoClient = mongomock_module.MongoClient
+
+
+def run_wsgi(port, threads, mongomock):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in {'bind': f'127.0.0.1:{port}', 'workers': 1, 'threads': threads,
+                               'worker_class': 'gthread', 'backlog': 2048, 'timeout': 120,
+                               'loglevel': 'warning'}.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Import in the worker, after the fork, so app.py's threads run there.
+            _prepare(mongomock)
+            import app
+            return app.app
+
+    Server().run()
+
+
+def run_asgi(port, mongomock):
+    import uvicorn
+    _prepare(mongomock)
+    import asgi
+    uvicorn.run(asgi.app, host='127.0.0.1', port=port, log_level='warning', backlog=2048)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=['wsgi', 'asgi'], default='wsgi')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--threads', type=int, default=16, help="gunicorn threads (wsgi mode)")
+    parser.add_argument('--mongomock', action='store_true')
+    parser.add_argument('--workdir', help="directory to run in (default: backend/)")
+    args = parser.parse_args()
+    os.chdir(args.workdir or BACKEND)
+    if args.mode == 'wsgi':
+        run_wsgi(args.port, args.threads, args.mongomock)
+    else:
+        run_asgi(args.port, args.mongomock)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,567 @@
+"""Code execution backends for Round 3.
+
+Every backend exposes run(source_code, language, stdin) and returns the same
+shape the old Judge0 helper did: {"stdout", "stderr", "status", "time"}, or
+{"error": ...} when the run could not be attempted at all. run_cases() runs
+one source against many test cases with bounded parallelism.
+
+LocalBackend compiles and runs submissions on this machine in throwaway temp
+directories, with rlimits on CPU, memory, file size and process count and a
+wall-clock kill, on a bounded pool of worker threads. Compiled artifacts are
+cached under a hash of language and source, so grading a submission against
+many test cases compiles it once. Judge0Backend keeps the
+previous remote behaviour for deployments that cannot run toolchains locally,
+over a pooled, retrying HTTP session that sends test cases in batches.
+Pick one with EXECUTION_BACKEND=local|judge0 (default: judge0).
+
+Team code must not run as the server's user: it could read the uploads
+(hidden tests, other teams' files, the score journal) and the server's
+environment through /proc. So get_backend() only builds a LocalBackend with
+EXEC_USER set to a dedicated unprivileged account, and the server must then
+run as root. Each compile and run is started as EXEC_USER (its uid and gid,
+no supplementary groups) through the sandbox.py helper, which gives it:
+- its own network namespace (no interfaces but a downed loopback);
+- its own mount namespace, with the server's directory (EXEC_HIDDEN_PATHS)
+  covered by an empty read-only tmpfs.
+Compiled artifacts are handed back to the server's user once built, so one
+run cannot replace a binary that later runs for another team. The
+constructor starts one sandboxed process to check this works and raises if
+it doesn't.
+"""
+import hashlib
+import json
+import os
+import pwd
+import random
+import re
+import shutil
+import signal
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import sandbox
+
+LANGUAGES = ('py', 'c', 'cpp', 'java')
+
+STATUS_ACCEPTED = "Accepted"
+STATUS_COMPILE_ERROR = "Compilation Error"
+STATUS_TIME_LIMIT = "Time Limit Exceeded"
+STATUS_OUTPUT_LIMIT = "Output Limit Exceeded"
+STATUS_RUNTIME_ERROR = "Runtime Error (NZEC)"
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class _Artifact:
+    """A compiled submission living in its own directory of the artifact cache."""
+
+    def __init__(self, key, workdir):
+        self.key = key
+        self.workdir = workdir
+        self.run_cmd = None
+        self.error = None
+        self.compile_output = ""
+        self.compile_time = 0.0
+        self.users = 0
+        self.ready = threading.Event()
+
+
+def _case_stdin(case):
+    """Test cases carry stdin either inline ('input') or as a file ('input_path')."""
+    if case.get('input_path'):
+        with open(case['input_path'], 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    return case.get('input') or ''
+
+
+def _user_ids(user):
+    """(uid, gid) of a user name or numeric uid."""
+    entry = pwd.getpwuid(int(user)) if str(user).isdigit() else pwd.getpwnam(user)
+    return entry.pw_uid, entry.pw_gid
+
+
+def _windowed(pool, fn, cases, concurrency):
+    """Yield (case, fn(case)) in input order with at most `concurrency` in flight."""
+    window = deque()
+    for case in cases:
+        if len(window) >= concurrency:
+            done_case, future = window.popleft()
+            yield done_case, future.result()
+        window.append((case, pool.submit(fn, case)))
+    while window:
+        done_case, future = window.popleft()
+        yield done_case, future.result()
+
+
+class Judge0Backend:
+    """Runs code on a Judge0 instance over HTTP.
+
+    All calls share one keep-alive session whose connection pool is sized to
+    the worker count. Connection errors and 429/5xx responses are retried a
+    bounded number of times with jittered exponential backoff (honouring
+    Retry-After). run_cases() sends test cases through /submissions/batch,
+    batch_size at a time, and polls the batch until every case has finished.
+    """
+
+    LANGUAGE_IDS = {'py': 71, 'c': 50, 'cpp': 54, 'java': 62}
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    # Judge0 status ids 1 and 2 are "In Queue" and "Processing".
+    PENDING_STATUS_IDS = frozenset({1, 2})
+    RESULT_FIELDS = "token,stdout,stderr,status,time"
+
+    def __init__(self, base_url="https://ce.judge0.com", timeout=10, max_workers=8,
+                 retries=3, backoff=0.5, batch_size=20, poll_interval=0.25, poll_timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.poll_timeout = poll_timeout
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='judge0')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    # --- HTTP ---
+    def _retry_delay(self, attempt, resp=None):
+        retry_after = resp.headers.get('Retry-After') if resp is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), 30.0)
+            except ValueError:
+                pass
+        # Full jitter: spread retries from many workers instead of synchronising them.
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    def _request(self, method, path, **kwargs):
+        """Send a request, retrying transient failures. Returns the final response."""
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.retries + 1):
+            try:
+                resp = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+            if resp.status_code not in self.RETRY_STATUSES or attempt == self.retries:
+                return resp
+            time.sleep(self._retry_delay(attempt, resp))
+        return resp
+
+    def _payload(self, source_code, language, stdin):
+        return {
+            "source_code": source_code,
+            "language_id": self.LANGUAGE_IDS.get(language, 71),
+            "stdin": stdin or ""
+        }
+
+    @staticmethod
+    def _result(result):
+        return {
+            "stdout": result.get("stdout", ""),
+            "stderr": result.get("stderr", ""),
+            "status": (result.get("status") or {}).get("description", ""),
+            "time": result.get("time", "")
+        }
+
+    def run(self, source_code, language, stdin=None):
+        try:
+            resp = self._request('POST', "/submissions/?base64_encoded=false&wait=true",
+                                 json=self._payload(source_code, language, stdin))
+            if resp.status_code == 201:
+                return self._result(resp.json())
+            else:
+                return {"error": f"Judge0 error: {resp.status_code}"}
+        except Exception as e:
+            return {"error": str(e)}
+
+    # --- Batches ---
+    def _run_batch(self, source_code, language, batch):
+        """Submit a list of cases as one batch and return their results in order."""
+        try:
+            resp = self._request('POST', "/submissions/batch?base64_encoded=false", json={
+                "submissions": [self._payload(source_code, language, _case_stdin(case)) for case in batch]
+            })
+            if resp.status_code != 201:
+                return [{"error": f"Judge0 error: {resp.status_code}"}] * len(batch)
+            tokens = [entry.get('token') for entry in resp.json()]
+            results = {}
+            pending = [token for token in tokens if token]
+            deadline = time.monotonic() + self.poll_timeout
+            while pending:
+                time.sleep(self.poll_interval)
+                resp = self._request('GET', "/submissions/batch", params={
+                    "tokens": ",".join(pending), "base64_encoded": "false", "fields": self.RESULT_FIELDS
+                })
+                if resp.status_code != 200:
+                    return [{"error": f"Judge0 error: {resp.status_code}"}] * len(batch)
+                for result in resp.json().get('submissions', []):
+                    if (result.get('status') or {}).get('id') not in self.PENDING_STATUS_IDS:
+                        results[result.get('token')] = self._result(result)
+                pending = [token for token in pending if token not in results]
+                if pending and time.monotonic() > deadline:
+                    break
+            return [results.get(token) or {"error": "Judge0 did not finish the run"} for token in tokens]
+        except Exception as e:
+            return [{"error": str(e)}] * len(batch)
+
+    def run_cases(self, source_code, language, cases, concurrency=4):
+        """Yield (case, result) in order, sending batch_size cases per request.
+
+        At most `concurrency` batches are in flight at a time.
+        """
+        def batches():
+            batch = []
+            for case in cases:
+                batch.append(case)
+                if len(batch) == self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        for batch, results in _windowed(self._pool, lambda batch: self._run_batch(source_code, language, batch),
+                                        batches(), concurrency):
+            yield from zip(batch, results)
+
+
+class LocalBackend:
+    """Compiles and runs code in resource-limited local subprocesses.
+
+    With run_as=(uid, gid) each process is also sandboxed (see the module
+    docstring); without it, code runs as the server's user, which is only
+    fit for benchmarks and local development.
+    """
+
+    def __init__(self, max_workers=None, cpu_seconds=2, wall_seconds=5,
+                 memory_mb=256, max_processes=64, output_mb=8, max_artifacts=128,
+                 run_as=None, hidden_paths=()):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.max_processes = max_processes
+        self.output_bytes = output_mb * 1024 * 1024
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='exec')
+        # Compiled submissions keyed by sha256(language, source), least recently used first.
+        self.max_artifacts = max_artifacts
+        self._artifacts = OrderedDict()
+        self._artifact_lock = threading.Lock()
+        self._artifact_root = tempfile.mkdtemp(prefix='ccp-artifacts-')
+        self._run_root = tempfile.mkdtemp(prefix='ccp-runs-')
+        self.run_as = run_as
+        self.hidden_paths = [os.path.abspath(path) for path in hidden_paths]
+        # Passed as source rather than a path: run_as need not read the server's files.
+        with open(sandbox.__file__, encoding='utf-8') as f:
+            self._sandbox_cmd = [sys.executable, '-S', '-c', f.read()]
+        if run_as is not None:
+            # Other runs' directories are only reachable by their random names.
+            os.chmod(self._artifact_root, 0o711)
+            os.chmod(self._run_root, 0o711)
+            self._check_sandbox()
+
+    # --- Toolchains ---
+    @staticmethod
+    def _java_class_name(source_code):
+        match = re.search(r'public\s+(?:final\s+)?class\s+(\w+)', source_code or '')
+        return match.group(1) if match else 'Main'
+
+    def _toolchain(self, language, source_code, artifact_dir):
+        """Return (source filename, compile command or None, run command).
+
+        The compile command runs inside artifact_dir; the run command uses
+        absolute paths so each test case can run from its own scratch dir.
+        """
+        if language == 'c':
+            return ('main.c', ['gcc', '-O2', '-std=c11', '-o', 'main', 'main.c', '-lm'],
+                    [os.path.join(artifact_dir, 'main')])
+        if language == 'cpp':
+            return ('main.cpp', ['g++', '-O2', '-std=c++17', '-o', 'main', 'main.cpp'],
+                    [os.path.join(artifact_dir, 'main')])
+        if language == 'java':
+            class_name = self._java_class_name(source_code)
+            heap = f"-Xmx{self.memory_bytes // (1024 * 1024)}m"
+            return (f'{class_name}.java', ['javac', '-J-Xmx512m', f'{class_name}.java'],
+                    ['java', heap, '-Xss64m', '-XX:+UseSerialGC', '-cp', artifact_dir, class_name])
+        return 'main.py', None, [sys.executable, '-S', os.path.join(artifact_dir, 'main.py')]
+
+    # --- Sandboxing ---
+    def _check_sandbox(self):
+        probe = tempfile.mkdtemp(dir=self._run_root)
+        try:
+            os.chown(probe, *self.run_as)
+            returncode, _, _, _, _, stderr = self._spawn(
+                [sys.executable, '-S', '-c', 'import os; assert os.getuid() != 0'], probe, os.devnull,
+                self._limits(self.cpu_seconds, 0, 0), self.wall_seconds)
+        except (OSError, subprocess.SubprocessError) as e:
+            raise RuntimeError(f"Cannot sandbox local execution (the server must run as root, "
+                               f"{sys.executable} be readable by EXEC_USER and unprivileged user "
+                               f"namespaces be enabled): {e}") from e
+        finally:
+            shutil.rmtree(probe, ignore_errors=True)
+        if returncode != 0:
+            raise RuntimeError(f"Sandboxed test run failed ({returncode}): {stderr.strip()}")
+
+    def _limits(self, cpu_seconds, memory_bytes, max_processes):
+        """The sandbox.py config for one process."""
+        sandboxed = self.run_as is not None
+        return {
+            'cpu': cpu_seconds,
+            'output': self.output_bytes,
+            'memory': memory_bytes,
+            # RLIMIT_NPROC counts every process of the uid. Shared with the server
+            # it would count the server's own threads, so it only applies to run_as.
+            'processes': max_processes if sandboxed else 0,
+            'hidden': self.hidden_paths if sandboxed else None,
+        }
+
+    def _spawn(self, cmd, workdir, stdin_path, limits, wall_seconds):
+        """Run cmd in its own session, through sandbox.py with the given limits.
+
+        Returns (returncode, timed_out, output_full, elapsed, stdout, stderr).
+        """
+        out_path = os.path.join(workdir, '.stdout')
+        err_path = os.path.join(workdir, '.stderr')
+        env = {'PATH': os.environ.get('PATH', '/usr/bin:/bin'), 'LANG': 'C.UTF-8', 'HOME': workdir}
+        # No preexec_fn: the server is multithreaded, so its forked child only
+        # execs. Popen itself drops to run_as; the helper does the rest.
+        user = {}
+        if self.run_as is not None:
+            user = {'user': self.run_as[0], 'group': self.run_as[1], 'extra_groups': []}
+        cmd = self._sandbox_cmd + [json.dumps(limits)] + list(cmd)
+        with open(stdin_path, 'rb') as fin, open(out_path, 'wb') as fout, open(err_path, 'wb') as ferr:
+            start = time.monotonic()
+            proc = subprocess.Popen(cmd, cwd=workdir, stdin=fin, stdout=fout, stderr=ferr, env=env,
+                                    start_new_session=True, close_fds=True, **user)
+            timed_out = False
+            try:
+                proc.wait(timeout=wall_seconds)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+            finally:
+                # Kill the whole session so forked children don't outlive the run.
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                proc.wait()
+            elapsed = time.monotonic() - start
+        output_full = os.path.getsize(out_path) >= self.output_bytes
+        with open(out_path, 'rb') as f:
+            stdout = f.read(self.output_bytes).decode('utf-8', errors='replace')
+        with open(err_path, 'rb') as f:
+            stderr = f.read(64 * 1024).decode('utf-8', errors='replace')
+        if proc.returncode == sandbox.FAILED and stderr.startswith('sandbox: '):
+            raise RuntimeError(stderr.strip())
+        return proc.returncode, timed_out, output_full, elapsed, stdout, stderr
+
+    @staticmethod
+    def _status(returncode, timed_out, output_full):
+        if timed_out or returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+            return STATUS_TIME_LIMIT
+        if returncode == -signal.SIGXFSZ or (returncode != 0 and output_full):
+            return STATUS_OUTPUT_LIMIT
+        if returncode < 0:
+            try:
+                return f"Runtime Error ({signal.Signals(-returncode).name})"
+            except ValueError:
+                return STATUS_RUNTIME_ERROR
+        if returncode > 0:
+            return STATUS_RUNTIME_ERROR
+        return STATUS_ACCEPTED
+
+    # --- Artifact cache ---
+    def _compile(self, artifact, source_code, language):
+        os.makedirs(artifact.workdir, exist_ok=True)
+        source_name, compile_cmd, run_cmd = self._toolchain(language, source_code, artifact.workdir)
+        with open(os.path.join(artifact.workdir, source_name), 'w', encoding='utf-8') as f:
+            f.write(source_code or '')
+        os.chmod(os.path.join(artifact.workdir, source_name), 0o644)
+        if compile_cmd:
+            if shutil.which(compile_cmd[0]) is None:
+                artifact.error = f"Compiler not available: {compile_cmd[0]}"
+                return
+            if self.run_as is not None:
+                # The compiler runs as run_as and writes its output here.
+                os.chown(artifact.workdir, *self.run_as)
+            # Compilers fork helpers (cc1, as, ld) and the JVM needs a large
+            # address space, so only CPU and wall time are capped here.
+            limits = self._limits(max(10, self.cpu_seconds), 0, 0)
+            try:
+                returncode, timed_out, _, elapsed, _, compile_err = self._spawn(
+                    compile_cmd, artifact.workdir, os.devnull, limits, max(30, self.wall_seconds))
+            finally:
+                if self.run_as is not None:
+                    self._seal(artifact.workdir)
+            artifact.compile_time = elapsed
+            if timed_out or returncode != 0:
+                artifact.compile_output = compile_err
+                return
+        artifact.run_cmd = run_cmd
+
+    @staticmethod
+    def _seal(workdir):
+        """Give a compiled artifact to the server's user, readable but not writable by others.
+
+        Runs of the same source share it, whichever team submitted them.
+        """
+        for root, dirs, files in os.walk(workdir, topdown=False):
+            for path in [os.path.join(root, name) for name in dirs + files] + [root]:
+                st = os.lstat(path)
+                if stat.S_ISLNK(st.st_mode):
+                    os.unlink(path)
+                    continue
+                os.chown(path, os.getuid(), os.getgid(), follow_symlinks=False)
+                # The owner's read/execute bits for everyone; write for nobody else.
+                bits = st.st_mode & 0o500
+                os.chmod(path, 0o200 | bits | bits >> 3 | bits >> 6)
+
+    def _acquire(self, source_code, language):
+        """Return the compiled artifact for this source, compiling it at most once."""
+        key = hashlib.sha256(f"{language}\0{source_code or ''}".encode('utf-8')).hexdigest()
+        with self._artifact_lock:
+            artifact = self._artifacts.get(key)
+            owner = artifact is None
+            if owner:
+                artifact = _Artifact(key, os.path.join(self._artifact_root, key))
+                self._artifacts[key] = artifact
+            else:
+                self._artifacts.move_to_end(key)
+            artifact.users += 1
+            self._evict()
+        if owner:
+            try:
+                self._pool.submit(self._compile, artifact, source_code, language).result()
+            except Exception as e:
+                artifact.error = str(e)
+            finally:
+                artifact.ready.set()
+            if artifact.error:
+                # Don't cache infrastructure failures; the next attempt retries.
+                with self._artifact_lock:
+                    if self._artifacts.get(key) is artifact:
+                        del self._artifacts[key]
+                shutil.rmtree(artifact.workdir, ignore_errors=True)
+        else:
+            artifact.ready.wait()
+        return artifact
+
+    def _release(self, artifact):
+        with self._artifact_lock:
+            artifact.users -= 1
+            self._evict()
+
+    def _evict(self):
+        # Caller holds _artifact_lock. Artifacts still in use are skipped.
+        excess = len(self._artifacts) - self.max_artifacts
+        for key in list(self._artifacts):
+            if excess <= 0:
+                break
+            artifact = self._artifacts[key]
+            if artifact.users == 0 and artifact.ready.is_set():
+                del self._artifacts[key]
+                shutil.rmtree(artifact.workdir, ignore_errors=True)
+                excess -= 1
+
+    # --- Running ---
+    def _execute(self, artifact, language, stdin, stdin_path=None):
+        if artifact.error:
+            return {"error": artifact.error}
+        if artifact.run_cmd is None:
+            return {"stdout": "", "stderr": artifact.compile_output, "status": STATUS_COMPILE_ERROR, "time": ""}
+        rundir = tempfile.mkdtemp(prefix='ccp-run-', dir=self._run_root)
+        try:
+            if self.run_as is not None:
+                os.chown(rundir, *self.run_as)
+            if stdin_path is None:
+                stdin_path = os.path.join(rundir, '.stdin')
+                with open(stdin_path, 'w', encoding='utf-8') as f:
+                    f.write(stdin or '')
+            if language == 'java':
+                # The JVM reserves far more address space than it uses and spawns
+                # its own threads; its heap is capped with -Xmx instead.
+                limits = self._limits(self.cpu_seconds, 0, 0)
+            else:
+                limits = self._limits(self.cpu_seconds, self.memory_bytes, self.max_processes)
+            returncode, timed_out, output_full, elapsed, stdout, stderr = self._spawn(
+                artifact.run_cmd, rundir, stdin_path, limits, self.wall_seconds)
+            return {
+                "stdout": stdout,
+                "stderr": stderr,
+                "status": self._status(returncode, timed_out, output_full),
+                "time": f"{elapsed:.3f}"
+            }
+        except Exception as e:
+            return {"error": str(e)}
+        finally:
+            shutil.rmtree(rundir, ignore_errors=True)
+
+    def run(self, source_code, language, stdin=None):
+        artifact = self._acquire(source_code, language)
+        try:
+            return self._pool.submit(self._execute, artifact, language, stdin).result()
+        finally:
+            self._release(artifact)
+
+    def run_cases(self, source_code, language, cases, concurrency=4):
+        """Compile once, then yield (case, result) for every case in order."""
+        artifact = self._acquire(source_code, language)
+        try:
+            yield from _windowed(
+                self._pool,
+                lambda case: self._execute(artifact, language, case.get('input'), case.get('input_path')),
+                cases, concurrency)
+        finally:
+            self._release(artifact)
+
+
+def get_backend():
+    """Build the execution backend selected by the EXECUTION_BACKEND env var.
+
+    The local backend needs EXEC_USER (see the module docstring), unless
+    EXEC_UNSANDBOXED=1 says team code may run as the server's user.
+    """
+    name = os.environ.get('EXECUTION_BACKEND', 'judge0').lower()
+    if name != 'local':
+        return Judge0Backend(
+            os.environ.get('JUDGE0_URL', 'https://ce.judge0.com'),
+            max_workers=_env_int('EXEC_WORKERS', 0) or 8,
+            retries=_env_int('JUDGE0_RETRIES', 3),
+            batch_size=_env_int('JUDGE0_BATCH_SIZE', 20),
+        )
+    run_as = None
+    if os.environ.get('EXEC_USER'):
+        run_as = _user_ids(os.environ['EXEC_USER'])
+    elif os.environ.get('EXEC_UNSANDBOXED') != '1':
+        raise RuntimeError("EXECUTION_BACKEND=local needs EXEC_USER, a dedicated unprivileged user to run "
+                           "submissions as (or EXEC_UNSANDBOXED=1 for local development).")
+    hidden = os.environ.get('EXEC_HIDDEN_PATHS')
+    return LocalBackend(
+        max_workers=_env_int('EXEC_WORKERS', 0) or None,
+        cpu_seconds=_env_int('EXEC_CPU_SECONDS', 2),
+        wall_seconds=_env_int('EXEC_WALL_SECONDS', 5),
+        memory_mb=_env_int('EXEC_MEMORY_MB', 256),
+        max_processes=_env_int('EXEC_MAX_PROCESSES', 64),
+        output_mb=_env_int('EXEC_OUTPUT_MB', 8),
+        max_artifacts=_env_int('EXEC_ARTIFACT_CACHE', 128),
+        run_as=run_as,
+        hidden_paths=hidden.split(os.pathsep) if hidden else [os.getcwd()],
+    )
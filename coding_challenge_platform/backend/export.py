@@ -0,0 +1,145 @@
+"""Zip archives streamed chunk by chunk, with byte ranges for resuming.
+
+Entries are stored (not compressed: submissions are small source files and
+images, and stored data keeps the archive length known before anything is
+read). Each local header is written with the data-descriptor flag, so an
+entry's CRC-32 is worked out while its data streams and written right after
+it. Memory use is one chunk plus a central-directory record per entry,
+whatever the size of the files.
+
+Given the same entries the bytes are always the same, so a download that
+broke off can continue with a Range request: the archive is generated again
+from the start and everything before the requested offset is skipped
+(files before it are still read, for their CRCs, but not sent). Callers
+derive an ETag from the entries (see fingerprint()) so a changed archive
+answers If-Range with the whole file instead.
+"""
+import hashlib
+import struct
+import time
+import zlib
+
+CHUNK_SIZE = 64 * 1024
+# Bit 3: sizes and CRC follow the data; bit 11: names are UTF-8.
+FLAGS = 0x0808
+VERSION = 20
+ZIP32_LIMIT = 0xFFFFFFFF
+MAX_ENTRIES = 0xFFFF
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+DATA_DESCRIPTOR = struct.Struct('<IIII')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<IHHHHIIH')
+
+
+class ArchiveTooLarge(ValueError):
+    pass
+
+
+class Entry:
+    """One archive member: chunks() yields its bytes; size must match exactly."""
+
+    def __init__(self, name, size, mtime, chunks, crc=None, version=None):
+        self.name = name.encode('utf-8')
+        self.size = size
+        self.mtime = mtime  # seconds since the epoch
+        self.chunks = chunks
+        self.crc = crc  # known in advance (lets a resume skip reading it)
+        self.version = version  # anything else that identifies the content, for the ETag
+
+
+def file_entry(name, path, stat_info):
+    def chunks():
+        remaining = stat_info.st_size
+        with open(path, 'rb') as f:
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise IOError(f"{path} shrank while being exported")
+                remaining -= len(chunk)
+                yield chunk
+    return Entry(name, stat_info.st_size, stat_info.st_mtime, chunks)
+
+
+def _dos_time(mtime):
+    t = time.localtime(max(mtime, 315532800))  # zip dates start in 1980
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+def fingerprint(entries):
+    """An ETag for the archive made of entries (names, sizes, mtimes, known CRCs and versions)."""
+    digest = hashlib.sha256()
+    for entry in entries:
+        digest.update(b'%s\0%d\0%d\0%s\0%s\n' % (entry.name, entry.size, int(entry.mtime * 1000),
+                                                 str(entry.crc).encode(), str(entry.version).encode()))
+    return digest.hexdigest()[:24]
+
+
+class StoredZip:
+    def __init__(self, entries):
+        self.entries = list(entries)
+        offset = 0
+        central = 0
+        for entry in self.entries:
+            offset += LOCAL_HEADER.size + len(entry.name) + entry.size + DATA_DESCRIPTOR.size
+            central += CENTRAL_HEADER.size + len(entry.name)
+        if offset > ZIP32_LIMIT or len(self.entries) > MAX_ENTRIES:
+            raise ArchiveTooLarge("Export too large for one zip; narrow it with the round or team filter.")
+        self._central_offset = offset
+        self._central_size = central
+        self.size = offset + central + END_RECORD.size
+
+    def stream(self, start=0, stop=None):
+        """Yield bytes start..stop-1 of the archive."""
+        stop = self.size if stop is None else stop
+        position = 0
+        central = []
+
+        def emit(data):
+            nonlocal position
+            begin = position
+            position += len(data)
+            if position > start and begin < stop:
+                return data[max(0, start - begin):stop - begin]
+            return None
+
+        for entry in self.entries:
+            if position >= stop:
+                return
+            offset = position
+            dos_time, dos_date = _dos_time(entry.mtime)
+            piece = emit(LOCAL_HEADER.pack(0x04034b50, VERSION, FLAGS, 0, dos_time, dos_date, 0, 0, 0,
+                                           len(entry.name), 0) + entry.name)
+            if piece:
+                yield piece
+            data_end = position + entry.size
+            if data_end + DATA_DESCRIPTOR.size <= start and (entry.crc is not None or stop <= self._central_offset):
+                # Data and descriptor wholly skipped, and the CRC is known or
+                # not needed: don't read it.
+                crc = entry.crc or 0
+                position = data_end
+            else:
+                crc = 0
+                for chunk in entry.chunks():
+                    crc = zlib.crc32(chunk, crc)
+                    piece = emit(chunk)
+                    if piece:
+                        yield piece
+                    if position >= stop:
+                        return
+                if position != data_end:
+                    raise IOError(f"{entry.name.decode()} changed size while being exported")
+            piece = emit(DATA_DESCRIPTOR.pack(0x08074b50, crc, entry.size, entry.size))
+            if piece:
+                yield piece
+            central.append(CENTRAL_HEADER.pack(0x02014b50, VERSION, VERSION, FLAGS, 0, dos_time, dos_date, crc,
+                                               entry.size, entry.size, len(entry.name), 0, 0, 0, 0,
+                                               0o100644 << 16, offset) + entry.name)
+        for record in central:
+            piece = emit(record)
+            if piece:
+                yield piece
+        piece = emit(END_RECORD.pack(0x06054b50, 0, 0, len(central), len(central), self._central_size,
+                                     self._central_offset, 0))
+        if piece:
+            yield piece
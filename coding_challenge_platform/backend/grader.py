@@ -0,0 +1,34 @@
+"""Grades Round 3 submissions against their test cases."""
+import time
+
+from suite_store import outputs_match
+
+
+def grade(backend, source_code, language, test_cases, concurrency=4):
+    """Run source_code against every test case and summarise the results.
+
+    test_cases may be a lazy iterable (stored suites are streamed from disk).
+    The backend compiles the submission once (where it can) and runs the
+    cases in parallel, at most `concurrency` at a time; each result is
+    compared and dropped before the next one is read. Returns the pass count
+    plus a per-case breakdown of status and run time.
+    """
+    start = time.monotonic()
+    passed_tests = 0
+    cases = []
+    for index, (case, result) in enumerate(backend.run_cases(source_code, language, test_cases, concurrency)):
+        passed = 'error' not in result and outputs_match(result.get('stdout'), case)
+        if passed:
+            passed_tests += 1
+        cases.append({
+            "case": index + 1,
+            "passed": passed,
+            "status": result.get('status') or result.get('error', ''),
+            "time": result.get('time', '')
+        })
+    return {
+        "passed_tests": passed_tests,
+        "total_tests": len(cases),
+        "cases": cases,
+        "grading_time": round(time.monotonic() - start, 3)
+    }
@@ -0,0 +1,157 @@
+"""In-process job queue for Round 3 grading.
+
+Submissions are validated on the request thread, then handed to a small pool
+of grading threads; the request returns a job id immediately and clients
+poll (or subscribe over Server-Sent Events) for the result. Jobs live in the
+process that accepted them, so run one server process with several threads
+(e.g. gunicorn --workers 1 --threads 16 app:app).
+"""
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+
+from metrics import log_error
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class QueueFull(Exception):
+    pass
+
+
+class _Job:
+    def __init__(self, fn, args):
+        self.id = secrets.token_hex(12)
+        self.fn = fn
+        self.args = args
+        self.status = STATUS_QUEUED
+        self.result = None
+        self.error = None
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+
+class GradingQueue:
+    def __init__(self, workers=4, max_depth=1000, job_ttl=900, history=500):
+        self.max_depth = max_depth
+        self.job_ttl = job_ttl
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._changed = threading.Condition()
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        # Recent wait/run durations (seconds) for the admin stats.
+        self._wait_times = deque(maxlen=history)
+        self._run_times = deque(maxlen=history)
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f'grader-{i}', daemon=True).start()
+
+    def submit(self, fn, *args):
+        """Enqueue fn(*args) and return its job id."""
+        if self._queue.qsize() >= self.max_depth:
+            raise QueueFull()
+        job = _Job(fn, args)
+        with self._changed:
+            self._prune()
+            self._jobs[job.id] = job
+        self._queue.put(job)
+        return job.id
+
+    def _prune(self):
+        # Caller holds _changed. Forget finished jobs older than job_ttl.
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            with self._changed:
+                job.status = STATUS_RUNNING
+                job.started_at = time.time()
+                self._running += 1
+                self._changed.notify_all()
+            try:
+                result, error = job.fn(*job.args), None
+            except Exception as e:
+                result, error = None, str(e)
+                log_error('grading_queue', f"Grading job {job.id} failed: {e}")
+            with self._changed:
+                job.finished_at = time.time()
+                job.result, job.error = result, error
+                job.status = STATUS_FAILED if error else STATUS_DONE
+                job.fn = job.args = None
+                self._running -= 1
+                if error:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+                self._wait_times.append(job.started_at - job.enqueued_at)
+                self._run_times.append(job.finished_at - job.started_at)
+                self._changed.notify_all()
+
+    def _describe(self, job):
+        info = {
+            "job_id": job.id,
+            "status": job.status,
+            "wait_time": round((job.started_at or time.time()) - job.enqueued_at, 3),
+        }
+        if job.status == STATUS_QUEUED:
+            info["queue_depth"] = self._queue.qsize()
+        if job.finished_at is not None:
+            info["run_time"] = round(job.finished_at - job.started_at, 3)
+        if job.status == STATUS_DONE:
+            info["result"] = job.result
+        elif job.status == STATUS_FAILED:
+            info["error"] = job.error
+        return info
+
+    def get(self, job_id):
+        """Return the job's current state, or None for unknown/expired ids."""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return self._describe(job) if job else None
+
+    def wait_for_change(self, job_id, last_status, timeout):
+        """Block until the job leaves last_status (or timeout); return its state."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                remaining = deadline - time.monotonic()
+                if job.status != last_status or remaining <= 0:
+                    return self._describe(job)
+                self._changed.wait(remaining)
+
+    @staticmethod
+    def _summary(samples):
+        if not samples:
+            return {"avg": 0, "p95": 0, "max": 0}
+        ordered = sorted(samples)
+        return {
+            "avg": round(sum(ordered) / len(ordered), 3),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+            "max": round(ordered[-1], 3),
+        }
+
+    def stats(self):
+        with self._changed:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "wait_time": self._summary(self._wait_times),
+                "run_time": self._summary(self._run_times),
+            }
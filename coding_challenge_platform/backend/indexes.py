@@ -0,0 +1,51 @@
+"""MongoDB indexes for the users and scores collections.
+
+Each index backs a query the app runs on a hot path:
+
+users   (username, role) unique   -- student/admin login, signup
+scores  (username, round_name, timestamp)
+                                  -- /admin/scores?team=&round=, newest first
+scores  (username, timestamp desc)
+                                  -- /student/scores
+scores  (timestamp desc)          -- /admin/scores, leaderboard sort
+round_sessions (username, round_name) unique
+                                  -- session upserts
+"""
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+
+from metrics import log_error
+
+USER_INDEXES = [
+    ([("username", ASCENDING), ("role", ASCENDING)], {"name": "username_role", "unique": True}),
+]
+
+SCORE_INDEXES = [
+    ([("username", ASCENDING), ("round_name", ASCENDING), ("timestamp", ASCENDING)],
+     {"name": "username_round_timestamp"}),
+    ([("username", ASCENDING), ("timestamp", DESCENDING)], {"name": "username_timestamp"}),
+    ([("timestamp", DESCENDING)], {"name": "timestamp"}),
+]
+
+SESSION_INDEXES = [
+    ([("username", ASCENDING), ("round_name", ASCENDING)], {"name": "username_round", "unique": True}),
+]
+
+
+def _create(collection, specs):
+    for keys, options in specs:
+        try:
+            collection.create_index(keys, **options)
+        except PyMongoError as e:
+            # e.g. duplicate usernames already stored block the unique index.
+            log_error('indexes', f"Could not create index {options['name']} on {collection.name}: {e}")
+
+
+def ensure_indexes(users_collection, scores_collection, sessions_collection=None):
+    """Create any missing indexes; existing ones are left untouched."""
+    if users_collection is not None:
+        _create(users_collection, USER_INDEXES)
+    if scores_collection is not None:
+        _create(scores_collection, SCORE_INDEXES)
+    if sessions_collection is not None:
+        _create(sessions_collection, SESSION_INDEXES)
@@ -0,0 +1,157 @@
+"""Team leaderboard computed by MongoDB and kept as a materialised cache.
+
+A full rebuild runs one aggregation pipeline (best and latest percentage per
+team and round, plus a weighted total of the bests). Between rebuilds every
+score inserted by this process is folded in with record(), adjusting the
+team's round entry and total in O(1), so the ranking
+stays current without touching the database; the TTL bounds how long scores
+written by other processes can be missing. Scores are written to MongoDB in
+batches (score_buffer.py), so a rebuild first calls flush to write out the
+ones still waiting; otherwise a score recorded just before the first build
+would be missing until the next one. The serialised response is cached
+until the next change, so polling clients cost a dictionary lookup.
+"""
+import json
+import threading
+import time
+
+
+def _format_time(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if hasattr(value, 'strftime') else value
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) else 0
+
+
+class LeaderboardCache:
+    def __init__(self, collection, weights, ttl=30, flush=None):
+        self.collection = collection
+        self.flush = flush  # writes pending scores to the collection
+        self.weights = dict(weights)
+        self.ttl = ttl
+        self._teams = None
+        self._built_at = 0.0
+        self._body = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    def _pipeline(self):
+        weight = {"$switch": {
+            "branches": [{"case": {"$eq": ["$_id.round", name]}, "then": w} for name, w in self.weights.items()],
+            "default": 0
+        }}
+        return [
+            {"$match": {"username": {"$ne": None}}},
+            {"$sort": {"timestamp": 1}},
+            {"$group": {
+                "_id": {"username": "$username", "round": "$round_name"},
+                "best": {"$max": "$percentage"},
+                "latest": {"$last": "$percentage"},
+                "latest_at": {"$last": "$timestamp"},
+                "attempts": {"$sum": 1}
+            }},
+            {"$group": {
+                "_id": "$_id.username",
+                "rounds": {"$push": {
+                    "round": "$_id.round", "best": "$best", "latest": "$latest",
+                    "latest_at": "$latest_at", "attempts": "$attempts"
+                }},
+                "total": {"$sum": {"$multiply": [{"$ifNull": ["$best", 0]}, weight]}}
+            }}
+        ]
+
+    def _rebuild(self):
+        if self.flush is not None:
+            self.flush()
+        teams = {}
+        for row in self.collection.aggregate(self._pipeline(), allowDiskUse=True):
+            teams[row['_id']] = {
+                "total": row['total'],
+                "rounds": {
+                    entry['round']: {
+                        "best": entry['best'], "latest": entry['latest'],
+                        "latest_at": entry['latest_at'], "attempts": entry['attempts']
+                    }
+                    for entry in row['rounds']
+                }
+            }
+        with self._lock:
+            self._teams = teams
+            self._built_at = time.monotonic()
+            self._body = None
+
+    def record(self, score_doc):
+        """Fold a just-inserted score document into the cached standings."""
+        username = score_doc.get('username')
+        if username is None:
+            return
+        with self._lock:
+            if self._teams is None:
+                return
+            team = self._teams.setdefault(username, {"total": 0, "rounds": {}})
+            round_name = score_doc.get('round_name')
+            weight = self.weights.get(round_name, 0)
+            entry = team['rounds'].get(round_name)
+            percentage = score_doc.get('percentage')
+            if entry is None:
+                team['rounds'][round_name] = {
+                    "best": percentage, "latest": percentage,
+                    "latest_at": score_doc.get('timestamp'), "attempts": 1
+                }
+                team['total'] += _number(percentage) * weight
+            else:
+                if _number(percentage) > _number(entry['best']):
+                    team['total'] += (_number(percentage) - _number(entry['best'])) * weight
+                    entry['best'] = percentage
+                entry['latest'] = percentage
+                entry['latest_at'] = score_doc.get('timestamp')
+                entry['attempts'] += 1
+            self._body = None
+
+    def invalidate(self):
+        with self._lock:
+            self._teams = None
+            self._body = None
+
+    def _render(self):
+        # Caller holds _lock.
+        standings = [(username, team['total'], team['rounds']) for username, team in self._teams.items()]
+        standings.sort(key=lambda item: (-item[1], item[0]))
+        teams = []
+        rank = 0
+        previous_total = None
+        for position, (username, total, rounds) in enumerate(standings, 1):
+            if total != previous_total:
+                rank, previous_total = position, total
+            teams.append({
+                "rank": rank,
+                "username": username,
+                "total": round(total, 2),
+                "rounds": {
+                    name: {
+                        "best": entry['best'], "latest": entry['latest'],
+                        "latest_at": _format_time(entry['latest_at']), "attempts": entry['attempts']
+                    }
+                    for name, entry in rounds.items()
+                }
+            })
+        return json.dumps({
+            "generated_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "weights": self.weights,
+            "teams": teams
+        })
+
+    def json(self):
+        """Return the serialised leaderboard, rebuilding it once the TTL has passed."""
+        while True:
+            if self._teams is None or time.monotonic() - self._built_at > self.ttl:
+                with self._rebuild_lock:
+                    if self._teams is None or time.monotonic() - self._built_at > self.ttl:
+                        self._rebuild()
+            with self._lock:
+                if self._teams is None:
+                    continue  # invalidated between rebuild and render
+                if self._body is None:
+                    self._body = self._render()
+                return self._body
@@ -0,0 +1,281 @@
+"""In-process metrics in the Prometheus text format, plus a sampling profiler.
+
+Histograms time requests per route, execution-backend calls, MongoDB
+commands (through a pymongo CommandListener) and file work such as parsing
+the MCQ workbook; counters track errors. GET /metrics renders everything
+registered here. No client library is needed; the exposition format is
+written directly.
+
+The profiler is off by default. When started it samples every thread's
+stack at a fixed interval and aggregates them in the collapsed
+"frame;frame;frame count" format that flame-graph tools read.
+"""
+import bisect
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, [("le", "+Inf")])} {values[-1]}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {values[-2]}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {values[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = _Tally()
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Gauge:
+    """A value read at scrape time: fn() returns a number or {label value tuple: number}.
+
+    kind='counter' exposes a monotonic count kept elsewhere (e.g. cache hits).
+    """
+
+    def __init__(self, name, documentation, fn, labelnames=(), kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        try:
+            value = self.fn()
+        except Exception as e:
+            log_error('metrics', f"Error reading metric {self.name}: {e}")
+            return lines
+        values = value if isinstance(value, dict) else {(): value}
+        for key, number in sorted(values.items()):
+            if number is not None:
+                lines.append(f'{self.name}{_labels(self.labelnames, key)} {number}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'Time to produce a response, per route template.',
+    ('method', 'route', 'status')))
+EXECUTIONS = REGISTRY.register(Histogram(
+    'execution_duration_seconds', 'Execution backend calls (cache misses only).',
+    ('backend', 'operation', 'language')))
+DB_COMMANDS = REGISTRY.register(Histogram(
+    'mongodb_command_duration_seconds', 'MongoDB commands as reported by the driver.',
+    ('collection', 'command', 'outcome')))
+FILE_OPERATIONS = REGISTRY.register(Histogram(
+    'file_operation_duration_seconds', 'Parsing and reading files under uploads/.',
+    ('operation',)))
+ERRORS = REGISTRY.register(Counter(
+    'app_errors_total', 'Errors caught and logged by the app, per source.', ('source',)))
+
+
+def log_error(source, message):
+    """print() the error as before, and count it."""
+    print(message)
+    ERRORS.inc(source=source)
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo listener that feeds DB_COMMANDS; pass it as event_listeners to MongoClient."""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get('collection' if event.command_name == 'getMore' else event.command_name)
+        if not isinstance(collection, str):
+            collection = ''
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event, outcome):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), '')
+        DB_COMMANDS.observe(event.duration_micros / 1e6, collection=collection,
+                            command=event.command_name, outcome=outcome)
+
+    def succeeded(self, event):
+        self._finish(event, 'ok')
+
+    def failed(self, event):
+        self._finish(event, 'error')
+
+
+class TimedBackend:
+    """Wraps an execution backend and times run() and each run_cases() batch."""
+
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(self.backend, attr)
+
+    def run(self, source_code, language, stdin=None):
+        with EXECUTIONS.time(backend=self.name, operation='run', language=language):
+            return self.backend.run(source_code, language, stdin)
+
+    def run_cases(self, source_code, language, cases, concurrency=4):
+        start = time.perf_counter()
+        try:
+            yield from self.backend.run_cases(source_code, language, cases, concurrency)
+        finally:
+            EXECUTIONS.observe(time.perf_counter() - start, backend=self.name,
+                               operation='run_cases', language=language)
+
+
+class SamplingProfiler:
+    def __init__(self, max_depth=64):
+        self.max_depth = max_depth
+        self._stacks = _Tally()
+        self._samples = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.interval = None
+        self.started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=0.01):
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks.clear()
+            self._samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample_loop, name='sampling-profiler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            sampled = []
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                sampled.append(';'.join(reversed(stack)))
+            with self._lock:
+                self._stacks.update(sampled)
+                self._samples += 1
+
+    def status(self):
+        with self._lock:
+            return {"running": self.running, "interval": self.interval, "samples": self._samples,
+                    "started_at": self.started_at, "stacks": len(self._stacks)}
+
+    def collapsed(self, limit=None):
+        """Stacks in collapsed format, most frequent first."""
+        with self._lock:
+            top = self._stacks.most_common(limit)
+        return ''.join(f"{stack} {count}\n" for stack, count in top)
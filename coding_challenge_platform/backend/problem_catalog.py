@@ -0,0 +1,152 @@
+"""In-memory catalog of the Round 2 and Round 3 problem files.
+
+Every file under uploads/<round>/<lang>/ (round = scramble or debug) is
+listed once at startup with its size, mtime and SHA-256, and the list
+endpoints answer from memory: a JSON body and an ETag per directory, built
+when the directory changes, so a team's page load costs a dictionary lookup
+and, when the browser already has the list, a 304.
+
+admin_upload refreshes the directory it wrote to. Files copied in by hand
+are picked up by a background thread that re-scans every poll_interval
+seconds (a stat per file; only files whose mtime or size changed are hashed
+again). on_change(path, removed) is called for each file that appeared,
+was rewritten or went away, so caches built from problem files can be
+rebuilt off the request path.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from metrics import FILE_OPERATIONS, log_error
+
+ROUNDS = ('scramble', 'debug')
+CHUNK_SIZE = 64 * 1024
+
+
+class Listing:
+    def __init__(self, files):
+        self.files = files  # name -> {"name", "size", "mtime", "sha256"}, sorted by name
+        self.body = json.dumps(list(files)).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:20]
+
+
+EMPTY = Listing({})
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ProblemCatalog:
+    def __init__(self, root, rounds=ROUNDS, poll_interval=2.0, on_change=None):
+        self.root = root
+        self.rounds = rounds
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self._listings = {}  # (round, lang) -> Listing
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()  # one scan at a time: poller or admin_upload
+        self.scans = 0
+        self.hashed = 0
+
+    def load(self):
+        """Scan every round directory now (without change notifications)."""
+        for round_name in self.rounds:
+            for lang in self._languages(round_name):
+                self.refresh(round_name, lang, notify=False)
+
+    def start(self):
+        if self.poll_interval:
+            threading.Thread(target=self._poll_loop, name='problem-catalog', daemon=True).start()
+
+    def _languages(self, round_name):
+        try:
+            with os.scandir(os.path.join(self.root, round_name)) as entries:
+                return [entry.name for entry in entries if entry.is_dir()]
+        except FileNotFoundError:
+            return []
+
+    def refresh(self, round_name, lang, notify=True):
+        """Re-scan one directory; returns the paths that changed."""
+        dir_path = os.path.join(self.root, round_name, lang)
+        with self._scan_lock, FILE_OPERATIONS.time(operation='problem_catalog_scan'):
+            previous = self._listings.get((round_name, lang))
+            old_files = previous.files if previous is not None else {}
+            files = {}
+            changed = []
+            try:
+                with os.scandir(dir_path) as entries:
+                    found = sorted((entry.name, entry.stat()) for entry in entries if entry.is_file())
+            except FileNotFoundError:
+                found = []
+            for name, stat_info in found:
+                old = old_files.get(name)
+                if old is not None and (old['mtime'], old['size']) == (stat_info.st_mtime_ns, stat_info.st_size):
+                    files[name] = old
+                    continue
+                try:
+                    sha256 = _sha256(os.path.join(dir_path, name))
+                except OSError:
+                    continue  # removed between the scan and the read
+                files[name] = {"name": name, "size": stat_info.st_size, "mtime": stat_info.st_mtime_ns,
+                               "sha256": sha256}
+                self.hashed += 1
+                changed.append((os.path.join(dir_path, name), False))
+            changed.extend((os.path.join(dir_path, name), True) for name in old_files if name not in files)
+            with self._lock:
+                self.scans += 1
+                if previous is None or changed:
+                    self._listings[(round_name, lang)] = Listing(files)
+        if notify and self.on_change is not None:
+            for path, removed in changed:
+                try:
+                    self.on_change(path, removed)
+                except Exception as e:
+                    log_error('problem_catalog', f"Error handling change of {path}: {e}")
+        return [path for path, _ in changed]
+
+    def refresh_all(self):
+        for round_name in self.rounds:
+            langs = set(self._languages(round_name))
+            langs.update(lang for known_round, lang in list(self._listings) if known_round == round_name)
+            for lang in langs:
+                self.refresh(round_name, lang)
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.refresh_all()
+            except Exception as e:
+                log_error('problem_catalog', f"Error scanning problem files: {e}")
+
+    def listing(self, round_name, lang):
+        """The Listing of one directory, or None for a round outside the catalog."""
+        if round_name not in self.rounds:
+            return None
+        listing = self._listings.get((round_name, lang))
+        if listing is None:
+            if (lang != os.path.basename(lang) or lang.startswith('.')
+                    or not os.path.isdir(os.path.join(self.root, round_name, lang))):
+                return EMPTY
+            # A directory made since the last scan: look now rather than at the next poll.
+            self.refresh(round_name, lang)
+            listing = self._listings.get((round_name, lang), EMPTY)
+        return listing
+
+    def snapshot(self):
+        with self._lock:
+            return {f"{round_name}/{lang}": list(listing.files.values())
+                    for (round_name, lang), listing in sorted(self._listings.items())}
+
+    def stats(self):
+        with self._lock:
+            return {"directories": len(self._listings),
+                    "files": sum(len(listing.files) for listing in self._listings.values()),
+                    "scans": self.scans, "files_hashed": self.hashed, "poll_interval_seconds": self.poll_interval}
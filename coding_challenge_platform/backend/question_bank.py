@@ -0,0 +1,99 @@
+"""In-memory cache of the Round 1 MCQ workbook.
+
+The workbook is parsed once into a header tuple plus one tuple per row and
+published as a single immutable snapshot, so concurrent readers never see a
+half-built bank. Snapshots are keyed on the file's mtime/size and SHA-256:
+a changed mtime triggers a re-hash, and only a changed hash triggers a
+re-parse.
+"""
+import hashlib
+import io
+import os
+import random
+import threading
+from collections import namedtuple
+
+from openpyxl import load_workbook
+
+from metrics import FILE_OPERATIONS
+
+Snapshot = namedtuple('Snapshot', ['mtime_ns', 'size', 'digest', 'headers', 'rows'])
+
+
+class QuestionBank:
+    def __init__(self, path):
+        self.path = path
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_fresh(snapshot, stat_info):
+        return (snapshot is not None
+                and snapshot.mtime_ns == stat_info.st_mtime_ns
+                and snapshot.size == stat_info.st_size)
+
+    def _parse(self, data):
+        with FILE_OPERATIONS.time(operation='xlsx_parse'):
+            return self._parse_rows(data)
+
+    def _parse_rows(self, data):
+        wb = load_workbook(io.BytesIO(data), read_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            headers = tuple(next(rows, ()))
+            width = len(headers)
+            parsed = []
+            for row in rows:
+                row = tuple(row[:width])
+                parsed.append(row + (None,) * (width - len(row)))
+            return headers, tuple(parsed)
+        finally:
+            wb.close()
+
+    def snapshot(self):
+        """Return the current snapshot, rebuilding it if the file changed.
+
+        Returns None when the workbook has not been uploaded yet.
+        """
+        try:
+            stat_info = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot, stat_info):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot, stat_info):
+                return snapshot
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            if snapshot is not None and snapshot.digest == digest:
+                # Touched but unchanged: keep the parsed rows.
+                snapshot = snapshot._replace(mtime_ns=stat_info.st_mtime_ns, size=stat_info.st_size)
+            else:
+                headers, rows = self._parse(data)
+                snapshot = Snapshot(stat_info.st_mtime_ns, stat_info.st_size, digest, headers, rows)
+            self._snapshot = snapshot
+            return snapshot
+
+    def reload(self):
+        """Drop the cached snapshot and rebuild it from disk (used after uploads)."""
+        with self._lock:
+            self._snapshot = None
+        return self.snapshot()
+
+    def all(self):
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+        return [dict(zip(snapshot.headers, row)) for row in snapshot.rows]
+
+    def sample(self, k):
+        """Pick up to k random questions; only the picked rows become dicts."""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+        picked = random.sample(snapshot.rows, min(k, len(snapshot.rows)))
+        return [dict(zip(snapshot.headers, row)) for row in picked]
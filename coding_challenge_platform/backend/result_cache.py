@@ -0,0 +1,213 @@
+"""Cache of Round 3 execution results, shared by check and submit.
+
+Results are keyed by a hash of language, source and stdin (for stored test
+cases, the input file's path, size and mtime stand in for its contents) and
+kept in a bounded LRU with a TTL. Identical runs that arrive while the first
+one is still executing wait for it instead of starting their own.
+Only outcomes that the source and input decide are cached: Accepted, Wrong
+Answer, Compilation Error and runtime errors other than kills. Time and
+output limits, kills, judge-side failures and failed attempts
+({"error": ...}) can come out differently on a retry, and are run again;
+so are oversized outputs.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Cases are claimed this many at a time in run_cases().
+CHUNK_SIZE = 64
+
+DETERMINISTIC_STATUSES = frozenset({"Accepted", "Wrong Answer", "Compilation Error"})
+# Runtime errors from these signals are limits or outside kills, not the program's doing.
+KILL_SIGNALS = ('SIGKILL', 'SIGXCPU', 'SIGXFSZ', 'SIGTERM', 'Other')
+
+
+def run_key(source_code, language, stdin):
+    digest = hashlib.sha256()
+    for part in (language, source_code or '', stdin or ''):
+        digest.update(part.encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def case_key(source_code, language, case):
+    if case.get('input_path'):
+        stat_info = os.stat(case['input_path'])
+        # NUL can't start real stdin text, so file keys never collide with inline input.
+        stdin = f"\0file:{case['input_path']}:{stat_info.st_size}:{stat_info.st_mtime_ns}"
+    else:
+        stdin = case.get('input') or ''
+    return run_key(source_code, language, stdin)
+
+
+class _Pending:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class ResultCache:
+    def __init__(self, max_entries=2048, ttl=600, max_result_bytes=64 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_result_bytes = max_result_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def claim(self, key):
+        """Return ('hit', result), ('wait', pending) or ('run', pending).
+
+        A 'run' claim must be finished with complete(), even on failure.
+        """
+        with self._lock:
+            return self._claim(key)
+
+    def claim_all(self, keys):
+        """claim() for several keys at once, atomically."""
+        with self._lock:
+            return [self._claim(key) for key in keys]
+
+    def _claim(self, key):
+        # Caller holds _lock.
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return 'hit', entry[1]
+            del self._entries[key]
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.shared += 1
+            return 'wait', pending
+        self.misses += 1
+        pending = self._pending[key] = _Pending()
+        return 'run', pending
+
+    def peek(self, key):
+        """The cached result for key, or None; doesn't start or wait for a run."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _cacheable(self, result):
+        if result is None or 'error' in result:
+            return False
+        status = result.get('status') or ''
+        if status not in DETERMINISTIC_STATUSES and not (
+                status.startswith('Runtime Error') and not any(name in status for name in KILL_SIGNALS)):
+            return False
+        size = len(result.get('stdout') or '') + len(result.get('stderr') or '')
+        return size <= self.max_result_bytes
+
+    def complete(self, key, pending, result):
+        """Publish a claimed run's result (None if it raised) to waiters and the cache."""
+        with self._lock:
+            self._pending.pop(key, None)
+            if self._cacheable(result):
+                self._entries[key] = (time.monotonic() + self.ttl, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        pending.result = result
+        pending.done.set()
+
+    def get_or_run(self, key, fn):
+        state, value = self.claim(key)
+        if state == 'hit':
+            return value
+        if state == 'wait':
+            value.done.wait()
+            # The run we waited for raised; try it ourselves.
+            return value.result if value.result is not None else fn()
+        result = None
+        try:
+            result = fn()
+            return result
+        finally:
+            self.complete(key, value, result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.shared
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_in_flight": self.shared,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.shared) / lookups, 4) if lookups else None
+            }
+
+
+class CachingBackend:
+    """Wraps an execution backend so run() and run_cases() go through a ResultCache."""
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+
+    def run(self, source_code, language, stdin=None):
+        return self.cache.get_or_run(run_key(source_code, language, stdin),
+                                     lambda: self.backend.run(source_code, language, stdin))
+
+    def _run_chunk(self, source_code, language, chunk, concurrency):
+        # One atomic claim per chunk, and a chunk's runs finish before the next
+        # is claimed: a request only waits on runs claimed before its own, so two
+        # requests sharing cases can't end up waiting on each other.
+        keys = [case_key(source_code, language, case) for case in chunk]
+        claims = list(zip(chunk, keys, self.cache.claim_all(keys)))
+        owned = [(case, key, pending) for case, key, (state, pending) in claims if state == 'run']
+        runs = None
+        if owned:
+            runs = self.backend.run_cases(source_code, language, (case for case, _, _ in owned), concurrency)
+        try:
+            for case, key, (state, value) in claims:
+                if state == 'hit':
+                    yield case, value
+                elif state == 'run':
+                    # The backend yields in case order, so results are passed on as they finish.
+                    _, result = next(runs)
+                    self.cache.complete(key, value, result)
+                    yield case, result
+                else:
+                    value.done.wait()
+                    result = value.result
+                    if result is None:
+                        result = list(self.backend.run_cases(source_code, language, [case], 1))[0][1]
+                    yield case, result
+        finally:
+            if runs is not None:
+                runs.close()
+            for case, key, pending in owned:
+                if not pending.done.is_set():
+                    self.cache.complete(key, pending, None)
+
+    def run_cases(self, source_code, language, cases, concurrency=4):
+        """Yield (case, result) in order; only uncached cases reach the backend."""
+        chunk = []
+        for case in cases:
+            chunk.append(case)
+            if len(chunk) == CHUNK_SIZE:
+                yield from self._run_chunk(source_code, language, chunk, concurrency)
+                chunk = []
+        if chunk:
+            yield from self._run_chunk(source_code, language, chunk, concurrency)
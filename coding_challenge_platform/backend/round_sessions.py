@@ -0,0 +1,118 @@
+"""Server-side round timers.
+
+A team's session for a timed round starts the first time it fetches the
+round's content (/get_mcq_questions, /get_buggy_code) and is kept in memory,
+so deadline checks on submit are a dictionary lookup. New sessions are
+written to the round_sessions collection by a background thread every few
+seconds ($min on started_at, so the earliest start always wins) and loaded
+back at startup.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from metrics import log_error
+
+
+class RoundSessions:
+    def __init__(self, collection, limits, flush_interval=5, grace_seconds=0):
+        self.collection = collection
+        self.limits = dict(limits)  # round_name -> minutes
+        self.flush_interval = flush_interval
+        self.grace_seconds = grace_seconds
+        self._sessions = {}  # (username, round_name) -> started_at
+        self._dirty = set()
+        self._lock = threading.Lock()
+        if collection is not None:
+            threading.Thread(target=self._flush_loop, name='round-sessions', daemon=True).start()
+            atexit.register(self.flush)
+
+    def load(self):
+        """Read persisted sessions into memory (earliest start wins)."""
+        if self.collection is None:
+            return
+        try:
+            for doc in self.collection.find({}, {"_id": 0, "username": 1, "round_name": 1, "started_at": 1}):
+                key = (doc.get('username'), doc.get('round_name'))
+                with self._lock:
+                    current = self._sessions.get(key)
+                    if current is None or doc['started_at'] < current:
+                        self._sessions[key] = doc['started_at']
+        except PyMongoError as e:
+            log_error('round_sessions', f"Error loading round sessions: {e}")
+
+    def start(self, username, round_name, now=None):
+        """Record the round start for a team unless it has already started; returns the start time."""
+        key = (username, round_name)
+        with self._lock:
+            started_at = self._sessions.get(key)
+            if started_at is None:
+                started_at = self._sessions[key] = now or datetime.now()
+                self._dirty.add(key)
+            return started_at
+
+    def status(self, username, round_name, now=None):
+        """Timer state for a team's round (started_at is None before the first fetch)."""
+        now = now or datetime.now()
+        started_at = self._sessions.get((username, round_name))
+        limit = self.limits.get(round_name)
+        state = {
+            "round": round_name,
+            "started_at": started_at.strftime('%Y-%m-%d %H:%M:%S') if started_at else None,
+            "limit_seconds": limit * 60 if limit else None,
+            "elapsed_seconds": None,
+            "remaining_seconds": None,
+            "expired": False
+        }
+        if started_at is not None:
+            elapsed = (now - started_at).total_seconds()
+            state["elapsed_seconds"] = round(elapsed, 1)
+            if limit:
+                state["remaining_seconds"] = max(0, round(limit * 60 - elapsed, 1))
+                state["expired"] = elapsed > limit * 60
+        return state
+
+    def check(self, username, round_name, now=None):
+        """Return (within limit, elapsed minutes) for a submission made at now.
+
+        A team submitting without having fetched the round starts its session now.
+        """
+        now = now or datetime.now()
+        started_at = self.start(username, round_name, now)
+        elapsed = (now - started_at).total_seconds()
+        limit = self.limits.get(round_name)
+        within = limit is None or elapsed <= limit * 60 + self.grace_seconds
+        return within, elapsed / 60.0
+
+    def flush(self):
+        """Write sessions started since the last flush."""
+        with self._lock:
+            batch = [(key, self._sessions[key]) for key in self._dirty]
+            self._dirty.clear()
+        if not batch or self.collection is None:
+            return
+        try:
+            self.collection.bulk_write([
+                UpdateOne({"username": username, "round_name": round_name},
+                          {"$min": {"started_at": started_at}}, upsert=True)
+                for (username, round_name), started_at in batch
+            ], ordered=False)
+        except Exception as e:
+            # Keep them dirty and retry on the next tick.
+            log_error('round_sessions', f"Error saving round sessions: {e}")
+            with self._lock:
+                self._dirty.update(key for key, _ in batch)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._dirty.clear()
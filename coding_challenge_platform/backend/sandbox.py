@@ -0,0 +1,86 @@
+"""Exec helper that LocalBackend starts every compile and run through.
+
+LocalBackend runs this file's source as `python -S -c <source> CONFIG CMD...`
+(see executor.py), already as EXEC_USER: Popen switches uid, gid and groups
+before exec. That keeps all setup out of the server's forked child, which
+copies a multithreaded process and may only safely call exec. This fresh,
+single-threaded interpreter then:
+- with "hidden" set, enters a new user, network and mount namespace, and
+  covers each hidden path with an empty read-only tmpfs. Unprivileged user
+  namespaces must be enabled; the mounts are locked, so the command cannot
+  unmount them, and it gets no capabilities outside the namespace;
+- sets umask 077 and the rlimits in CONFIG;
+- execs CMD, which keeps this pid.
+If setup fails it exits with FAILED and a "sandbox:" line on stderr.
+"""
+import ctypes
+import errno
+import json
+import os
+import resource
+import sys
+
+FAILED = 125
+
+# <sched.h> and <sys/mount.h>
+CLONE_NEWNS = 0x00020000
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWNET = 0x40000000
+MS_RDONLY = 0x1
+MS_REC = 0x4000
+MS_PRIVATE = 0x40000
+
+
+def isolate(hidden_paths):
+    libc = ctypes.CDLL(None, use_errno=True)
+
+    def check(result, what):
+        if result != 0:
+            code = ctypes.get_errno()
+            raise OSError(code, f"{what}: {os.strerror(code)}")
+
+    uid, gid = os.getuid(), os.getgid()
+    check(libc.unshare(CLONE_NEWUSER | CLONE_NEWNS | CLONE_NEWNET), 'unshare')
+    # Map only our own ids, so the namespace grants nothing outside it.
+    for name, text in (('setgroups', 'deny'), ('uid_map', f'{uid} {uid} 1'), ('gid_map', f'{gid} {gid} 1')):
+        with open(f'/proc/self/{name}', 'w') as f:
+            f.write(text)
+    # Keep the mounts below from propagating back to the server's namespace.
+    check(libc.mount(b'none', b'/', None, MS_REC | MS_PRIVATE, None), 'mount --make-rprivate /')
+    for path in hidden_paths:
+        path = os.fsencode(path)
+        if libc.mount(b'tmpfs', path, b'tmpfs', MS_RDONLY, b'size=4k,mode=0') != 0:
+            code = ctypes.get_errno()
+            if code in (errno.EACCES, errno.ENOENT):
+                continue  # Not reachable by this user anyway.
+            raise OSError(code, f"mount tmpfs {path!r}: {os.strerror(code)}")
+
+
+def limit(config):
+    os.umask(0o077)
+    cpu = config['cpu']
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (config['output'], config['output']))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if config.get('memory'):
+        resource.setrlimit(resource.RLIMIT_AS, (config['memory'], config['memory']))
+    if config.get('processes'):
+        resource.setrlimit(resource.RLIMIT_NPROC, (config['processes'], config['processes']))
+
+
+def main(argv):
+    try:
+        config = json.loads(argv[0])
+        cmd = argv[1:]
+        if config.get('hidden') is not None:
+            isolate(config['hidden'])
+        limit(config)
+        os.execvp(cmd[0], cmd)
+    except Exception as e:
+        sys.stderr.write(f"sandbox: {e}\n")
+        sys.stderr.flush()
+        os._exit(FAILED)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
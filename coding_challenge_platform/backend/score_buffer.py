@@ -0,0 +1,145 @@
+"""Write-behind buffer for score documents.
+
+The submit endpoints hand their score document to ScoreBuffer.add(), which
+appends it to a local journal (one Extended JSON line per document) and
+returns; a background thread writes pending documents to MongoDB with
+insert_many, as soon as max_batch are waiting or every flush_interval
+seconds. When a round closes and every team submits at once, responses no
+longer wait on a MongoDB round-trip each.
+
+Durability: a document is in the journal before add() returns. Documents
+get their _id here, so replaying the journal after a crash (done at
+startup by recover()) inserts each one at most once: a document that had
+already reached MongoDB comes back as a duplicate-key error and is dropped.
+The journal is truncated whenever nothing is pending.
+
+Read-your-writes: pending(username) returns a team's documents that are not
+in MongoDB yet, for /student/scores to merge in. Run one server process per
+journal file.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+
+from metrics import log_error
+
+DUPLICATE_KEY = 11000
+JSON_OPTIONS = json_util.JSONOptions(tz_aware=False)
+
+
+class ScoreBuffer:
+    def __init__(self, collection, journal_path, max_batch=500, flush_interval=0.5, fsync=False):
+        self.collection = collection
+        self.journal_path = journal_path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._pending = OrderedDict()  # _id -> document, oldest first
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(journal_path)), exist_ok=True)
+        self._journal = open(journal_path, 'a', encoding='utf-8')
+        self.flushed = 0
+        self.batches = 0
+        self.replayed = 0
+        self.last_error = None
+        threading.Thread(target=self._flush_loop, name='score-buffer', daemon=True).start()
+        atexit.register(self.flush)
+
+    def recover(self):
+        """Queue documents left in the journal by a previous process; returns how many."""
+        documents = []
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    documents.append(json_util.loads(line, json_options=JSON_OPTIONS))
+                except ValueError:
+                    # A line cut short by the crash; add() had not returned for it.
+                    continue
+        with self._lock:
+            for doc in documents:
+                self._pending.setdefault(doc['_id'], doc)
+            self.replayed += len(documents)
+            self._wakeup.notify()
+        return len(documents)
+
+    def add(self, doc):
+        """Journal a score document and queue it for MongoDB; sets doc['_id']."""
+        doc.setdefault('_id', ObjectId())
+        line = json_util.dumps(doc) + '\n'
+        with self._lock:
+            self._journal.write(line)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._pending[doc['_id']] = doc
+            if len(self._pending) >= self.max_batch:
+                self._wakeup.notify()
+        return doc
+
+    def pending(self, username):
+        """Copies of the team's documents not yet written to MongoDB."""
+        with self._lock:
+            return [dict(doc) for doc in self._pending.values() if doc.get('username') == username]
+
+    def flush(self):
+        """Write everything pending; on an error the rest stays queued for the next tick."""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = list(islice(self._pending.values(), self.max_batch))
+                if not batch:
+                    return
+                try:
+                    self._insert(batch)
+                except Exception as e:
+                    self.last_error = str(e)
+                    log_error('score_buffer', f"Error writing scores (kept for retry): {e}")
+                    return
+                with self._lock:
+                    for doc in batch:
+                        self._pending.pop(doc['_id'], None)
+                    self.flushed += len(batch)
+                    self.batches += 1
+                    self.last_error = None
+                    if not self._pending:
+                        # Everything in the journal is in MongoDB now.
+                        self._journal.truncate(0)
+
+    def _insert(self, batch):
+        try:
+            self.collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Already written before a restart: the journal replay is done.
+            if any(error.get('code') != DUPLICATE_KEY for error in e.details.get('writeErrors', [])):
+                raise
+
+    def _flush_loop(self):
+        while True:
+            with self._wakeup:
+                self._wakeup.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                log_error('score_buffer', f"Error in score flush loop: {e}")
+                time.sleep(self.flush_interval)
+
+    def clear(self):
+        """Drop pending documents (used when all scores are deleted)."""
+        # Wait for a batch in flight, so it can't land after the caller's delete.
+        with self._flush_lock, self._lock:
+            self._pending.clear()
+            self._journal.truncate(0)
+
+    def stats(self):
+        with self._lock:
+            return {"pending": len(self._pending), "flushed": self.flushed, "batches": self.batches,
+                    "replayed": self.replayed, "journal_bytes": os.fstat(self._journal.fileno()).st_size,
+                    "last_error": self.last_error}
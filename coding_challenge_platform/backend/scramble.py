@@ -0,0 +1,164 @@
+"""Round 2 (code scramble) reference cache and scoring.
+
+Reference solutions are read and normalised once per file version and kept
+in memory. Submissions are scored by the longest common subsequence of
+lines, computed with a bit-parallel algorithm: each distinct line becomes a
+bitmask of its positions in the reference, so one pass over the submission
+costs O(n * m / wordsize) no matter how often lines like "}" repeat.
+
+Puzzles come from a pool of scrambled variants built once per file version
+(on upload, or on first request for a file copied in by hand). Shuffles are
+seeded from the file's content, so the pool is the same after a restart, and
+a team always gets the variant picked by hashing its name with the file
+path: a refresh shows the same puzzle, and an admin can reproduce it later.
+Both caches keep the most recently used files only.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+from collections import OrderedDict
+
+from metrics import FILE_OPERATIONS
+
+
+def normalize_lines(code):
+    """Strip every line and drop blank ones (the form both sides are compared in)."""
+    return [line.strip() for line in (code or '').strip().split('\n') if line.strip()]
+
+
+def lcs_length(reference, submitted):
+    """Length of the longest common subsequence of two line lists."""
+    if not reference or not submitted:
+        return 0
+    masks = {}
+    for position, line in enumerate(reference):
+        masks[line] = masks.get(line, 0) | (1 << position)
+    full = (1 << len(reference)) - 1
+    v = full
+    for line in submitted:
+        u = v & masks.get(line, 0)
+        v = ((v + u) | (v - u)) & full
+    return len(reference) - v.bit_count()
+
+
+def similarity(reference, submitted):
+    """2 * LCS / (len(a) + len(b)): difflib's ratio() with an exact matcher."""
+    total = len(reference) + len(submitted)
+    if not total:
+        return 1.0
+    return 2.0 * lcs_length(reference, submitted) / total
+
+
+class ReferenceCache:
+    """Normalised reference lines per file, refreshed when the file changes."""
+
+    def __init__(self, max_files=256):
+        self.max_files = max_files
+        self._entries = OrderedDict()  # path -> ((mtime_ns, size), lines), least recently used first
+        self._lock = threading.Lock()
+
+    def lines(self, full_path):
+        """Return the reference lines for full_path; raises FileNotFoundError."""
+        key = os.path.normpath(full_path)
+        stat_info = os.stat(key)
+        version = (stat_info.st_mtime_ns, stat_info.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+        with FILE_OPERATIONS.time(operation='scramble_reference_read'), open(key, 'r') as f:
+            lines = tuple(normalize_lines(f.read()))
+        with self._lock:
+            _put(self._entries, key, (version, lines), self.max_files)
+        return lines
+
+    def invalidate(self, full_path):
+        with self._lock:
+            self._entries.pop(os.path.normpath(full_path), None)
+
+
+def _put(entries, key, entry, max_files):
+    # Caller holds the lock.
+    entries[key] = entry
+    entries.move_to_end(key)
+    while len(entries) > max_files:
+        entries.popitem(last=False)
+
+
+def scramble_lines(code, rng):
+    """The file's non-blank lines (indentation kept) in a shuffled order."""
+    lines = [line for line in code.strip().split('\n') if line.strip()]
+    original = list(lines)
+    for _ in range(8):
+        rng.shuffle(lines)
+        # Don't hand out the solution itself when another order exists.
+        if lines != original or len(set(original)) < 2:
+            break
+    return '\n'.join(lines)
+
+
+class VariantPool:
+    """Pre-scrambled variants per file, served as ready-made JSON bodies."""
+
+    def __init__(self, size=16, max_files=256):
+        self.size = size
+        self.max_files = max_files
+        # path -> ((mtime_ns, size), (JSON body per variant)), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _version(key):
+        stat_info = os.stat(key)
+        return stat_info.st_mtime_ns, stat_info.st_size
+
+    def _generate(self, key):
+        with FILE_OPERATIONS.time(operation='scramble_variants_build'):
+            version = self._version(key)
+            with open(key, 'r') as f:
+                code = f.read()
+            digest = hashlib.sha256(code.encode()).hexdigest()
+            bodies = tuple(
+                json.dumps({"code": scramble_lines(code, random.Random(f"{digest}:{index}")),
+                            "variant": index}).encode()
+                for index in range(self.size))
+            return version, bodies
+
+    def build(self, full_path):
+        """(Re)build the pool for a file, e.g. right after it is uploaded."""
+        key = os.path.normpath(full_path)
+        entry = self._generate(key)
+        with self._lock:
+            _put(self._entries, key, entry, self.max_files)
+        return entry[1]
+
+    def variants(self, full_path):
+        """JSON bodies of every variant; raises FileNotFoundError."""
+        key = os.path.normpath(full_path)
+        version = self._version(key)
+        with self._lock:
+            # Another request may have built it while this one waited.
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                entry = self._generate(key)
+            _put(self._entries, key, entry, self.max_files)
+            return entry[1]
+
+    def index_for(self, full_path, team):
+        """Variant number assigned to team for this file (stable across restarts)."""
+        seed = f"{team}\0{os.path.normpath(full_path)}".encode()
+        return int.from_bytes(hashlib.sha256(seed).digest()[:8], 'big') % self.size
+
+    def variant(self, full_path, team=None):
+        """JSON body of team's variant, or of a random one when team is None."""
+        bodies = self.variants(full_path)
+        if team is None:
+            return random.choice(bodies)
+        return bodies[self.index_for(full_path, team)]
+
+    def invalidate(self, full_path):
+        with self._lock:
+            self._entries.pop(os.path.normpath(full_path), None)
@@ -0,0 +1,273 @@
+"""Near-duplicate detection across teams for Round 2 and Round 3 submissions.
+
+Every team starts from the same file (the scrambled reference in Round 2,
+the buggy program in Round 3), so whole submissions all look alike. What is
+compared is each submission's own part: its token 5-grams ("shingles") that
+the problem's base file does not contain -- the lines a team added or
+changed in Round 3, the line orders it chose in Round 2. A submission that
+equals the base has no own part and is not indexed.
+
+Each own part is reduced to a 64-value MinHash signature when the submission
+is saved and stored in the submissions database (latest submission per team
+and problem). In memory, signatures are kept in an LSH index of 16 bands of
+4 rows: two submissions with a Jaccard similarity of 0.7 share a bucket in
+some band with probability 0.99 (0.89 at 0.6). Clustering only compares
+submissions that share a bucket, and links pairs whose estimated similarity
+reaches the threshold, so it costs roughly O(n) instead of O(n^2).
+
+Signatures of submissions saved before this index existed can be computed
+with:
+
+    cd backend && python similarity_index.py --backfill
+"""
+import argparse
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import zlib
+from collections import defaultdict
+
+from metrics import FILE_OPERATIONS
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Fewer own shingles than this is a trivial change (one token, say), not evidence.
+MIN_SHINGLES = 3
+# Buckets larger than this compare members with the first one only.
+MAX_BUCKET_PAIRS = 64
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)  # fixed, so stored signatures stay comparable
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_SIGNATURE = struct.Struct(f'<{NUM_PERM}Q')
+
+COMMENTS = re.compile(r'/\*.*?\*/|//[^\n]*|#[^\n]*', re.S)
+TOKENS = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|\w+|[^\w\s]')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    problem TEXT NOT NULL,
+    team_name TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    shingles INTEGER NOT NULL,
+    signature BLOB NOT NULL,
+    PRIMARY KEY (problem, team_name)
+);
+"""
+
+
+def tokenize(code):
+    """Tokens of a program with comments and layout removed (C-style and # comments)."""
+    return TOKENS.findall(COMMENTS.sub(' ', code or ''))
+
+
+def shingles(code):
+    """CRC32 hashes of the token 5-grams of a program."""
+    tokens = tokenize(code)
+    if len(tokens) < SHINGLE_SIZE:
+        return {zlib.crc32(' '.join(tokens).encode())} if tokens else set()
+    return {zlib.crc32(' '.join(tokens[i:i + SHINGLE_SIZE]).encode())
+            for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    return tuple(min((a * value + b) % _PRIME for value in shingle_set) for a, b in _PERMUTATIONS)
+
+
+def estimate(signature_a, signature_b):
+    """Estimated Jaccard similarity: the fraction of equal MinHash values."""
+    return sum(1 for x, y in zip(signature_a, signature_b) if x == y) / NUM_PERM
+
+
+def _band_keys(signature):
+    return [signature[band * ROWS:(band + 1) * ROWS] for band in range(BANDS)]
+
+
+class _Problem:
+    def __init__(self):
+        self.members = {}  # team -> (file_path, signature)
+        self.bands = [defaultdict(set) for _ in range(BANDS)]
+
+    def put(self, team, file_path, signature):
+        self.remove(team)
+        self.members[team] = (file_path, signature)
+        for band, key in zip(self.bands, _band_keys(signature)):
+            band[key].add(team)
+
+    def remove(self, team):
+        entry = self.members.pop(team, None)
+        if entry is None:
+            return
+        for band, key in zip(self.bands, _band_keys(entry[1])):
+            bucket = band.get(key)
+            if bucket is not None:
+                bucket.discard(team)
+                if not bucket:
+                    del band[key]
+
+
+class SimilarityIndex:
+    def __init__(self, upload_root, db_path=None):
+        self.upload_root = upload_root
+        self.db_path = db_path or os.path.join(upload_root, 'submissions.db')
+        self._local = threading.local()
+        self._problems = defaultdict(_Problem)
+        self._bases = {}  # base file -> ((mtime_ns, size), shingles)
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def load(self):
+        """Read stored signatures into the in-memory LSH index."""
+        rows = self._connection().execute('SELECT problem, team_name, file_path, signature FROM signatures')
+        with self._lock:
+            self._problems.clear()
+            for problem, team, file_path, blob in rows:
+                self._problems[problem].put(team, file_path, _SIGNATURE.unpack(blob))
+
+    def _base_shingles(self, problem):
+        """Shingles of the problem's base file (under upload_root), or an empty set."""
+        path = os.path.join(self.upload_root, problem)
+        try:
+            stat_info = os.stat(path)
+        except OSError:
+            return set()
+        version = (stat_info.st_mtime_ns, stat_info.st_size)
+        entry = self._bases.get(path)
+        if entry is None or entry[0] != version:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                entry = self._bases[path] = (version, shingles(f.read()))
+        return entry[1]
+
+    def add(self, problem, team, file_path, code):
+        """Index a team's latest submission for a problem; returns its own-shingle count."""
+        with FILE_OPERATIONS.time(operation='similarity_signature'):
+            own = shingles(code) - self._base_shingles(problem)
+            signature = minhash(own) if len(own) >= MIN_SHINGLES else None
+        with self._connection() as conn:
+            if signature is None:
+                conn.execute('DELETE FROM signatures WHERE problem = ? AND team_name = ?', (problem, team))
+            else:
+                conn.execute('INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?, ?)',
+                             (problem, team, file_path, len(own), _SIGNATURE.pack(*signature)))
+        with self._lock:
+            if signature is None:
+                self._problems[problem].remove(team)
+            else:
+                self._problems[problem].put(team, file_path, signature)
+        return len(own)
+
+    def problems(self):
+        with self._lock:
+            return {problem: len(entry.members) for problem, entry in self._problems.items() if entry.members}
+
+    def clusters(self, problems=None, threshold=0.7):
+        """Groups of teams whose submissions look copied, for the given problems (default all).
+
+        Returns {problem: [cluster, ...]}, each cluster a dict with the
+        members (team, file_path) and the pairs above threshold, largest
+        clusters first.
+        """
+        with self._lock:
+            selected = list(self._problems) if problems is None else problems
+            snapshot = {name: (dict(self._problems[name].members),
+                               [[set(bucket) for bucket in band.values() if len(bucket) > 1]
+                                for band in self._problems[name].bands])
+                        for name in selected if name in self._problems}
+        return {name: self._cluster(members, bands, threshold)
+                for name, (members, bands) in snapshot.items()}
+
+    @staticmethod
+    def _cluster(members, bands, threshold):
+        candidates = set()
+        for buckets in bands:
+            for bucket in buckets:
+                teams = sorted(bucket)
+                if len(teams) * (len(teams) - 1) // 2 <= MAX_BUCKET_PAIRS:
+                    candidates.update((a, b) for i, a in enumerate(teams) for b in teams[i + 1:])
+                else:
+                    candidates.update((teams[0], b) for b in teams[1:])
+
+        parent = {}
+
+        def find(team):
+            while parent.get(team, team) != team:
+                parent[team] = parent.get(parent[team], parent[team])  # path halving
+                team = parent[team]
+            return team
+
+        pairs = {}
+        for a, b in candidates:
+            score = estimate(members[a][1], members[b][1])
+            if score >= threshold:
+                root_a, root_b = find(a), find(b)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+                pairs[(a, b)] = score
+
+        groups = defaultdict(set)
+        group_links = defaultdict(list)
+        for (a, b), score in pairs.items():
+            root = find(a)
+            groups[root].update((a, b))
+            group_links[root].append({"teams": [a, b], "similarity": round(score, 3)})
+        clusters = []
+        for root, teams in groups.items():
+            links = sorted(group_links[root], key=lambda link: -link["similarity"])
+            clusters.append({
+                "size": len(teams),
+                "max_similarity": links[0]["similarity"],
+                "members": [{"team": team, "file_path": members[team][0]} for team in sorted(teams)],
+                "pairs": links
+            })
+        clusters.sort(key=lambda cluster: (-cluster["size"], -cluster["max_similarity"]))
+        return clusters
+
+    def backfill(self, submission_index):
+        """Index the latest submission per team and problem recorded in submission_index."""
+        done = set()
+        added = 0
+        for round_folder in ('Round2', 'Round3'):
+            for _, record in submission_index.query(round_folder=round_folder):
+                key = (record['problem'], record['team_name'])
+                if record['problem'] is None or key in done:
+                    continue
+                done.add(key)
+                try:
+                    with open(os.path.join(self.upload_root, record['file_path']), 'r',
+                              encoding='utf-8', errors='ignore') as f:
+                        code = f.read()
+                except OSError:
+                    continue
+                if self.add(record['problem'], record['team_name'], record['file_path'], code):
+                    added += 1
+        return added
+
+
+if __name__ == '__main__':
+    from submission_index import SubmissionIndex
+
+    parser = argparse.ArgumentParser(description="Manage the submission similarity index.")
+    parser.add_argument('--backfill', action='store_true', help="sign existing Round 2/3 submissions")
+    parser.add_argument('--uploads', default='uploads', help="upload folder (default: uploads)")
+    args = parser.parse_args()
+    if args.backfill:
+        added = SimilarityIndex(args.uploads).backfill(SubmissionIndex(args.uploads))
+        print(f"Signed {added} submissions.")
+    else:
+        parser.print_help()
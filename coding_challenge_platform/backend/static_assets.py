@@ -0,0 +1,163 @@
+"""Frontend files served from memory with content-hash ETags and precompression.
+
+Every file under the frontend folder is read once at startup, hashed
+(SHA-256) and, when it is text, compressed with gzip and, if the optional
+brotli package is installed, brotli. A request is answered from memory with
+the best encoding the client accepts, a strong ETag per encoding and a 304
+when If-None-Match matches.
+
+HTML pages are rewritten so local references (src="config.js",
+url('/static/background.jpg')) carry ?v=<content hash>. A request whose v
+matches the file's current hash gets a year-long immutable Cache-Control;
+pages themselves and unversioned URLs are revalidated, which costs a 304.
+Files are re-read when their mtime or size changes; pages are rebuilt after
+any asset they could reference changes.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from werkzeug.utils import safe_join
+from werkzeug.wrappers import Response
+
+from metrics import FILE_OPERATIONS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+SHORT = 'public, max-age=3600'
+REVALIDATE = 'no-cache'
+# Smaller bodies don't gain enough to be worth a Content-Encoding.
+MIN_COMPRESS_SIZE = 512
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+# src="...", href="..." and url(...) values without a scheme, query or fragment.
+REFERENCE = re.compile(r'''((?:src|href)=["']|url\(["']?)([^"')?#:\s]+)(?=["')])''')
+
+
+class Asset:
+    def __init__(self, version, mimetype, digest, bodies, generation):
+        self.version = version        # (mtime_ns, size) of the file on disk
+        self.mimetype = mimetype
+        self.digest = digest          # hash of what is served (after rewriting)
+        self.bodies = bodies          # encoding -> bytes, 'identity' always present
+        self.generation = generation  # assets generation a page was rewritten against
+
+    def etag(self, encoding):
+        return self.digest if encoding == 'identity' else f"{self.digest}-{encoding}"
+
+
+def _compress(data, mimetype):
+    bodies = {'identity': data}
+    if len(data) < MIN_COMPRESS_SIZE or not mimetype.startswith(COMPRESSIBLE):
+        return bodies
+    bodies['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        bodies['br'] = brotli.compress(data, quality=11)
+    return bodies
+
+
+class StaticAssets:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._assets = {}  # path relative to root -> Asset
+        self._generation = 0  # bumped whenever a non-HTML file is (re)built
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Build every file now; pages last, so their references resolve."""
+        pages = []
+        for dir_path, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                rel = os.path.relpath(os.path.join(dir_path, filename), self.root).replace(os.sep, '/')
+                if filename.endswith('.html'):
+                    pages.append(rel)
+                else:
+                    self.get(rel)
+        for rel in pages:
+            self.get(rel)
+
+    def _read(self, rel, full_path):
+        with FILE_OPERATIONS.time(operation='static_asset_build'):
+            stat_info = os.stat(full_path)
+            with open(full_path, 'rb') as f:
+                data = f.read()
+            mimetype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+            generation = None
+            if mimetype == 'text/html':
+                generation = self._generation
+                data = self._rewrite(rel, data)
+            digest = hashlib.sha256(data).hexdigest()[:20]
+            return Asset((stat_info.st_mtime_ns, stat_info.st_size), mimetype, digest,
+                         _compress(data, mimetype), generation)
+
+    def _rewrite(self, rel, data):
+        base = os.path.dirname(rel)
+
+        def versioned(match):
+            prefix, url = match.groups()
+            if url.startswith('//'):
+                return match.group(0)
+            target = url.lstrip('/') if url.startswith('/') else os.path.normpath(os.path.join(base, url))
+            asset = self.get(target) if not target.endswith('.html') else None
+            if asset is None:
+                return match.group(0)
+            return f"{prefix}{url}?v={asset.digest}"
+
+        return REFERENCE.sub(versioned, data.decode('utf-8')).encode('utf-8')
+
+    def get(self, rel):
+        """The current Asset for a path relative to the root, or None."""
+        full_path = safe_join(self.root, rel)
+        if full_path is None:
+            return None
+        try:
+            stat_info = os.stat(full_path)
+        except OSError:
+            return None
+        if not os.path.isfile(full_path):
+            return None
+        asset = self._assets.get(rel)
+        if (asset is not None and asset.version == (stat_info.st_mtime_ns, stat_info.st_size)
+                and asset.generation in (None, self._generation)):
+            return asset
+        asset = self._read(rel, full_path)
+        with self._lock:
+            if asset.generation is None and rel in self._assets:
+                # Pages may reference the old content; rebuild them on next use.
+                self._generation += 1
+            self._assets[rel] = asset
+        return asset
+
+    def response(self, rel, request):
+        """A Response for rel (200 or 304), or None when there is no such file."""
+        asset = self.get(rel)
+        if asset is None:
+            return None
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in asset.bodies and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+
+        if asset.mimetype == 'text/html':
+            cache_control = REVALIDATE
+        elif request.args.get('v') == asset.digest:
+            cache_control = IMMUTABLE
+        else:
+            cache_control = SHORT
+        headers = {'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+        etags = [asset.etag(name) for name in asset.bodies]
+        if any(request.if_none_match.contains(etag) for etag in etags) or request.if_none_match.star_tag:
+            response = Response(status=304, headers=headers)
+        else:
+            response = Response(asset.bodies[encoding], mimetype=asset.mimetype, headers=headers)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(asset.etag(encoding))
+        return response
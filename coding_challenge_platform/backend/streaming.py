@@ -0,0 +1,52 @@
+"""Helpers for streaming large result sets as JSON, NDJSON or CSV.
+
+Each helper takes an iterator of dicts (a Mongo cursor, a directory walk)
+and yields text chunks one row at a time, so Flask can send the response
+without building it in memory first.
+"""
+import csv
+import io
+import json
+
+FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def json_array(rows):
+    yield '['
+    first = True
+    for row in rows:
+        yield json.dumps(row, default=str) if first else ',' + json.dumps(row, default=str)
+        first = False
+    yield ']'
+
+
+def ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, default=str) + '\n'
+
+
+def csv_rows(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Flush the header when there were no rows.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode(rows, fmt, fields):
+    """Return (chunk iterator, mimetype) for fmt in FORMATS."""
+    if fmt == 'ndjson':
+        return ndjson(rows), FORMATS['ndjson']
+    if fmt == 'csv':
+        return csv_rows(rows, fields), FORMATS['csv']
+    return json_array(rows), FORMATS['json']
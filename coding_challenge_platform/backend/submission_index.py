@@ -0,0 +1,167 @@
+"""SQLite index of submitted files (Rounds 2-4).
+
+The submit endpoints record each file's metadata when they write it, so the
+admin submissions view is an indexed query instead of a walk over
+uploads/Round2..Round4. The database lives next to the uploads it describes
+(uploads/submissions.db) and uses WAL mode, so several server processes can
+share it.
+
+Existing upload folders can be indexed with a one-shot backfill:
+
+    cd backend && python submission_index.py --backfill
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from metrics import FILE_OPERATIONS
+
+SUBMISSION_ROUNDS = {
+    'Round2': 'Code Scramble',
+    'Round3': 'Code Debugging',
+    'Round4': 'Frontend Challenge'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    file_path TEXT PRIMARY KEY,
+    round_folder TEXT NOT NULL,
+    team_name TEXT NOT NULL,
+    language TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    problem TEXT,
+    mtime_us INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT
+);
+CREATE INDEX IF NOT EXISTS submissions_time ON submissions (mtime_us DESC, file_path DESC);
+CREATE INDEX IF NOT EXISTS submissions_team ON submissions (team_name, mtime_us DESC);
+CREATE INDEX IF NOT EXISTS submissions_round ON submissions (round_folder, mtime_us DESC);
+"""
+
+COLUMNS = 'file_path, round_folder, team_name, language, filename, problem, mtime_us, size, digest'
+
+
+def walk_uploads(upload_root):
+    """Yield (round_folder, team, language, relative path) for files on disk."""
+    for round_folder in SUBMISSION_ROUNDS:
+        round_path = os.path.join(upload_root, round_folder)
+        if not os.path.isdir(round_path):
+            continue
+        for team_entry in os.scandir(round_path):
+            if not team_entry.is_dir():
+                continue
+            for item in os.scandir(team_entry.path):
+                if item.is_dir():
+                    # It's a language folder (e.g., 'c', 'py', 'cpp')
+                    for entry in os.scandir(item.path):
+                        if entry.is_file():
+                            yield (round_folder, team_entry.name, item.name,
+                                   os.path.join(round_folder, team_entry.name, item.name, entry.name))
+                else:
+                    # It's a file directly in the team folder
+                    yield round_folder, team_entry.name, 'N/A', os.path.join(round_folder, team_entry.name, item.name)
+
+
+class SubmissionIndex:
+    def __init__(self, upload_root, db_path=None):
+        self.upload_root = upload_root
+        self.db_path = db_path or os.path.join(upload_root, 'submissions.db')
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            # Databases created before content hashes were recorded.
+            if 'digest' not in {row[1] for row in conn.execute('PRAGMA table_info(submissions)')}:
+                conn.execute('ALTER TABLE submissions ADD COLUMN digest TEXT')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _row(self, round_folder, team_name, language, file_path, problem, digest=None):
+        stat_info = os.stat(os.path.join(self.upload_root, file_path))
+        return (file_path, round_folder, team_name, language, os.path.basename(file_path), problem,
+                stat_info.st_mtime_ns // 1000, stat_info.st_size, digest)
+
+    def record(self, round_folder, team_name, language, file_path, problem=None, digest=None):
+        """Index a file just written under upload_root (file_path is relative to it)."""
+        row = self._row(round_folder, team_name, language, file_path, problem, digest)
+        with self._connection() as conn:
+            conn.execute(f'INSERT OR REPLACE INTO submissions ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', row)
+
+    def digest(self, file_path):
+        """SHA-256 recorded for a file at upload, or None."""
+        row = self._connection().execute('SELECT digest FROM submissions WHERE file_path = ?', (file_path,)).fetchone()
+        return row[0] if row else None
+
+    def backfill(self):
+        """Index every submission file on disk that is not indexed yet; returns the count added."""
+        conn = self._connection()
+        before = conn.execute('SELECT COUNT(*) FROM submissions').fetchone()[0]
+        batch = []
+        with FILE_OPERATIONS.time(operation='submission_backfill'), conn:
+            for round_folder, team_name, language, file_path in walk_uploads(self.upload_root):
+                batch.append(self._row(round_folder, team_name, language, file_path, None))
+                if len(batch) >= 1000:
+                    conn.executemany(f'INSERT OR IGNORE INTO submissions ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+                    batch = []
+            conn.executemany(f'INSERT OR IGNORE INTO submissions ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+        return conn.execute('SELECT COUNT(*) FROM submissions').fetchone()[0] - before
+
+    def is_empty(self):
+        return self._connection().execute('SELECT 1 FROM submissions LIMIT 1').fetchone() is None
+
+    def query(self, round_folder=None, team=None, lang=None, after=None, limit=None):
+        """Yield (mtime_us, record) newest first.
+
+        after is a (mtime_us, file_path) cursor; rows strictly older are returned.
+        """
+        clauses, params = [], []
+        for column, value in (('round_folder', round_folder), ('team_name', team), ('language', lang)):
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if after is not None:
+            clauses.append('(mtime_us, file_path) < (?, ?)')
+            params.extend(after)
+        sql = f'SELECT {COLUMNS} FROM submissions'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY mtime_us DESC, file_path DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with FILE_OPERATIONS.time(operation='submission_query'):
+            rows = self._connection().execute(sql, params)
+        for file_path, round_folder, team_name, language, filename, problem, mtime_us, size, digest in rows:
+            yield mtime_us, {
+                'team_name': team_name,
+                'round_name': SUBMISSION_ROUNDS.get(round_folder, round_folder),
+                'filename': filename,
+                'language': language,
+                'file_path': file_path,
+                'problem': problem,
+                'timestamp': datetime.fromtimestamp(mtime_us // 1_000_000).strftime('%Y-%m-%d %H:%M:%S'),
+                'size': size,
+                'digest': digest
+            }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Manage the submissions index.")
+    parser.add_argument('--backfill', action='store_true', help="index existing upload folders")
+    parser.add_argument('--uploads', default='uploads', help="upload folder (default: uploads)")
+    args = parser.parse_args()
+    if args.backfill:
+        added = SubmissionIndex(args.uploads).backfill()
+        print(f"Indexed {added} existing submission files.")
+    else:
+        parser.print_help()
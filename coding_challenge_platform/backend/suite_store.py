@@ -0,0 +1,180 @@
+"""Per-problem test suites for Round 3.
+
+Admins upload a suite next to each debug file as either a JSON file
+([{"input": ..., "expected_output": ...}, ...]) or a zip of NAME.in/NAME.out
+pairs. Uploads are unpacked once into numbered files under
+uploads/debug/<lang>/.tests/<problem>/ and indexed in memory, so grading only
+walks a tuple of paths: inputs are handed to the runner as files and expected
+outputs are compared chunk by chunk instead of being loaded whole.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from collections import namedtuple
+
+TESTS_DIRNAME = '.tests'
+CHUNK_SIZE = 64 * 1024
+
+StoredCase = namedtuple('StoredCase', ['input_path', 'expected_path'])
+
+
+class SuiteError(ValueError):
+    pass
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def _expected_chunks(case):
+    if 'expected_path' in case:
+        with open(case['expected_path'], 'r', encoding='utf-8', errors='replace') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+    else:
+        yield (case.get('expected_output') or '').replace('\r\n', '\n')
+
+
+def outputs_match(actual, case):
+    """Compare program output with a case's expected output.
+
+    Trailing whitespace and CRLF line endings are ignored. The expected side is
+    streamed, holding back only the whitespace at the end of each chunk.
+    """
+    actual = (actual or '').replace('\r\n', '\n').rstrip()
+    pos = 0
+    pending = ''
+    for chunk in _expected_chunks(case):
+        data = pending + chunk
+        stripped = data.rstrip()
+        pending = data[len(stripped):]
+        if actual[pos:pos + len(stripped)] != stripped:
+            return False
+        pos += len(stripped)
+    return pos == len(actual)
+
+
+class TestSuiteStore:
+    def __init__(self, debug_root):
+        self.debug_root = debug_root
+        self._suites = {}
+        self._lock = threading.Lock()
+
+    def _suite_dir(self, lang, problem):
+        return os.path.join(self.debug_root, lang, TESTS_DIRNAME, problem)
+
+    @staticmethod
+    def _index_dir(suite_dir):
+        inputs = sorted((f for f in os.listdir(suite_dir) if f.endswith('.in')), key=_natural_key)
+        return tuple(StoredCase(os.path.join(suite_dir, name), os.path.join(suite_dir, name[:-3] + '.out'))
+                     for name in inputs)
+
+    def load(self):
+        """Index every suite already on disk (called once at startup)."""
+        suites = {}
+        if os.path.isdir(self.debug_root):
+            for lang in os.listdir(self.debug_root):
+                tests_root = os.path.join(self.debug_root, lang, TESTS_DIRNAME)
+                if not os.path.isdir(tests_root):
+                    continue
+                for problem in os.listdir(tests_root):
+                    suite_dir = os.path.join(tests_root, problem)
+                    # Dot-prefixed entries are leftover staging dirs from an interrupted upload.
+                    if not problem.startswith('.') and os.path.isdir(suite_dir):
+                        suites[(lang, problem)] = self._index_dir(suite_dir)
+        with self._lock:
+            self._suites = suites
+
+    # --- Upload parsing ---
+    @staticmethod
+    def _write_json(upload, staging):
+        try:
+            data = json.load(upload)
+        except ValueError as e:
+            raise SuiteError(f"Invalid JSON test suite: {e}")
+        if isinstance(data, dict):
+            data = data.get('cases', data.get('test_cases'))
+        if not isinstance(data, list) or not data:
+            raise SuiteError("JSON test suite must be a non-empty list of cases.")
+        for number, case in enumerate(data, 1):
+            if not isinstance(case, dict) or 'expected_output' not in case:
+                raise SuiteError(f"Case {number} needs 'input' and 'expected_output'.")
+            stem = os.path.join(staging, f'{number:04d}')
+            with open(stem + '.in', 'w', encoding='utf-8', newline='') as f:
+                f.write(str(case.get('input', '')))
+            with open(stem + '.out', 'w', encoding='utf-8', newline='') as f:
+                f.write(str(case['expected_output']))
+        return len(data)
+
+    @staticmethod
+    def _write_zip(upload, staging):
+        try:
+            archive = zipfile.ZipFile(upload)
+        except zipfile.BadZipFile:
+            raise SuiteError("Test suite zip is not a valid zip file.")
+        with archive:
+            pairs = {}
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                stem, ext = os.path.splitext(info.filename)
+                if ext in ('.in', '.out'):
+                    pairs.setdefault(stem, {})[ext] = info
+            stems = sorted((stem for stem, files in pairs.items() if len(files) == 2), key=_natural_key)
+            if not stems:
+                raise SuiteError("Test suite zip must contain NAME.in / NAME.out pairs.")
+            for number, stem in enumerate(stems, 1):
+                for ext, info in pairs[stem].items():
+                    # Copy member by member so large outputs never sit in memory.
+                    with archive.open(info) as src, open(os.path.join(staging, f'{number:04d}{ext}'), 'wb') as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        return len(stems)
+
+    def save(self, lang, problem, filename, upload):
+        """Unpack an uploaded suite for (lang, problem), replacing any previous one.
+
+        `upload` is a binary file object. Returns the number of cases stored.
+        """
+        problem = os.path.basename(problem or '')
+        if not problem or problem.startswith('.'):
+            raise SuiteError("A debug problem file name is required.")
+        tests_root = os.path.join(self.debug_root, lang, TESTS_DIRNAME)
+        os.makedirs(tests_root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.upload-', dir=tests_root)
+        try:
+            if filename.endswith('.json'):
+                count = self._write_json(upload, staging)
+            elif filename.endswith('.zip'):
+                count = self._write_zip(upload, staging)
+            else:
+                raise SuiteError("Test suites must be .json or .zip files.")
+            suite_dir = self._suite_dir(lang, problem)
+            old_dir = None
+            if os.path.exists(suite_dir):
+                old_dir = staging + '.old'
+                os.rename(suite_dir, old_dir)
+            os.rename(staging, suite_dir)
+            if old_dir:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        cases = self._index_dir(suite_dir)
+        with self._lock:
+            self._suites[(lang, problem)] = cases
+        return count
+
+    def cases(self, lang, problem):
+        """Yield the stored cases for a problem lazily, or None if it has no suite."""
+        with self._lock:
+            suite = self._suites.get((lang, problem))
+        if suite is None:
+            return None
+        return ({'input_path': case.input_path, 'expected_path': case.expected_path} for case in suite)
@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+import admission
+from admission import AdmissionControl, ConcurrencyLimiter, MongoTokenBuckets, Overloaded, TokenBuckets
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission, 'time', clock)
+    return clock
+
+
+def check_refill(buckets, clock):
+    # A full bucket admits a burst, then refills at rate tokens per second.
+    for _ in range(3):
+        assert buckets.take('teamA') == 0
+    assert buckets.take('teamA') == pytest.approx(2.0)
+    clock.advance(1.0)
+    assert buckets.take('teamA') == pytest.approx(1.0)  # half a token so far
+    clock.advance(1.0)
+    assert buckets.take('teamA') == 0
+    assert buckets.take('teamA') == pytest.approx(2.0)
+    # Other teams have their own bucket.
+    assert buckets.take('teamB') == 0
+    # A long idle refills up to the burst, not beyond it.
+    clock.advance(3600)
+    for _ in range(3):
+        assert buckets.take('teamA') == 0
+    assert buckets.take('teamA') > 0
+
+
+def test_token_bucket_refill(clock):
+    check_refill(TokenBuckets(rate=0.5, burst=3), clock)
+
+
+def test_shared_token_bucket_refill(clock):
+    mongomock = pytest.importorskip('mongomock')
+    collection = mongomock.MongoClient().db.rate_limits
+    check_refill(MongoTokenBuckets(collection, rate=0.5, burst=3, prefix='check'), clock)
+    assert collection.count_documents({"_id": {"$regex": '^check:'}}) == 2
+
+
+def test_full_buckets_are_pruned(clock, monkeypatch):
+    monkeypatch.setattr(admission, 'MAX_BUCKETS', 10)
+    buckets = TokenBuckets(rate=1, burst=2)
+    for team in range(11):
+        buckets.take(f'team{team}')
+    clock.advance(5)
+    buckets.take('teamX')
+    assert len(buckets._buckets) == 1
+
+
+def test_admit_raises_with_retry_after(clock):
+    control = AdmissionControl({'check': TokenBuckets(rate=0.25, burst=1)}, ConcurrencyLimiter(1, 0, 0.1))
+    control.admit('check', 'teamA')
+    with pytest.raises(Overloaded) as raised:
+        control.admit('check', 'teamA')
+    assert raised.value.reason == 'rate_limited'
+    assert raised.value.retry_after == 4
+    assert raised.value.headers == {'Retry-After': '4'}
+    assert control.counts() == {('check', 'admitted'): 1, ('check', 'rate_limited'): 1}
+
+
+def test_execution_slots_turn_away_when_queue_is_full():
+    control = AdmissionControl({}, ConcurrencyLimiter(limit=1, max_waiting=0, timeout=0.1))
+    with control.execution_slot('check'):
+        with pytest.raises(Overloaded) as raised:
+            with control.execution_slot('check'):
+                pass
+        assert raised.value.reason == 'busy'
+    with control.execution_slot('check'):
+        pass
+    assert control.counts() == {('check', 'busy'): 1}
+
+
+def test_waiting_request_gets_the_freed_slot():
+    limiter = ConcurrencyLimiter(limit=1, max_waiting=1, timeout=5)
+    limiter.acquire()
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    waiter.start()
+    assert not acquired.wait(0.1)
+    limiter.release()
+    assert acquired.wait(5)
+    waiter.join()
+    assert (limiter.active, limiter.waiting) == (1, 0)
@@ -0,0 +1,177 @@
+import datetime
+import io
+import os
+import sys
+import zipfile
+import zlib
+
+import pytest
+
+from export import DATA_DESCRIPTOR, LOCAL_HEADER, Entry, StoredZip, file_entry, fingerprint
+
+
+def memory_entry(name, data, crc=None, reads=None):
+    def chunks():
+        if reads is not None:
+            reads.append(name)
+        for start in range(0, len(data), 7):
+            yield data[start:start + 7]
+    return Entry(name, len(data), 1700000000, chunks, crc)
+
+
+@pytest.fixture
+def entries(tmp_path):
+    path = tmp_path / 'main.py'
+    path.write_bytes(b'print("hello")\n' * 5000)
+    return [memory_entry('scores.ndjson', b'{"percentage": 50}\n' * 10),
+            file_entry('Round3/teamA/py/main.py', str(path), os.stat(path)),
+            memory_entry('Round3/teamB/été.txt', b''),
+            memory_entry('Round4/teamA/index.html', bytes(range(256)) * 3)]
+
+
+def test_archive_is_a_valid_zip(entries):
+    archive = StoredZip(entries)
+    body = b''.join(archive.stream())
+    assert len(body) == archive.size
+    with zipfile.ZipFile(io.BytesIO(body)) as z:
+        assert z.testzip() is None
+        for entry, info in zip(entries, z.infolist()):
+            data = b''.join(entry.chunks())
+            assert info.filename == entry.name.decode('utf-8')
+            assert info.file_size == len(data)
+            assert info.CRC == zlib.crc32(data)
+            assert z.read(info) == data
+
+
+def test_same_entries_give_the_same_bytes(entries):
+    assert b''.join(StoredZip(entries).stream()) == b''.join(StoredZip(entries).stream())
+
+
+def test_any_range_matches_the_full_stream(entries):
+    archive = StoredZip(entries)
+    body = b''.join(archive.stream())
+    offsets = {0, 1, 29, 30, 31, archive.size // 3, archive.size // 2,
+               archive.size - 23, archive.size - 1, archive.size}
+    # Around each entry's data descriptor, where a resume must still read the data for its CRC.
+    position = 0
+    for entry in entries:
+        position += LOCAL_HEADER.size + len(entry.name) + entry.size
+        offsets.update(range(position - 2, position + DATA_DESCRIPTOR.size + 2))
+        position += DATA_DESCRIPTOR.size
+    offsets = sorted(offset for offset in offsets if 0 <= offset <= archive.size)
+    for start in offsets:
+        assert b''.join(archive.stream(start)) == body[start:], start
+        for stop in offsets[::7]:
+            if start <= stop:
+                assert b''.join(archive.stream(start, stop)) == body[start:stop], (start, stop)
+
+
+def test_resume_skips_reading_entries_with_a_known_crc():
+    data = b'x' * 1000
+    reads = []
+    entries = [memory_entry('known.bin', data, crc=zlib.crc32(data), reads=reads),
+               memory_entry('unknown.bin', data, reads=reads),
+               memory_entry('last.bin', b'tail', reads=reads)]
+    archive = StoredZip(entries)
+    body = b''.join(archive.stream())
+    reads.clear()
+    # Resume inside the last entry: the first is skipped on its known CRC,
+    # the second still has to be read for the central directory.
+    start = body.index(b'tail')
+    assert b''.join(archive.stream(start)) == body[start:]
+    assert reads == ['unknown.bin', 'last.bin']
+    with zipfile.ZipFile(io.BytesIO(body)) as z:
+        assert z.testzip() is None
+
+
+def test_fingerprint_follows_content(entries):
+    etag = fingerprint(entries)
+    assert fingerprint(entries) == etag
+    changed = entries[:-1] + [memory_entry('Round4/teamA/index.html', bytes(range(256)) * 4)]
+    assert fingerprint(changed) != etag
+    versioned = [Entry('scores.ndjson', 10, 0, None, 1, version='a'), Entry('scores.ndjson', 10, 0, None, 1, version='b')]
+    assert fingerprint(versioned[:1]) != fingerprint(versioned[1:])
+
+
+def test_entry_that_changes_size_fails_the_stream():
+    entry = memory_entry('grew.txt', b'abc')
+    entry.size = 2
+    with pytest.raises(IOError):
+        b''.join(StoredZip([entry]).stream())
+
+
+# --- /admin/export ---
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    mongomock = pytest.importorskip('mongomock')
+    pytest.importorskip('flask')
+    import pymongo
+    workdir = tmp_path_factory.mktemp('export-app')
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(workdir)
+        patch.setattr(pymongo, 'MongoClient', mongomock.MongoClient)
+        patch.setenv('SCORE_FLUSH_INTERVAL', '3600')
+        sys.modules.pop('app', None)
+        import app
+        for team in ('teamA', 'teamB'):
+            folder = os.path.join(app.UPLOAD_FOLDER, 'Round3', team, 'py')
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, 'p1.py'), 'w') as f:
+                f.write(f'# {team}\n' + 'print(1)\n' * 3000)
+        for i in range(40):
+            app.scores_collection.insert_one({"username": f'team{"AB"[i % 2]}', "round_name": 'MCQ',
+                                              "percentage": i, "timestamp": datetime.datetime(2026, 3, 1, 10, i)})
+        yield app
+        sys.modules.pop('app', None)
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def test_export_resumes_with_range(client, app_module):
+    full = client.get('/admin/export')
+    assert full.status_code == 200
+    body = full.data
+    assert int(full.headers['Content-Length']) == len(body)
+    etag = full.headers['ETag']
+    with zipfile.ZipFile(io.BytesIO(body)) as z:
+        assert z.testzip() is None
+        assert len(z.read('scores.ndjson').splitlines()) == app_module.scores_collection.count_documents({})
+        assert z.read('Round3/teamB/py/p1.py').startswith(b'# teamB\n')
+
+    for start in (1, 1000, len(body) // 2, len(body) - 10):
+        part = client.get('/admin/export', headers={'Range': f'bytes={start}-', 'If-Range': etag})
+        assert part.status_code == 206
+        assert part.headers['Content-Range'] == f'bytes {start}-{len(body) - 1}/{len(body)}'
+        assert part.data == body[start:]
+    part = client.get('/admin/export', headers={'Range': 'bytes=100-199'})
+    assert part.status_code == 206 and part.data == body[100:200]
+    assert client.get('/admin/export', headers={'Range': f'bytes={len(body)}-'}).status_code == 416
+
+
+def test_stale_if_range_gets_the_whole_archive(client, app_module):
+    etag = client.get('/admin/export').headers['ETag']
+    app_module.scores_collection.insert_one({"username": 'teamA', "round_name": 'MCQ', "percentage": 99,
+                                             "timestamp": datetime.datetime(2026, 3, 1, 11, 0)})
+    resumed = client.get('/admin/export', headers={'Range': 'bytes=100-', 'If-Range': etag})
+    assert resumed.status_code == 200
+    assert resumed.headers['ETag'] != etag
+    with zipfile.ZipFile(io.BytesIO(resumed.data)) as z:
+        assert z.testzip() is None
+
+
+def test_scores_inserted_while_streaming_are_left_out(client, app_module):
+    before = app_module.scores_collection.count_documents({"username": 'teamA'})
+    response = client.get('/admin/export?round=Round3&team=teamA', buffered=False)
+    stream = iter(response.response)
+    first = next(stream)
+    app_module.scores_collection.insert_one({"username": 'teamA', "round_name": 'MCQ', "percentage": 1,
+                                             "timestamp": datetime.datetime(2026, 3, 1, 12, 0)})
+    body = first + b''.join(stream)
+    assert len(body) == int(response.headers['Content-Length'])
+    with zipfile.ZipFile(io.BytesIO(body)) as z:
+        assert z.testzip() is None
+        assert set(z.namelist()) == {'scores.ndjson', 'Round3/teamA/py/p1.py'}
+        assert len(z.read('scores.ndjson').splitlines()) == before
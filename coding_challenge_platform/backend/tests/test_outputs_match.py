@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+import suite_store
+from suite_store import outputs_match
+
+
+def reference_match(actual, expected):
+    return actual.replace('\r\n', '\n').rstrip() == expected.replace('\r\n', '\n').rstrip()
+
+
+def stored_case(tmp_path, expected):
+    path = tmp_path / 'case.out'
+    path.write_bytes(expected.encode('utf-8'))
+    return {"expected_path": str(path)}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4, 5, 7, 64 * 1024])
+def test_crlf_expected_file_matches_lf_output(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(suite_store, 'CHUNK_SIZE', chunk_size)
+    case = stored_case(tmp_path, "1\r\n22\r\n333\r\n\r\n")
+    assert outputs_match("1\n22\n333", case)
+    assert outputs_match("1\r\n22\r\n333\r\n", case)
+    assert not outputs_match("1\n22\n334", case)
+    assert not outputs_match("1\n22", case)
+    assert not outputs_match("1\n22\n333\n4", case)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4, 6])
+def test_whitespace_is_only_ignored_at_the_end(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(suite_store, 'CHUNK_SIZE', chunk_size)
+    case = stored_case(tmp_path, "a  \n\nb   \n \n\n")
+    assert outputs_match("a  \n\nb", case)
+    assert outputs_match("a  \n\nb \t\n", case)
+    assert not outputs_match("a\n\nb", case)
+    assert not outputs_match("a  \nb", case)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 8])
+def test_mismatch_at_a_chunk_boundary(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(suite_store, 'CHUNK_SIZE', chunk_size)
+    case = stored_case(tmp_path, "abcdefgh")
+    assert outputs_match("abcdefgh", case)
+    for position in range(8):
+        changed = "abcdefgh"[:position] + 'x' + "abcdefgh"[position + 1:]
+        assert not outputs_match(changed, case)
+        assert not outputs_match("abcdefgh"[:position], case)
+
+
+def test_empty_expected_output():
+    assert outputs_match("", {"expected_output": ""})
+    assert outputs_match(" \r\n\n", {"expected_output": None})
+    assert not outputs_match("0", {"expected_output": ""})
+
+
+def test_agrees_with_whole_string_comparison(tmp_path, monkeypatch):
+    rng = random.Random(4)
+    pieces = ['a', 'b', ' ', '\n', '\r\n', '\t']
+    for _ in range(300):
+        expected = ''.join(rng.choice(pieces) for _ in range(rng.randrange(12)))
+        if rng.random() < 0.5:
+            actual = expected.replace('\r\n', '\n') + rng.choice(['', ' ', '\n', 'a', '\r\n'])
+        else:
+            actual = ''.join(rng.choice(pieces) for _ in range(rng.randrange(12)))
+        monkeypatch.setattr(suite_store, 'CHUNK_SIZE', rng.randint(1, 5))
+        want = reference_match(actual, expected)
+        assert outputs_match(actual, {"expected_output": expected}) == want
+        assert outputs_match(actual, stored_case(tmp_path, expected)) == want
@@ -0,0 +1,90 @@
+import datetime
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from score_buffer import ScoreBuffer  # noqa: E402
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().db.scores
+
+
+def make_buffer(collection, journal):
+    # A long interval keeps the background flush out of the way; tests flush by hand.
+    return ScoreBuffer(collection, str(journal), flush_interval=3600)
+
+
+def score(username, percentage):
+    return {"username": username, "round_name": 'MCQ', "percentage": percentage,
+            "timestamp": datetime.datetime(2026, 3, 1, 10, 0, percentage % 60)}
+
+
+def test_add_journals_before_flush(collection, tmp_path):
+    journal = tmp_path / 'journal.jsonl'
+    buffer = make_buffer(collection, journal)
+    doc = buffer.add(score('teamA', 50))
+    assert '_id' in doc
+    assert len(journal.read_text().splitlines()) == 1
+    assert collection.count_documents({}) == 0
+    assert [pending['_id'] for pending in buffer.pending('teamA')] == [doc['_id']]
+    assert buffer.pending('teamB') == []
+
+    buffer.flush()
+    assert collection.count_documents({}) == 1
+    assert buffer.pending('teamA') == []
+    assert journal.read_text() == ''
+
+
+def test_replay_after_crash(collection, tmp_path):
+    journal = tmp_path / 'journal.jsonl'
+    crashed = make_buffer(collection, journal)
+    docs = [crashed.add(score(f'team{i}', i)) for i in range(5)]
+    # The process dies before any flush; a new one replays the journal.
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write('{"username": "cut sho')
+
+    buffer = make_buffer(collection, journal)
+    assert buffer.recover() == 5
+    buffer.flush()
+    stored = {doc['_id']: doc for doc in collection.find()}
+    assert set(stored) == {doc['_id'] for doc in docs}
+    for doc in docs:
+        assert stored[doc['_id']]['percentage'] == doc['percentage']
+        assert stored[doc['_id']]['timestamp'] == doc['timestamp']
+    assert journal.read_text() == ''
+
+
+def test_replay_skips_documents_already_written(collection, tmp_path):
+    journal = tmp_path / 'journal.jsonl'
+    crashed = make_buffer(collection, journal)
+    docs = [crashed.add(score(f'team{i}', i)) for i in range(4)]
+    # Two reached MongoDB before the crash, but the journal was not truncated.
+    collection.insert_many([dict(doc) for doc in docs[:2]])
+
+    buffer = make_buffer(collection, journal)
+    assert buffer.recover() == 4
+    buffer.flush()
+    assert buffer.last_error is None
+    assert buffer.stats()['pending'] == 0
+    assert sorted(doc['_id'] for doc in collection.find()) == sorted(doc['_id'] for doc in docs)
+    assert journal.read_text() == ''
+
+
+def test_failed_write_stays_queued(collection, tmp_path, monkeypatch):
+    buffer = make_buffer(collection, tmp_path / 'journal.jsonl')
+    buffer.add(score('teamA', 10))
+
+    def unavailable(*args, **kwargs):
+        raise RuntimeError('primary unavailable')
+    monkeypatch.setattr(collection, 'insert_many', unavailable)
+    buffer.flush()
+    assert buffer.last_error == 'primary unavailable'
+    assert buffer.stats()['pending'] == 1
+
+    monkeypatch.undo()
+    buffer.flush()
+    assert buffer.last_error is None
+    assert collection.count_documents({"username": 'teamA'}) == 1
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from scramble import ReferenceCache, VariantPool, lcs_length, similarity
+
+
+def dp_lcs(a, b):
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def test_empty_sides():
+    assert lcs_length([], []) == 0
+    assert lcs_length(['a'], []) == 0
+    assert lcs_length([], ['a']) == 0
+    assert similarity([], []) == 1.0
+
+
+def test_small_cases():
+    assert lcs_length(['a', 'b', 'c'], ['a', 'b', 'c']) == 3
+    assert lcs_length(['a', 'b', 'c'], ['c', 'b', 'a']) == 1
+    assert lcs_length(['{', '}', '{', '}'], ['}', '{', '}', '{']) == 3
+    assert similarity(['a', 'b'], ['a', 'b', 'c', 'd']) == pytest.approx(2 * 2 / 6)
+
+
+@pytest.mark.parametrize('alphabet', [2, 5, 40])
+def test_matches_dynamic_programming(alphabet):
+    rng = random.Random(alphabet)
+    # Lengths past 64 and 128 cross machine-word boundaries of the bitmasks.
+    for _ in range(200):
+        reference = [f'line {rng.randrange(alphabet)}' for _ in range(rng.randrange(150))]
+        submitted = [f'line {rng.randrange(alphabet)}' for _ in range(rng.randrange(150))]
+        assert lcs_length(reference, submitted) == dp_lcs(reference, submitted)
+
+
+def test_shuffled_reference():
+    rng = random.Random(7)
+    reference = ['int main() {', '{', '}', 'return 0;', '}'] * 30
+    for _ in range(20):
+        submitted = list(reference)
+        rng.shuffle(submitted)
+        assert lcs_length(reference, submitted) == dp_lcs(reference, submitted)
+        assert lcs_length(reference, reference) == len(reference)
+
+
+def test_caches_keep_recent_files(tmp_path):
+    paths = []
+    for index in range(4):
+        path = tmp_path / f'{index}.py'
+        path.write_text(f'a = {index}\nb = 2\nprint(a + b)\n')
+        paths.append(str(path))
+    pool = VariantPool(size=4, max_files=2)
+    references = ReferenceCache(max_files=2)
+    first = pool.variant(paths[0], 'team')
+    for path in paths:
+        pool.variants(path)
+        references.lines(path)
+        pool.variants(paths[0])
+        references.lines(paths[0])
+    assert list(pool._entries) == [paths[3], paths[0]]
+    assert list(references._entries) == [paths[3], paths[0]]
+    # Evicted files are rebuilt with the same variants.
+    pool.invalidate(paths[0])
+    assert pool.variant(paths[0], 'team') == first
@@ -0,0 +1,246 @@
+"""Streaming, size-capped uploads and a content-addressed store for submissions.
+
+UploadRequest replaces Flask's request class. For the endpoints listed in
+its limits it refuses a body whose Content-Length is over the limit before
+reading anything, and it has werkzeug write each file part straight into a
+HashingFile under uploads/tmp: the part is hashed (SHA-256) as it streams
+and the request is aborted with a 413 the moment it passes the limit,
+instead of being spooled whole in memory first.
+
+The handler then moves that temp file into place without copying it:
+save_upload() for files with a fixed destination (admin uploads) and
+BlobStore.put() for submissions, which are stored once per content under
+uploads/blobs/ab/<sha256><ext> and hard-linked into the team folder, so
+the submissions index, the admin views and exports see the same paths as
+before.
+
+Thumbnails of image submissions are made by a background worker (Pillow,
+optional) and stored next to the blobs, one per content hash.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from metrics import log_error
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+CHUNK_SIZE = 64 * 1024
+# Room for the multipart boundaries and the small form fields.
+MULTIPART_OVERHEAD = 64 * 1024
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    def __init__(self, limit):
+        super().__init__(f"File too large (limit {limit // (1024 * 1024)} MB).")
+        self.limit = limit
+
+
+class HashingFile:
+    """Temp file that hashes what is written to it and refuses to grow past max_bytes."""
+
+    def __init__(self, directory, max_bytes=None):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    def __getattr__(self, attr):
+        return getattr(self._file, attr)
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise UploadTooLarge(self.max_bytes)
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def detach_to(self, dest):
+        """Move the written file to dest (same filesystem); the object is spent."""
+        self._file.close()
+        os.replace(self.path, dest)
+        self.path = None
+
+    def close(self):
+        self._file.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+class UploadRequest(Request):
+    # Set by the app: directory for parts in flight, and endpoint -> max bytes per file.
+    upload_dir = os.path.join('uploads', 'tmp')
+    limits = {}
+
+    @property
+    def upload_limit(self):
+        return self.limits.get(self.endpoint)
+
+    @property
+    def max_content_length(self):
+        limit = self.upload_limit
+        if limit is not None:
+            return limit + MULTIPART_OVERHEAD
+        return super().max_content_length
+
+    @max_content_length.setter
+    def max_content_length(self, value):
+        self._max_content_length = value
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        stream = HashingFile(self.upload_dir, self.upload_limit)
+        # Kept so a part abandoned mid-parse (e.g. over the limit) is removed too.
+        self.__dict__.setdefault('_upload_parts', []).append(stream)
+        return stream
+
+    def close(self):
+        super().close()
+        for stream in self.__dict__.pop('_upload_parts', ()):
+            stream.close()
+
+
+def _copy_hashing(stream, dest):
+    """Copy a non-HashingFile stream to dest in chunks; returns (sha256 hex, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(dest, 'wb') as out:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest(), size
+
+
+def save_upload(file, dest):
+    """Put an uploaded file at dest atomically; returns (sha256 hex, size)."""
+    os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+    stream = file.stream
+    if isinstance(stream, HashingFile):
+        digest, size = stream.hexdigest(), stream.size
+        stream.detach_to(dest)
+        return digest, size
+    tmp_path = dest + '.tmp'
+    try:
+        result = _copy_hashing(stream, tmp_path)
+        os.replace(tmp_path, dest)
+        return result
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class BlobStore:
+    def __init__(self, root):
+        self.root = root
+
+    def blob_path(self, digest, ext=''):
+        return os.path.join(self.root, digest[:2], digest + ext.lower())
+
+    def put(self, file, dest):
+        """Store an uploaded file by content and link it at dest.
+
+        Returns (sha256 hex, size, blob path). A second upload of the same
+        bytes reuses the stored blob.
+        """
+        ext = os.path.splitext(dest)[1]
+        stream = file.stream
+        os.makedirs(self.root, exist_ok=True)
+        if isinstance(stream, HashingFile):
+            digest, size = stream.hexdigest(), stream.size
+            blob = self.blob_path(digest, ext)
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            if os.path.exists(blob):
+                stream.close()  # already stored
+            else:
+                stream.detach_to(blob)
+        else:
+            staging = HashingFile(os.path.join(self.root, 'tmp'))
+            try:
+                shutil.copyfileobj(stream, staging, CHUNK_SIZE)
+                digest, size = staging.hexdigest(), staging.size
+                blob = self.blob_path(digest, ext)
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                if not os.path.exists(blob):
+                    staging.detach_to(blob)
+            finally:
+                staging.close()
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            os.link(blob, dest)
+        except OSError:
+            # No hard links here (or across devices): keep a copy instead.
+            shutil.copyfile(blob, dest)
+        return digest, size, blob
+
+
+class Thumbnailer:
+    """Makes small JPEG previews of image blobs on a background thread."""
+
+    def __init__(self, root, size=256, workers=1):
+        self.root = root
+        self.size = size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnails')
+        self._pending = set()
+        self._lock = threading.Lock()
+        if not self.available:
+            # Said once here rather than skipped silently on every upload.
+            log_error('thumbnails', "Pillow is not installed; image thumbnails are disabled.")
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest + '.jpg')
+
+    def get(self, digest):
+        """Path of the thumbnail if it has been made, else None."""
+        thumb = self.path(digest)
+        return thumb if os.path.exists(thumb) else None
+
+    def submit(self, digest, source):
+        """Queue a thumbnail for source unless it exists or is already queued."""
+        if not self.available or self.get(digest) is not None:
+            return
+        with self._lock:
+            if digest in self._pending:
+                return
+            self._pending.add(digest)
+        self._pool.submit(self._make, digest, source)
+
+    def _make(self, digest, source):
+        thumb = self.path(digest)
+        try:
+            os.makedirs(os.path.dirname(thumb), exist_ok=True)
+            with Image.open(source) as image:
+                image.thumbnail((self.size, self.size))
+                tmp_path = thumb + '.tmp'
+                image.convert('RGB').save(tmp_path, 'JPEG', quality=80)
+            os.replace(tmp_path, thumb)
+        except Exception as e:
+            log_error('thumbnails', f"Error making thumbnail of {source}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(digest)